@@ -0,0 +1,64 @@
+"""
+Admin dashboard rollups for PPUM Café.
+
+The counts behind /api/admin/stats scan whole tables, so a background job
+recomputes them every ROLLUP_INTERVAL_SECONDS and the endpoint serves the
+last rollup from memory. Figures may lag writes by up to one interval.
+"""
+
+import os
+import threading
+from datetime import datetime
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import models
+import event_bus
+
+ROLLUP_INTERVAL_SECONDS = int(os.getenv("ANALYTICS_ROLLUP_SECONDS", "60"))
+
+ROLES = ("user", "stall_owner", "admin")
+
+_stats = None
+_lock = threading.Lock()
+
+
+def compute_stats(db: Session) -> dict:
+    """Count users, stalls, menu items and orders"""
+    users_by_role = dict.fromkeys(ROLES, 0)
+    for role, count in db.query(models.User.role, func.count(models.User.id)).group_by(models.User.role):
+        if role in users_by_role:
+            users_by_role[role] = count
+
+    return {
+        "total_users": db.query(func.count(models.User.id)).scalar(),
+        "total_stalls": db.query(func.count(models.Stall.id)).scalar(),
+        "total_menu_items": db.query(func.count(models.MenuItem.id)).scalar(),
+        "total_orders": db.query(func.count(models.Order.id)).scalar(),
+        "users_by_role": users_by_role,
+        "generated_at": datetime.now().isoformat(),
+    }
+
+
+def refresh(db: Session) -> dict:
+    """Recompute the rollup and swap it into the cache"""
+    global _stats
+    stats = compute_stats(db)
+    with _lock:
+        _stats = stats
+    return stats
+
+
+def invalidate():
+    global _stats
+    with _lock:
+        _stats = None
+
+
+def get_stats(db: Session) -> dict:
+    """Last rollup, computed on demand before the first background run or after a menu import"""
+    return _stats or refresh(db)
+
+
+event_bus.subscribe("menu.changed", lambda payload, local: invalidate())
@@ -0,0 +1,179 @@
+"""
+Scheduled menu availability for PPUM Café.
+
+Availability windows (breakfast, lunch, dinner, weekdays only, ...) belong to
+a stall, as its opening hours, or to a single menu item. An item is on the
+menu while its own windows (if it has any) and its stall's windows (if the
+stall has any) are open; with no windows at all it is always on. The
+is_available flag stays the owner's manual "sold out" switch.
+
+All windows are loaded once into a ScheduleIndex of merged open spans per
+stall and item, measured in seconds from Monday 00:00 local time, along with
+every span edge in the week. The set of closed stalls and items is computed
+once and kept until the next edge, so menu requests filter items without
+querying windows, and the cached state flips exactly at window boundaries.
+Changing a window publishes "availability.changed" and every worker reloads
+the index on its next request.
+"""
+
+import threading
+from bisect import bisect_right
+from datetime import datetime, time, timedelta
+
+from sqlalchemy.orm import Session
+
+import models
+import event_bus
+
+SECONDS_PER_DAY = 24 * 60 * 60
+SECONDS_PER_WEEK = 7 * SECONDS_PER_DAY
+
+WEEKDAYS = range(7)
+
+
+def _seconds(value: time) -> int:
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def second_of_week(now: datetime) -> int:
+    return now.weekday() * SECONDS_PER_DAY + _seconds(now.time())
+
+
+def window_spans(window):
+    """Open spans of a window as (start, end) seconds of the week; overnight and Sunday windows wrap"""
+    start = _seconds(window.start_time)
+    end = _seconds(window.end_time)
+    if end <= start:
+        end += SECONDS_PER_DAY
+    spans = []
+    for day in (window.weekdays if window.weekdays is not None else WEEKDAYS):
+        offset = int(day) * SECONDS_PER_DAY
+        if offset + end > SECONDS_PER_WEEK:
+            spans.append((offset + start, SECONDS_PER_WEEK))
+            spans.append((0, offset + end - SECONDS_PER_WEEK))
+        else:
+            spans.append((offset + start, offset + end))
+    return spans
+
+
+def _merge(spans):
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return [start for start, _ in merged], [end for _, end in merged]
+
+
+def _covers(spans, second: int) -> bool:
+    starts, ends = spans
+    i = bisect_right(starts, second) - 1
+    return i >= 0 and second < ends[i]
+
+
+class Snapshot:
+    """Stalls and items closed between taken_at and valid_until (None: until the windows change)"""
+    __slots__ = ("closed_stalls", "closed_items", "taken_at", "valid_until")
+
+    def __init__(self, closed_stalls, closed_items, taken_at, valid_until):
+        self.closed_stalls = closed_stalls
+        self.closed_items = closed_items
+        self.taken_at = taken_at
+        self.valid_until = valid_until
+
+    def is_open(self, menu_item_id: int, stall_id: int) -> bool:
+        return menu_item_id not in self.closed_items and stall_id not in self.closed_stalls
+
+    def covers(self, now: datetime) -> bool:
+        return self.taken_at <= now and (self.valid_until is None or now < self.valid_until)
+
+
+class ScheduleIndex:
+    def __init__(self, windows):
+        stall_spans = {}
+        item_spans = {}
+        for window in windows:
+            if window.menu_item_id is None:
+                stall_spans.setdefault(window.stall_id, []).extend(window_spans(window))
+            else:
+                item_spans.setdefault(window.menu_item_id, []).extend(window_spans(window))
+        self.stalls = {stall_id: _merge(spans) for stall_id, spans in stall_spans.items()}
+        self.items = {item_id: _merge(spans) for item_id, spans in item_spans.items()}
+
+        # Every second of the week at which some stall or item opens or closes
+        edges = set()
+        for starts, ends in list(self.stalls.values()) + list(self.items.values()):
+            edges.update(starts)
+            edges.update(end % SECONDS_PER_WEEK for end in ends)
+        self.flips = sorted(edges)
+
+    def next_flip(self, now: datetime):
+        """When the next window opens or closes after now"""
+        if not self.flips:
+            return None
+        second = second_of_week(now)
+        i = bisect_right(self.flips, second)
+        ahead = self.flips[i] - second if i < len(self.flips) else self.flips[0] + SECONDS_PER_WEEK - second
+        return now.replace(microsecond=0) + timedelta(seconds=ahead)
+
+    def snapshot(self, now: datetime) -> Snapshot:
+        second = second_of_week(now)
+        return Snapshot(
+            frozenset(stall_id for stall_id, spans in self.stalls.items() if not _covers(spans, second)),
+            frozenset(item_id for item_id, spans in self.items.items() if not _covers(spans, second)),
+            now,
+            self.next_flip(now),
+        )
+
+
+_index = None
+_snapshot = None
+_generation = 0
+_lock = threading.Lock()
+
+
+def load(db: Session) -> ScheduleIndex:
+    """Rebuild the index from the availability_windows table"""
+    global _index, _snapshot
+    generation = _generation
+    index = ScheduleIndex(db.query(models.AvailabilityWindow).all())
+    with _lock:
+        # A window changed while we were reading: leave the reload to the next caller
+        if generation == _generation:
+            _index = index
+            _snapshot = None
+    return index
+
+
+def invalidate():
+    global _index, _snapshot, _generation
+    with _lock:
+        _generation += 1
+        _index = None
+        _snapshot = None
+
+
+def current(db: Session, now: datetime = None) -> Snapshot:
+    """Closed stalls and items right now; only touches the database after a window changed"""
+    global _snapshot
+    now = now or datetime.now()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.covers(now):
+        return snapshot
+    index = _index or load(db)
+    snapshot = index.snapshot(now)
+    with _lock:
+        if index is _index:
+            _snapshot = snapshot
+    return snapshot
+
+
+def open_items(db: Session, items, now: datetime = None):
+    """Menu items whose windows are open now, in their original order"""
+    snapshot = current(db, now)
+    return [item for item in items if snapshot.is_open(item.id, item.stall_id)]
+
+
+event_bus.subscribe("availability.changed", lambda payload, local: invalidate())
+event_bus.subscribe("records.deleted", lambda payload, local: invalidate())
@@ -0,0 +1,168 @@
+"""
+Online SQLite backups for PPUM Café.
+
+Backups use sqlite3's backup API, copying a few pages per step and sleeping
+between steps so the live database stays writable. Each backup is written
+under a temporary name, checked with PRAGMA quick_check, optionally gzipped
+and only then renamed into place. Restores decompress to a scratch file, run
+PRAGMA integrity_check and copy into the live database with the same API.
+"""
+
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+from database import engine
+
+BACKUP_DIR = os.getenv("BACKUP_DIR", "./backups")
+
+# Scheduled backups (0 disables) and how many to keep
+INTERVAL_HOURS = float(os.getenv("BACKUP_INTERVAL_HOURS", "0"))
+RETENTION = int(os.getenv("BACKUP_RETENTION", "7"))
+COMPRESS = os.getenv("BACKUP_COMPRESS", "1") != "0"
+
+# Pages copied per step and pause between steps
+PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", "256"))
+STEP_SLEEP_SECONDS = float(os.getenv("BACKUP_STEP_SLEEP_SECONDS", "0.01"))
+
+# Writes from other connections restart a stepped backup; after this many
+# restarts the copy is finished in one step (readers never block writers in WAL mode)
+MAX_RESTARTS = 3
+
+BACKUP_PREFIX = "ppum_cafe_backup_"
+
+
+class _Restarted(Exception):
+    pass
+
+
+def database_path() -> str:
+    if engine.dialect.name != "sqlite" or not engine.url.database:
+        raise ValueError("Backups are only supported for file-based SQLite databases")
+    return os.path.abspath(engine.url.database)
+
+
+def _connect(path: str):
+    return sqlite3.connect(path, timeout=30)
+
+
+def _copy(source, target, pages: int, sleep_seconds: float, progress=None):
+    """Copy source into target in steps, falling back to one step if writers keep restarting it"""
+    state = {"remaining": None, "restarts": 0}
+
+    def on_step(status, remaining, total):
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            state["restarts"] += 1
+            if state["restarts"] > MAX_RESTARTS:
+                raise _Restarted()
+        state["remaining"] = remaining
+        if progress:
+            progress(total - remaining, total)
+        if remaining and sleep_seconds:
+            time.sleep(sleep_seconds)
+
+    try:
+        source.backup(target, pages=pages, progress=on_step)
+    except _Restarted:
+        source.backup(target, pages=-1)
+
+
+def check_integrity(path: str, quick: bool = False) -> str:
+    """Run PRAGMA integrity_check (or quick_check); returns 'ok' or the first problem"""
+    conn = _connect(path)
+    try:
+        pragma = "quick_check" if quick else "integrity_check"
+        return conn.execute(f"PRAGMA {pragma}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def create_backup(backup_dir: str = BACKUP_DIR, compress: bool = COMPRESS, pages: int = PAGES_PER_STEP,
+                  sleep_seconds: float = STEP_SLEEP_SECONDS, progress=None) -> str:
+    """Back up the live database online; returns the backup file path"""
+    source_path = database_path()
+    if not os.path.exists(source_path):
+        raise ValueError(f"Database {source_path} does not exist")
+    os.makedirs(backup_dir, exist_ok=True)
+
+    name = f"{BACKUP_PREFIX}{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
+    partial = os.path.join(backup_dir, name + ".partial")
+    source, target = _connect(source_path), _connect(partial)
+    try:
+        _copy(source, target, pages, sleep_seconds, progress)
+    finally:
+        target.close()
+        source.close()
+
+    result = check_integrity(partial, quick=True)
+    if result != "ok":
+        os.remove(partial)
+        raise ValueError(f"Backup failed verification: {result}")
+
+    final = os.path.join(backup_dir, name)
+    if compress:
+        with open(partial, "rb") as raw, gzip.open(partial + ".gz", "wb", compresslevel=6) as packed:
+            shutil.copyfileobj(raw, packed, 1024 * 1024)
+        os.remove(partial)
+        partial, final = partial + ".gz", final + ".gz"
+    os.replace(partial, final)
+    return final
+
+
+def list_backups(backup_dir: str = BACKUP_DIR):
+    """Backup files, newest first"""
+    if not os.path.isdir(backup_dir):
+        return []
+    names = [n for n in os.listdir(backup_dir)
+             if n.startswith(BACKUP_PREFIX) and (n.endswith(".db") or n.endswith(".db.gz"))]
+    return [os.path.join(backup_dir, n) for n in sorted(names, reverse=True)]
+
+
+def apply_retention(backup_dir: str = BACKUP_DIR, keep: int = RETENTION):
+    """Delete all but the newest `keep` backups; returns the deleted paths"""
+    expired = list_backups(backup_dir)[keep:]
+    for path in expired:
+        os.remove(path)
+    return expired
+
+
+def _unpacked(path: str, scratch_dir: str) -> str:
+    if not path.endswith(".gz"):
+        return path
+    unpacked = os.path.join(scratch_dir, "restore.db")
+    with gzip.open(path, "rb") as packed, open(unpacked, "wb") as raw:
+        shutil.copyfileobj(packed, raw, 1024 * 1024)
+    return unpacked
+
+
+def verify_backup(path: str) -> str:
+    """Full integrity check of a (possibly compressed) backup; returns 'ok' or the problem"""
+    with tempfile.TemporaryDirectory() as scratch:
+        return check_integrity(_unpacked(path, scratch))
+
+
+def restore_backup(path: str, target_path: str = None, progress=None) -> str:
+    """Verify a backup and copy it over the live (or given) database; returns the restored path"""
+    target_path = target_path or database_path()
+    with tempfile.TemporaryDirectory() as scratch:
+        source_path = _unpacked(path, scratch)
+        result = check_integrity(source_path)
+        if result != "ok":
+            raise ValueError(f"Backup {path} failed integrity check: {result}")
+
+        source, target = _connect(source_path), _connect(target_path)
+        try:
+            # The backup API takes the target's write lock, so open connections see a consistent swap
+            source.backup(target, pages=-1, progress=(lambda s, r, t: progress(t - r, t)) if progress else None)
+        finally:
+            target.close()
+            source.close()
+
+    result = check_integrity(target_path)
+    if result != "ok":
+        raise ValueError(f"Restored database failed integrity check: {result}")
+    return target_path
@@ -0,0 +1,157 @@
+"""
+Cascading deletes for PPUM Café.
+
+CASCADES declares, once, which rows reference each table. delete() removes
+rows together with everything that depends on them, children before
+parents, using set-based DELETE ... WHERE id IN (...) statements over
+BATCH_SIZE ids at a time. Each batch is one transaction that leaves every
+foreign key satisfied (SQLite enforces them, see database.py), so a stall
+with a long order history is removed without one huge transaction holding
+the write lock. This purges soft-deleted rows too (see soft_delete.py).
+
+Rows are not just dropped where the kitchen or the bill depends on them:
+trackers still in a kitchen are cancelled first (crud.cancel_trackers gives
+back their queue counts and portions and re-flows their stalls), and orders
+that keep some items after a stall or menu purge are re-billed
+(crud.settle_orders), both in the batch that deletes the rows.
+"""
+
+import os
+
+from sqlalchemy import inspect, select, tuple_
+from sqlalchemy.orm import Session
+
+import models
+import crud
+import event_bus
+import kitchen_queue
+
+BATCH_SIZE = int(os.getenv("CASCADE_BATCH_SIZE", "2000"))
+
+CASCADE = "cascade"
+SET_NULL = "set_null"
+
+# parent model -> [(child model, foreign key column, action)]; children with
+# several paths to a parent list the cheapest (most direct) one first
+CASCADES = {
+    models.Stall: [
+        (models.AvailabilityWindow, "stall_id", CASCADE),
+        (models.FoodTracker, "stall_id", CASCADE),
+        (models.StallOrder, "stall_id", CASCADE),
+        (models.OrderItem, "stall_id", CASCADE),
+        (models.MenuItem, "stall_id", CASCADE),
+        (models.User, "stall_id", SET_NULL),  # Owners stay, without a stall
+    ],
+    models.MenuItem: [
+        (models.AvailabilityWindow, "menu_item_id", CASCADE),
+        (models.FoodTracker, "menu_item_id", CASCADE),
+        (models.OrderItem, "menu_item_id", CASCADE),
+    ],
+    models.User: [
+        (models.Notification, "user_id", CASCADE),
+        (models.Order, "user_id", CASCADE),
+        (models.IdempotencyKey, "user_id", CASCADE),
+    ],
+    models.Order: [
+        (models.Notification, "order_id", CASCADE),
+        (models.FoodTracker, "order_id", CASCADE),
+        (models.StallOrder, "order_id", CASCADE),
+        (models.OrderItem, "order_id", CASCADE),
+        (models.IdempotencyKey, "order_id", SET_NULL),
+    ],
+    models.OrderItem: [
+        (models.FoodTracker, "order_item_id", CASCADE),
+    ],
+    models.FoodTracker: [
+        (models.Notification, "food_tracker_id", CASCADE),
+    ],
+}
+
+
+def _chunks(ids, size):
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def _delete_leaves(db: Session, model, condition, batch_size) -> int:
+    """Delete rows nothing references, batch_size at a time, in the caller's transaction"""
+    primary_key = inspect(model).primary_key
+    key = tuple_(*primary_key) if len(primary_key) > 1 else primary_key[0]
+    total = 0
+    while True:
+        batch = select(*primary_key).where(condition).limit(batch_size)
+        deleted = db.query(model).filter(key.in_(batch)).delete(synchronize_session=False)
+        total += deleted
+        if deleted < batch_size:
+            return total
+
+
+def _delete_batch(db: Session, model, ids, counts, batch_size, parent=None):
+    """Delete rows of model with these ids and everything referencing them; commits once the batch is gone"""
+    if model is models.FoodTracker:
+        active = db.query(models.FoodTracker).filter(
+            models.FoodTracker.id.in_(ids), models.FoodTracker.status.in_(kitchen_queue.ACTIVE_STATUSES)
+        ).all()
+        if active:
+            crud.cancel_trackers(db, active)
+            # Written before the bulk deletes below remove the rows
+            db.flush()
+
+    # Orders losing items to another parent (a stall or menu purge) outlive this batch
+    settled = []
+    if model is models.OrderItem and parent is not models.Order:
+        settled = db.scalars(
+            select(models.OrderItem.order_id).where(models.OrderItem.id.in_(ids)).distinct()
+        ).all()
+
+    for child, column, action in CASCADES.get(model, ()):
+        foreign_key = getattr(child, column)
+        if action == SET_NULL:
+            updated = db.query(child).filter(foreign_key.in_(ids)).update(
+                {foreign_key: None}, synchronize_session=False
+            )
+            counts[f"{child.__tablename__}.{column}"] = counts.get(f"{child.__tablename__}.{column}", 0) + updated
+        elif child in CASCADES:
+            child_ids = db.scalars(
+                select(child.id).where(foreign_key.in_(ids)).execution_options(include_deleted=True)
+            ).all()
+            for chunk in _chunks(child_ids, batch_size):
+                _delete_batch(db, child, chunk, counts, batch_size, model)
+        else:
+            deleted = _delete_leaves(db, child, foreign_key.in_(ids), batch_size)
+            counts[child.__tablename__] = counts.get(child.__tablename__, 0) + deleted
+
+    deleted = db.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+    counts[model.__tablename__] = counts.get(model.__tablename__, 0) + deleted
+    if settled:
+        crud.settle_orders(db, settled)
+    db.commit()
+
+
+def delete(db: Session, model, ids, batch_size: int = BATCH_SIZE) -> dict:
+    """Delete rows of model by id along with their dependents; returns rows affected per table"""
+    counts = {}
+    ids = list(ids)
+    for chunk in _chunks(ids, batch_size):
+        _delete_batch(db, model, chunk, counts, batch_size)
+
+    counts = {table: count for table, count in counts.items() if count}
+    if counts:
+        # Every worker rebuilds its cached kitchen backlogs and tracker gauges
+        event_bus.publish(db, "records.deleted", table=model.__tablename__, counts=counts)
+        db.commit()
+    return counts
+
+
+def delete_stall(db: Session, stall_id: int, batch_size: int = BATCH_SIZE) -> dict:
+    """Delete a stall with its menu, its share of every order, and orders left with no items"""
+    order_ids = db.scalars(select(models.StallOrder.order_id).where(models.StallOrder.stall_id == stall_id)).all()
+    counts = delete(db, models.Stall, [stall_id], batch_size)
+
+    emptied = []
+    for chunk in _chunks(order_ids, batch_size):
+        with_items = set(db.scalars(select(models.OrderItem.order_id).where(models.OrderItem.order_id.in_(chunk))))
+        emptied.extend(order_id for order_id in chunk if order_id not in with_items)
+    for table, count in delete(db, models.Order, emptied, batch_size).items():
+        counts[table] = counts.get(table, 0) + count
+    return counts
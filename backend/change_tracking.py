@@ -0,0 +1,53 @@
+"""
+Change tracking for PPUM Café.
+
+Models that mix in Versioned carry updated_at (naive local time, like every
+timestamp in models.py) and row_version. A before_flush hook stamps every
+new or modified Versioned object: updated_at gets the current time and
+row_version the next value of one global counter in the
+change_sequence table. The counter is bumped inside the writing transaction
+and SQLite has a single writer, so versions become visible in commit order:
+"row_version > N" returns exactly the changes committed after a reader saw N.
+
+Bulk query.update() calls and raw SQL bypass the hook and must stamp rows
+themselves; hard deletes are not recorded.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, event, text
+from sqlalchemy.orm import Session
+
+SEQUENCE_NAME = "global"
+
+_BUMP = text(
+    "INSERT INTO change_sequence (name, value) VALUES (:name, :count) "
+    "ON CONFLICT (name) DO UPDATE SET value = value + :count RETURNING value"
+)
+_CURRENT = text("SELECT value FROM change_sequence WHERE name = :name")
+
+
+class Versioned:
+    """Mixin for tables whose changes clients sync incrementally"""
+    updated_at = Column(DateTime(timezone=True), index=True)
+    row_version = Column(Integer, index=True)
+
+
+def current_version(db: Session) -> int:
+    """Highest committed row_version; everything at or below it is visible to this session"""
+    return db.execute(_CURRENT, {"name": SEQUENCE_NAME}).scalar() or 0
+
+
+@event.listens_for(Session, "before_flush")
+def _stamp_changes(session, flush_context, instances):
+    changed = [obj for obj in session.new if isinstance(obj, Versioned)]
+    changed += [obj for obj in session.dirty
+                if isinstance(obj, Versioned) and session.is_modified(obj, include_collections=False)]
+    if not changed:
+        return
+
+    last = session.connection().execute(_BUMP, {"name": SEQUENCE_NAME, "count": len(changed)}).scalar_one()
+    now = datetime.now()
+    for version, obj in enumerate(changed, start=last - len(changed) + 1):
+        obj.updated_at = now
+        obj.row_version = version
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Database Backup & Restore
+Takes online backups of the live SQLite database with the backup API (the
+app can keep serving while it runs), prunes old backups, and restores a
+backup after a full integrity check.
+Usage: python cli/backup_database.py create [--no-compress] [--keep 7]
+       python cli/backup_database.py list
+       python cli/backup_database.py verify backups/ppum_cafe_backup_20250101_120000.db.gz
+       python cli/backup_database.py restore backups/ppum_cafe_backup_20250101_120000.db.gz [--yes]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backup
+
+
+def print_progress(done, total):
+    if total:
+        print(f"\r   📄 {done}/{total} pages ({100 * done // total}%)", end="", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Online backups and verified restores of the PPUM Café database")
+    parser.add_argument("--dir", default=backup.BACKUP_DIR, help="Backup directory (default: BACKUP_DIR or ./backups)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    create = commands.add_parser("create", help="Back up the live database")
+    create.add_argument("--no-compress", action="store_true", help="Keep the backup as a plain .db file")
+    create.add_argument("--keep", type=int, default=backup.RETENTION, help="Backups to keep afterwards (0 keeps all)")
+    create.add_argument("--pages", type=int, default=backup.PAGES_PER_STEP, help="Pages copied per step")
+    create.add_argument("--sleep", type=float, default=backup.STEP_SLEEP_SECONDS, help="Seconds between steps")
+
+    commands.add_parser("list", help="List backups, newest first")
+
+    verify = commands.add_parser("verify", help="Run a full integrity check on a backup")
+    verify.add_argument("path")
+
+    restore = commands.add_parser("restore", help="Verify a backup and restore it over the live database")
+    restore.add_argument("path")
+    restore.add_argument("--yes", action="store_true", help="Do not ask for confirmation")
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == "create":
+            print(f"💾 Backing up {backup.database_path()}...")
+            started = time.perf_counter()
+            path = backup.create_backup(args.dir, compress=not args.no_compress, pages=args.pages,
+                                        sleep_seconds=args.sleep, progress=print_progress)
+            print(f"\n✅ Backup written to {path} ({os.path.getsize(path) / 1024 / 1024:.1f} MB, "
+                  f"{time.perf_counter() - started:.1f}s)")
+            if args.keep:
+                for expired in backup.apply_retention(args.dir, args.keep):
+                    print(f"   🗑️  Removed old backup {expired}")
+
+        elif args.command == "list":
+            backups = backup.list_backups(args.dir)
+            if not backups:
+                print(f"ℹ️  No backups in {args.dir}")
+            for path in backups:
+                print(f"   {os.path.basename(path):<48}{os.path.getsize(path) / 1024 / 1024:>8.1f} MB")
+
+        elif args.command == "verify":
+            result = backup.verify_backup(args.path)
+            if result != "ok":
+                print(f"❌ {args.path} failed integrity check: {result}")
+                sys.exit(1)
+            print(f"✅ {args.path} passed integrity check")
+
+        elif args.command == "restore":
+            target = backup.database_path()
+            if not args.yes:
+                answer = input(f"⚠️  Replace all data in {target} with {args.path}? (y/n): ").lower().strip()
+                if answer not in ["yes", "y"]:
+                    print("❌ Restore cancelled")
+                    return
+            print(f"🔍 Verifying and restoring {args.path}...")
+            backup.restore_backup(args.path, progress=print_progress)
+            print(f"\n✅ Restored {target} (integrity check passed)")
+
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"\n❌ {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+API Load Testing & Benchmark Suite
+Seeds a scaled dataset into a throwaway database and drives concurrent
+scenarios against the app in-process (ASGI transport) or a live server,
+reporting p50/p95/p99 latency and throughput per endpoint as JSON.
+Usage: python cli/benchmark_api.py [--orders 2000] [--concurrency 50] [--output run.json]
+       python cli/benchmark_api.py --compare baseline.json --output run.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import instrumentation
+
+SCENARIOS = ["lunch_rush", "tracking_polls", "kitchen_refresh", "search_storm", "large_order"]
+LARGE_ORDER_ITEMS = 20
+LARGE_ORDER_QUANTITY = 5
+SEARCH_TERMS = ["Nasi", "Mee", "Rice", "Chicken", "Curry", "Roti", "Soup", "Burger", "xyz"]
+
+
+class EndpointStats:
+    """Latencies and status codes per endpoint label"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.queries = {}
+
+    def record(self, label, seconds, status_code, queries=None):
+        self.latencies.setdefault(label, []).append(seconds)
+        if status_code >= 400:
+            self.errors[label] = self.errors.get(label, 0) + 1
+        if queries is not None:
+            self.queries.setdefault(label, []).append(queries)
+
+    def summary(self, wall_seconds):
+        endpoints = {}
+        for label, values in sorted(self.latencies.items()):
+            ms = np.asarray(values) * 1000
+            endpoints[label] = {
+                "requests": len(values),
+                "errors": self.errors.get(label, 0),
+                "throughput_rps": round(len(values) / wall_seconds, 1),
+                "mean_ms": round(float(ms.mean()), 2),
+                "p50_ms": round(float(np.percentile(ms, 50)), 2),
+                "p95_ms": round(float(np.percentile(ms, 95)), 2),
+                "p99_ms": round(float(np.percentile(ms, 99)), 2),
+                "max_ms": round(float(ms.max()), 2),
+            }
+            if label in self.queries:
+                endpoints[label]["queries_mean"] = round(float(np.mean(self.queries[label])), 1)
+        return endpoints
+
+
+def prepare_database(args):
+    """Point the app at a fresh database file and seed it"""
+    db_path = os.path.join(tempfile.mkdtemp(prefix="ppum_bench_"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    # Measure the endpoints, not the rate limiter
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+
+    from database import SessionLocal, sync_schema
+    from seed_data import seed_scaled_dataset
+
+    sync_schema()
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        dataset = seed_scaled_dataset(db, stalls=args.stalls, items_per_stall=args.items_per_stall,
+                                      users=args.users, orders=args.orders, seed=args.seed)
+        dataset["seed_seconds"] = round(time.perf_counter() - started, 2)
+
+        import models
+        dataset["orders_by_email"] = {}
+        rows = db.query(models.User.email, models.Order.id).join(models.Order, models.Order.user_id == models.User.id).all()
+        for email, order_id in rows:
+            dataset["orders_by_email"].setdefault(email, []).append(order_id)
+    finally:
+        db.close()
+    dataset["db_path"] = db_path
+    return dataset
+
+
+def auth_headers(email):
+    # Tokens are minted directly so bcrypt does not dominate the measurements
+    from routers.auth import create_access_token
+    from datetime import timedelta
+    return {"Authorization": f"Bearer {create_access_token({'sub': email}, timedelta(hours=2))}"}
+
+
+async def timed(client, stats, label, method, url, **kwargs):
+    started = time.perf_counter()
+    queries = None
+    try:
+        response = await client.request(method, url, **kwargs)
+        status_code = response.status_code
+        queries = instrumentation.query_count(response)
+    except AssertionError:
+        pass  # Server without query instrumentation
+    except Exception:
+        response, status_code = None, 599
+    stats.record(label, time.perf_counter() - started, status_code, queries)
+    return response
+
+
+async def lunch_rush(client, stats, dataset, rng, index):
+    email = rng.choice(dataset["customer_emails"])
+    items = [{"menu_item_id": item_id, "quantity": rng.randint(1, 2)}
+             for item_id in rng.sample(dataset["menu_item_ids"], k=rng.randint(1, 3))]
+    response = await timed(client, stats, "POST /api/orders/", "POST", "/api/orders/",
+                           json={"user_id": 0, "payment_method": "Online Payment", "items": items},
+                           headers=dataset["headers"][email])
+    if response is not None and response.status_code == 200:
+        dataset["orders_by_email"].setdefault(email, []).append(response.json()["order"]["id"])
+
+
+async def tracking_polls(client, stats, dataset, rng, index):
+    email = rng.choice([e for e in dataset["orders_by_email"] if e in dataset["headers"]])
+    order_id = rng.choice(dataset["orders_by_email"][email])
+    await timed(client, stats, "GET /api/orders/{order_id}/tracking", "GET",
+                f"/api/orders/{order_id}/tracking", headers=dataset["headers"][email])
+    if index % 4 == 0:
+        user_id = dataset["user_ids"][email]
+        await timed(client, stats, "GET /api/orders/user/{user_id}", "GET",
+                    f"/api/orders/user/{user_id}", headers=dataset["headers"][email])
+        await timed(client, stats, "GET /api/notifications/user/{user_id}", "GET",
+                    f"/api/notifications/user/{user_id}", headers=dataset["headers"][email])
+
+
+async def kitchen_refresh(client, stats, dataset, rng, index):
+    headers = dataset["headers"][rng.choice(dataset["owner_emails"])]
+    await timed(client, stats, "GET /api/stall-owner/food-trackers", "GET",
+                "/api/stall-owner/food-trackers", headers=headers)
+    await timed(client, stats, "GET /api/stall-owner/orders", "GET", "/api/stall-owner/orders", headers=headers)
+
+
+async def search_storm(client, stats, dataset, rng, index):
+    term = rng.choice(SEARCH_TERMS)
+    await timed(client, stats, "GET /api/search/menu-items", "GET", "/api/search/menu-items", params={"q": term})
+    await timed(client, stats, "GET /api/search/stalls", "GET", "/api/search/stalls", params={"q": term})
+    if index % 2 == 0:
+        await timed(client, stats, "GET /api/stalls/", "GET", "/api/stalls/")
+
+
+async def large_order(client, stats, dataset, rng, index):
+    email = dataset["customer_emails"][0]
+    headers = dataset["headers"][email]
+    if index % 10 == 0 or not dataset["large_orders"]:
+        items = [{"menu_item_id": item_id, "quantity": LARGE_ORDER_QUANTITY}
+                 for item_id in rng.sample(dataset["menu_item_ids"], k=LARGE_ORDER_ITEMS)]
+        response = await timed(client, stats, "POST /api/orders/ (20x5)", "POST", "/api/orders/",
+                               json={"user_id": 0, "payment_method": "Online Payment", "items": items},
+                               headers=headers)
+        if response is not None and response.status_code == 200:
+            dataset["large_orders"].append(response.json()["order"]["id"])
+        return
+    order_id = rng.choice(dataset["large_orders"])
+    await timed(client, stats, "GET /api/orders/{order_id}/tracking (20x5)", "GET",
+                f"/api/orders/{order_id}/tracking", headers=headers)
+    await timed(client, stats, "GET /api/orders/{order_id} (20x5)", "GET", f"/api/orders/{order_id}", headers=headers)
+
+
+async def run_scenario(client, name, dataset, requests, concurrency, seed):
+    """Run one scenario with a fixed number of iterations and bounded concurrency"""
+    handler = globals()[name]
+    stats = EndpointStats()
+    rng = random.Random(seed)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index):
+        async with semaphore:
+            await handler(client, stats, dataset, rng, index)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    wall = time.perf_counter() - started
+    total = sum(len(v) for v in stats.latencies.values())
+    return {
+        "wall_seconds": round(wall, 3),
+        "requests": total,
+        "throughput_rps": round(total / wall, 1),
+        "endpoints": stats.summary(wall),
+    }
+
+
+async def run_benchmark(args, dataset):
+    import httpx
+
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+    else:
+        from main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+
+    results = {}
+    async with client:
+        for name in args.scenarios:
+            results[name] = await run_scenario(client, name, dataset, args.requests, args.concurrency, args.seed)
+            print(f"   ✅ {name}: {results[name]['requests']} requests, {results[name]['throughput_rps']} req/s",
+                  file=sys.stderr)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__)), text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(previous, current):
+    """Print p95 and throughput changes per endpoint against an earlier run"""
+    print(f"\n📊 Comparison with {previous.get('commit') or 'previous run'}", file=sys.stderr)
+    print(f"   {'Endpoint':<42}{'p95 ms':>18}{'req/s':>18}", file=sys.stderr)
+    for scenario, result in current["scenarios"].items():
+        before = previous.get("scenarios", {}).get(scenario, {}).get("endpoints", {})
+        for label, stats in result["endpoints"].items():
+            if label not in before:
+                continue
+            old = before[label]
+            print(f"   {label:<42}{old['p95_ms']:>8} → {stats['p95_ms']:<7}"
+                  f"{old['throughput_rps']:>8} → {stats['throughput_rps']:<7}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PPUM Café API endpoints under concurrent load")
+    parser.add_argument("--stalls", type=int, default=8)
+    parser.add_argument("--items-per-stall", type=int, default=25)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=2000, help="Historical orders to seed")
+    parser.add_argument("--requests", type=int, default=500, help="Iterations per scenario")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--base-url", help="Benchmark a running server instead of the in-process app "
+                                           "(it must use the same DATABASE_URL)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--compare", help="Earlier JSON report to compare against")
+    args = parser.parse_args()
+
+    print("🌱 Seeding benchmark database...", file=sys.stderr)
+    dataset = prepare_database(args)
+
+    from database import SessionLocal
+    import models
+    db = SessionLocal()
+    try:
+        dataset["user_ids"] = dict(db.query(models.User.email, models.User.id).all())
+    finally:
+        db.close()
+    dataset["large_orders"] = []
+    dataset["headers"] = {email: auth_headers(email)
+                          for email in dataset["customer_emails"] + dataset["owner_emails"]}
+
+    print(f"🚀 Running scenarios: {', '.join(args.scenarios)}", file=sys.stderr)
+    scenarios = asyncio.run(run_benchmark(args, dataset))
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "stalls": args.stalls, "items_per_stall": args.items_per_stall, "users": args.users,
+            "orders": args.orders, "requests": args.requests, "concurrency": args.concurrency,
+            "transport": args.base_url or "asgi", "seed_seconds": dataset["seed_seconds"],
+        },
+        "scenarios": scenarios,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+        print(f"💾 Report written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Prep Time Model Evaluation
+Replays food tracker history to compare the ETAs customers were promised
+when they ordered with the ETAs the kitchen queue would have given using
+the fitted prep time model.
+Usage: python cli/evaluate_prep_model.py [--train-fraction 0.8] [--json]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from database import SessionLocal, sync_schema
+import models
+import kitchen_queue
+import prep_estimator
+
+
+def load_evaluation_rows(db):
+    """Load completed trackers with the ETA promised at order time, in service order"""
+    return db.query(
+        models.FoodTracker.menu_item_id,
+        models.FoodTracker.stall_id,
+        models.FoodTracker.prep_start_time,
+        models.FoodTracker.actual_ready_time,
+        models.FoodTracker.created_at,
+        models.FoodTracker.initial_estimated_ready_time,
+    ).filter(
+        models.FoodTracker.prep_start_time.isnot(None),
+        models.FoodTracker.actual_ready_time.isnot(None),
+    ).order_by(models.FoodTracker.created_at, models.FoodTracker.id).all()
+
+
+def replay_etas(rows, start, prep_seconds, stations):
+    """ETAs the kitchen queue would have given rows[start:] (epoch seconds).
+
+    Each tracker is scheduled behind the items of its stall ordered before
+    it and not yet ready at that moment, as they really stood: items already
+    started finish after their predicted prep time, the rest queue ahead.
+    Only predicted durations are used, never the ETAs the app stored.
+    """
+    backlogs = {}
+    etas = []
+    for index, (menu_item_id, stall_id, started, ready, created, _) in enumerate(rows):
+        now = created.timestamp()
+        backlog = [job for job in backlogs.get(stall_id, ()) if job[1] > now]
+        duration = prep_seconds(menu_item_id)
+        if index >= start:
+            busy_until = [max(job_start + job_duration, now) for job_start, _, job_duration in backlog if job_start <= now]
+            queued = [job_duration for job_start, _, job_duration in backlog if job_start > now]
+            slots, _ = kitchen_queue.schedule(stations.get(stall_id, 1), busy_until, queued + [duration], now)
+            etas.append(slots[-1][1])
+        backlog.append((started.timestamp(), ready.timestamp(), duration))
+        backlogs[stall_id] = backlog
+    return etas
+
+
+def error_summary(errors):
+    """Summarise signed ETA errors (minutes, positive = food was late)"""
+    if len(errors) == 0:
+        return {"count": 0}
+    absolute = np.abs(errors)
+    return {
+        "count": int(len(errors)),
+        "mae_minutes": round(float(absolute.mean()), 2),
+        "median_abs_minutes": round(float(np.median(absolute)), 2),
+        "p90_abs_minutes": round(float(np.percentile(absolute, 90)), 2),
+        "bias_minutes": round(float(errors.mean()), 2),
+    }
+
+
+def evaluate(train_fraction=0.8):
+    """Fit on the oldest trackers and measure ETA error on the newest"""
+    sync_schema()
+    db = SessionLocal()
+    try:
+        rows = load_evaluation_rows(db)
+        menu_items = {item.id: item for item in db.query(models.MenuItem).execution_options(include_deleted=True)}
+        stations = {stall.id: kitchen_queue.stall_stations(stall)
+                    for stall in db.query(models.Stall).execution_options(include_deleted=True)}
+    finally:
+        db.close()
+
+    if len(rows) < 10:
+        raise ValueError(f"Not enough completed trackers to evaluate ({len(rows)} found)")
+
+    split = int(len(rows) * train_fraction)
+    train_rows, test_rows = rows[:split], rows[split:]
+
+    model = prep_estimator.fit(prep_estimator.history_to_arrays([row[:4] for row in train_rows]))
+
+    def prep_seconds(menu_item_id):
+        menu_item = menu_items.get(menu_item_id)
+        return 60 * (model.prep_minutes(menu_item) if menu_item else model.item_minutes.get(menu_item_id, 10))
+
+    ready = np.array([row[3].timestamp() for row in test_rows])
+    predicted = np.asarray(replay_etas(rows, split, prep_seconds, stations))
+    # ETAs re-flowed after the order was placed don't count: only the one promised then
+    promised = [(row[3].timestamp(), row[5].timestamp()) for row in test_rows if row[5] is not None]
+    promised_errors = np.array([actual - eta for actual, eta in promised]) / 60
+
+    return {
+        "train_samples": len(train_rows),
+        "test_samples": len(test_rows),
+        "model": model.to_dict(),
+        "before": error_summary(promised_errors),
+        "after": error_summary((ready - predicted) / 60),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the prep time model against tracker history")
+    parser.add_argument("--train-fraction", type=float, default=0.8, help="Share of history used for fitting")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    try:
+        report = evaluate(train_fraction=args.train_fraction)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print("=" * 60)
+    print("⏱️  PPUM Café Prep Time Model Evaluation")
+    print("=" * 60)
+    print(f"   Training trackers: {report['train_samples']}")
+    print(f"   Test trackers:     {report['test_samples']}")
+    print()
+    print(f"   {'Metric':<22}{'Before':>12}{'After':>12}")
+    for key, label in [
+        ("count", "Trackers compared"),
+        ("mae_minutes", "Mean abs error (min)"),
+        ("median_abs_minutes", "Median abs error"),
+        ("p90_abs_minutes", "P90 abs error"),
+        ("bias_minutes", "Bias (late > 0)"),
+    ]:
+        print(f"   {label:<22}{report['before'].get(key, '-'):>12}{report['after'].get(key, '-'):>12}")
+
+
+if __name__ == "__main__":
+    main()
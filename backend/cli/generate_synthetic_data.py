@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Synthetic Data Generator
+Fills the configured database with millions of historical orders, order
+items, food trackers and notifications for benchmarking and index testing.
+Rows are generated with numpy in chunks and written with executemany in one
+transaction per chunk; secondary indexes are rebuilt once at the end.
+
+Orders are generated in time order and every stall's food trackers are run
+through its kitchen (kitchen_queue.schedule), so queue positions, promised
+ETAs and prep start times come from the real backlog. The load is sized to
+what the stalls' kitchens can serve; add benchmark stalls with --stalls.
+Usage: python cli/generate_synthetic_data.py [--orders N] [--stalls 400] [--customers 20000] [--days 90]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from sqlalchemy import func
+
+from database import SessionLocal, engine, sync_schema
+import models
+import crud
+import kitchen_queue
+
+# Share of orders per hour of day: breakfast, a sharp lunch peak and dinner
+HOUR_WEIGHTS = {
+    7: 3, 8: 5, 9: 4, 10: 4, 11: 9, 12: 20, 13: 16, 14: 7,
+    15: 4, 16: 4, 17: 6, 18: 9, 19: 7, 20: 3, 21: 1,
+}
+ITEMS_PER_ORDER = ([1, 2, 3, 4, 5], [0.45, 0.30, 0.15, 0.07, 0.03])
+QUANTITIES = ([1, 2, 3], [0.72, 0.21, 0.07])
+SERVICE_FEE = 1.50
+
+# Actual prep times scatter log-normally around the menu estimate
+PREP_SPREAD = 0.25
+OPEN_MINUTES = 60 * len(HOUR_WEIGHTS)
+
+# Share of the kitchens' station time the orders keep busy over opening hours.
+# Lunch runs about 3x the daily average, so the default already queues at noon
+# and anything above the maximum leaves backlogs that never clear by closing.
+DEFAULT_UTILISATION = 0.3
+MAX_UTILISATION = 0.5
+
+TABLES = {
+    "users": ["id", "name", "email", "phone", "password_hash", "role", "language_preference", "is_active", "created_at"],
+    "orders": ["id", "user_id", "order_number", "status", "payment_method", "subtotal", "service_fee",
+               "total_amount", "estimated_completion_time", "created_at", "updated_at"],
+    "order_items": ["id", "order_id", "menu_item_id", "stall_id", "quantity", "unit_price", "total_price"],
+    "stall_orders": ["stall_id", "order_id", "status", "created_at"],
+    "food_trackers": ["id", "order_id", "order_item_id", "menu_item_id", "stall_id", "item_number", "status",
+                      "queue_position", "estimated_ready_time", "initial_estimated_ready_time", "actual_ready_time",
+                      "prep_start_time", "prep_duration_minutes", "created_at", "updated_at"],
+    "notifications": ["id", "user_id", "order_id", "food_tracker_id", "title", "message",
+                      "notification_type", "is_read", "created_at"],
+}
+
+
+def insert_sql(table):
+    columns = TABLES[table]
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+
+
+def timestamps(epoch_seconds):
+    """Epoch seconds -> strings in SQLAlchemy's SQLite DATETIME format"""
+    values = np.datetime_as_string((epoch_seconds * 1e6).astype("datetime64[us]"), unit="us")
+    return np.char.replace(values, "T", " ").tolist()
+
+
+def zipf_weights(n, exponent, rng):
+    """Popularity weights for n things in random order"""
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    rng.shuffle(weights)
+    return weights / weights.sum()
+
+
+def next_ids(db):
+    return {table: (db.query(func.max(model.id)).scalar() or 0) + 1 for table, model in (
+        ("users", models.User), ("orders", models.Order), ("order_items", models.OrderItem),
+        ("food_trackers", models.FoodTracker), ("notifications", models.Notification),
+    )}
+
+
+def load_menu(db):
+    rows = db.query(
+        models.MenuItem.id, models.MenuItem.stall_id, models.MenuItem.price,
+        models.MenuItem.base_prep_time, models.MenuItem.complexity_multiplier, models.MenuItem.is_best_seller
+    ).order_by(models.MenuItem.id).all()
+    if not rows:
+        raise ValueError("No menu items found; seed stalls and menus first (python cli/seed_data.py)")
+    ids, stall_ids, prices, base, complexity, best = zip(*rows)
+    return {
+        "id": np.array(ids),
+        "stall_id": np.array(stall_ids),
+        "price": np.array(prices, dtype=float),
+        "prep": np.array([b or 5 for b in base], dtype=float) * np.array([c or 1.0 for c in complexity]),
+        "best_seller": np.array(best, dtype=bool),
+    }
+
+
+def load_stations(db, menu):
+    """Kitchen stations per stall on the menu"""
+    stall_ids = np.unique(menu["stall_id"]).tolist()
+    stalls = {stall.id: stall for stall in db.query(models.Stall).filter(models.Stall.id.in_(stall_ids))}
+    return {stall_id: kitchen_queue.stall_stations(stalls.get(stall_id)) for stall_id in stall_ids}
+
+
+def popularity(menu, stations, rng):
+    """Zipf item popularity within each stall (best sellers boosted), with
+    stall demand in proportion to what its kitchen can prepare"""
+    item_p = np.zeros(len(menu["id"]))
+    for stall_id in np.unique(menu["stall_id"]):
+        mask = menu["stall_id"] == stall_id
+        weights = zipf_weights(mask.sum(), 1.1, rng) * np.where(menu["best_seller"][mask], 3.0, 1.0)
+        weights /= weights.sum()
+        item_p[mask] = weights * stations[stall_id] / np.dot(weights, menu["prep"][mask])
+    return item_p / item_p.sum()
+
+
+def daily_capacity(menu, item_p, stations):
+    """Orders a day that would keep every kitchen busy for all opening hours"""
+    portions = np.dot(*ITEMS_PER_ORDER) * np.dot(*QUANTITIES)
+    minutes_per_portion = np.dot(item_p, menu["prep"]) * np.exp(PREP_SPREAD ** 2 / 2)
+    station_minutes = OPEN_MINUTES * sum(stations.values())
+    return station_minutes / (portions * minutes_per_portion)
+
+
+class Kitchen:
+    """One stall's stations and unfinished items, carried across chunks"""
+
+    def __init__(self, stall_id, stations):
+        self.stations = stations
+        self.actual = kitchen_queue.StallKitchen(stall_id, stations, [0.0] * stations, 0.0)
+        self.jobs = []  # (start, finish, estimated seconds) of items not yet ready, in service order
+
+    def take(self, created, estimate, actual):
+        """Queue one item; returns its queue position, promised ETA and start"""
+        self.jobs = [job for job in self.jobs if job[1] > created]
+        busy_until = [max(start + est, created) for start, _, est in self.jobs if start <= created]
+        queued = [est for start, _, est in self.jobs if start > created]
+        slots, _ = kitchen_queue.schedule(self.stations, busy_until, queued + [estimate], created)
+        start, finish = self.actual.add_jobs([actual], created)[0]
+        self.jobs.append((start, finish, estimate))
+        return len(queued) + 1, slots[-1][1], start
+
+
+def generate_customers(cursor, first_id, count, now):
+    """Customers share one precomputed bcrypt hash (password: synthetic123)"""
+    password_hash = crud.get_password_hash("synthetic123")
+    created = timestamps(np.full(count, now.timestamp()))
+    rows = [(first_id + n, f"Synthetic Customer {first_id + n}", f"customer{first_id + n}@synthetic.local", None,
+             password_hash, "user", "BM" if n % 4 == 0 else "English", 1, created[n]) for n in range(count)]
+    cursor.executemany(insert_sql("users"), rows)
+    return np.arange(first_id, first_id + count)
+
+
+def order_times(rng, orders, start, days):
+    """Sorted creation times: breakfast, lunch and dinner peaks every day"""
+    hours = np.array(list(HOUR_WEIGHTS))
+    hour_p = np.array(list(HOUR_WEIGHTS.values()), dtype=float)
+    hour_p /= hour_p.sum()
+    created = (start + rng.integers(0, days, orders) * 86400 + rng.choice(hours, orders, p=hour_p) * 3600
+               + rng.uniform(0, 3600, orders))
+    return np.sort(created)
+
+
+def generate_chunk(rng, created, ids, menu, item_p, kitchens, customer_ids, customer_p, now_epoch):
+    """Vectorised rows for orders created at `created` (sorted); returns {table: rows} and advances ids"""
+    size = len(created)
+
+    # Orders
+    order_ids = np.arange(ids["orders"], ids["orders"] + size)
+    user_ids = rng.choice(customer_ids, size, p=customer_p)
+
+    # Order items: popular items dominate and orders often span several stalls
+    per_order = rng.choice(ITEMS_PER_ORDER[0], size, p=ITEMS_PER_ORDER[1])
+    item_order = np.repeat(np.arange(size), per_order)
+    n_items = len(item_order)
+    item_ids = np.arange(ids["order_items"], ids["order_items"] + n_items)
+    menu_index = rng.choice(len(menu["id"]), n_items, p=item_p)
+    quantity = rng.choice(QUANTITIES[0], n_items, p=QUANTITIES[1])
+    unit_price = menu["price"][menu_index]
+    total_price = np.round(unit_price * quantity, 2)
+    subtotal = np.round(np.bincount(item_order, weights=total_price, minlength=size), 2)
+    stall_order = np.unique(np.stack([item_order, menu["stall_id"][menu_index]], axis=1), axis=0)
+
+    # Food trackers: one per unit, queued at their stall's kitchen
+    tracker_item = np.repeat(np.arange(n_items), quantity)
+    n_trackers = len(tracker_item)
+    tracker_ids = np.arange(ids["food_trackers"], ids["food_trackers"] + n_trackers)
+    group_start = np.repeat(np.cumsum(quantity) - quantity, quantity)
+    item_number = np.arange(n_trackers) - group_start + 1
+    tracker_order = item_order[tracker_item]
+    tracker_menu = menu_index[tracker_item]
+    tracker_created = created[tracker_order]
+    tracker_stall = menu["stall_id"][tracker_menu]
+    prep_minutes = np.maximum(1, np.round(menu["prep"][tracker_menu])).astype(int)
+    actual_minutes = np.maximum(1.0, prep_minutes * rng.lognormal(0.0, PREP_SPREAD, n_trackers))
+
+    # Orders are sorted by time and tracker ids follow them, so index order is
+    # each stall's service order (created_at, id) and the kitchens carry over
+    queue_position = np.empty(n_trackers, dtype=int)
+    estimated_ready = np.empty(n_trackers)
+    prep_start = np.empty(n_trackers)
+    for n, (stall_id, t, estimate, actual) in enumerate(zip(
+            tracker_stall.tolist(), tracker_created.tolist(), (prep_minutes * 60.0).tolist(),
+            (actual_minutes * 60).tolist())):
+        queue_position[n], estimated_ready[n], prep_start[n] = kitchens[stall_id].take(t, estimate, actual)
+    actual_ready = prep_start + actual_minutes * 60
+    collected = np.minimum(actual_ready + rng.exponential(300, n_trackers), now_epoch)
+
+    order_eta = np.full(size, -np.inf)
+    np.maximum.at(order_eta, tracker_order, estimated_ready)
+    order_done = np.full(size, -np.inf)
+    np.maximum.at(order_done, tracker_order, collected)
+
+    # Notifications: confirmation and "ready" per order, read unless recent
+    notification_ids = np.arange(ids["notifications"], ids["notifications"] + 2 * size)
+    is_read = (now_epoch - created > 86400) | (rng.random(size) < 0.5)
+
+    created_s, eta_s, done_s = timestamps(created), timestamps(order_eta), timestamps(order_done)
+    t_created, t_eta = timestamps(tracker_created), timestamps(estimated_ready)
+    t_start, t_ready, t_collected = timestamps(prep_start), timestamps(actual_ready), timestamps(collected)
+    payment = np.where(rng.random(size) < 0.6, "Online Payment", "Cash at Counter").tolist()
+
+    order_ids_l, user_ids_l = order_ids.tolist(), user_ids.tolist()
+    rows = {
+        "orders": list(zip(
+            order_ids_l, user_ids_l, (f"S{o:09d}" for o in order_ids_l), ["Completed"] * size, payment,
+            subtotal.tolist(), [SERVICE_FEE] * size, np.round(subtotal + SERVICE_FEE, 2).tolist(),
+            eta_s, created_s, done_s
+        )),
+        "order_items": list(zip(
+            item_ids.tolist(), order_ids[item_order].tolist(), menu["id"][menu_index].tolist(),
+            menu["stall_id"][menu_index].tolist(), quantity.tolist(), unit_price.tolist(), total_price.tolist()
+        )),
+        "stall_orders": list(zip(
+            stall_order[:, 1].tolist(), order_ids[stall_order[:, 0]].tolist(), ["Completed"] * len(stall_order),
+            [created_s[n] for n in stall_order[:, 0].tolist()]
+        )),
+        "food_trackers": list(zip(
+            tracker_ids.tolist(), order_ids[tracker_order].tolist(), item_ids[tracker_item].tolist(),
+            menu["id"][tracker_menu].tolist(), tracker_stall.tolist(), item_number.tolist(),
+            ["Collected"] * n_trackers, queue_position.tolist(), t_eta, t_eta, t_ready, t_start,
+            prep_minutes.tolist(), t_created, t_collected
+        )),
+        "notifications": [],
+    }
+    read_l = is_read.astype(int).tolist()
+    for n in range(size):
+        order_number = rows["orders"][n][2]
+        rows["notifications"].append((
+            int(notification_ids[2 * n]), user_ids_l[n], order_ids_l[n], None, "Order Confirmed",
+            f"Your order #{order_number} has been confirmed.", "success", 1, created_s[n]
+        ))
+        rows["notifications"].append((
+            int(notification_ids[2 * n + 1]), user_ids_l[n], order_ids_l[n], None, "Order Ready",
+            f"All items in order #{order_number} are ready for collection.", "food_ready", read_l[n], done_s[n]
+        ))
+
+    ids["orders"] += size
+    ids["order_items"] += n_items
+    ids["food_trackers"] += n_trackers
+    ids["notifications"] += 2 * size
+    return rows
+
+
+def secondary_indexes():
+    return [index for table in TABLES if table != "users" for index in models.Base.metadata.tables[table].indexes]
+
+
+def generate(orders=None, customers=20_000, days=90, stalls=0, chunk_size=50_000, seed=42,
+             defer_indexes=True, analyze=True, progress=print):
+    """Bulk-insert synthetic history; returns row counts and timing.
+
+    orders defaults to what the kitchens serve at DEFAULT_UTILISATION; more
+    than MAX_UTILISATION raises ValueError. stalls adds benchmark stalls
+    (seed_data.seed_scaled_dataset) until the database has that many.
+    """
+    sync_schema()
+    rng = np.random.default_rng(seed)
+    db = SessionLocal()
+    try:
+        missing = stalls - db.query(models.Stall).count()
+        if missing > 0:
+            from seed_data import seed_scaled_dataset
+            progress(f"   🏪 Adding {missing} benchmark stalls...")
+            seed_scaled_dataset(db, stalls=missing, users=0, orders=0, seed=seed)
+        menu = load_menu(db)
+        stations = load_stations(db, menu)
+        ids = next_ids(db)
+    finally:
+        db.close()
+
+    # Popularity: Zipf within each stall's menu, and regular customers
+    item_p = popularity(menu, stations, rng)
+    customer_p = zipf_weights(customers, 0.8, rng)
+
+    capacity = daily_capacity(menu, item_p, stations)
+    if orders is None:
+        orders = int(capacity * DEFAULT_UTILISATION * days)
+    elif orders > capacity * MAX_UTILISATION * days:
+        per_stall = capacity / len(stations)
+        needed = int(np.ceil(orders / days / (per_stall * DEFAULT_UTILISATION)))
+        raise ValueError(
+            f"{orders / days:,.0f} orders a day is more than the kitchens can serve "
+            f"(about {capacity:,.0f} a day flat out); use --stalls {needed} or more --days"
+        )
+    progress(f"   🍳 {orders / days:,.0f} orders a day, {orders / days / capacity:.0%} of kitchen capacity")
+    kitchens = {stall_id: Kitchen(stall_id, count) for stall_id, count in stations.items()}
+
+    now = datetime.now().replace(microsecond=0)
+    start = (now - timedelta(days=days)).replace(hour=0, minute=0, second=0).timestamp()
+    created = order_times(rng, orders, start, days)
+    counts = dict.fromkeys(TABLES, 0)
+    started = time.perf_counter()
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        if engine.dialect.name == "sqlite":
+            cursor.execute("PRAGMA synchronous=OFF")
+            cursor.execute("PRAGMA cache_size=-200000")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+
+        indexes = secondary_indexes() if defer_indexes else []
+        with engine.begin() as conn:
+            for index in indexes:
+                index.drop(conn, checkfirst=True)
+
+        customer_ids = generate_customers(cursor, ids["users"], customers, now)
+        raw.commit()
+        counts["users"] = customers
+
+        done = 0
+        while done < orders:
+            size = min(chunk_size, orders - done)
+            rows = generate_chunk(rng, created[done:done + size], ids, menu, item_p, kitchens,
+                                  customer_ids, customer_p, now.timestamp())
+            for table, table_rows in rows.items():
+                cursor.executemany(insert_sql(table), table_rows)
+                counts[table] += len(table_rows)
+            raw.commit()
+            done += size
+            elapsed = time.perf_counter() - started
+            progress(f"   📦 {done:,}/{orders:,} orders ({done / elapsed:,.0f} orders/s)")
+
+        load_seconds = time.perf_counter() - started
+        if indexes:
+            progress(f"   🔧 Rebuilding {len(indexes)} indexes...")
+            with engine.begin() as conn:
+                for index in indexes:
+                    index.create(conn, checkfirst=True)
+        if analyze and engine.dialect.name == "sqlite":
+            cursor.execute("ANALYZE")
+            raw.commit()
+    finally:
+        raw.close()
+
+    return {
+        "rows": counts,
+        "load_seconds": round(load_seconds, 1),
+        "total_seconds": round(time.perf_counter() - started, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-generate synthetic PPUM Café order history")
+    parser.add_argument("--orders", type=int, help="Default: what the stalls' kitchens comfortably serve")
+    parser.add_argument("--customers", type=int, default=20_000)
+    parser.add_argument("--days", type=int, default=90, help="Spread orders over this many past days")
+    parser.add_argument("--stalls", type=int, default=0, help="Add benchmark stalls until there are this many")
+    parser.add_argument("--chunk-size", type=int, default=50_000, help="Orders per transaction")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep-indexes", action="store_true",
+                        help="Maintain indexes during the load instead of rebuilding them at the end")
+    parser.add_argument("--no-analyze", action="store_true", help="Skip ANALYZE after loading")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🏭 PPUM Café Synthetic Data Generator")
+    print("=" * 60)
+    print(f"   Database: {engine.url}")
+    try:
+        result = generate(orders=args.orders, customers=args.customers, days=args.days, stalls=args.stalls,
+                          chunk_size=args.chunk_size, seed=args.seed,
+                          defer_indexes=not args.keep_indexes, analyze=not args.no_analyze)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print()
+    for table, count in result["rows"].items():
+        print(f"   {table:<16}{count:>14,}")
+    total = sum(result["rows"].values())
+    print(f"\n✅ {total:,} rows in {result['total_seconds']}s "
+          f"({total / max(result['load_seconds'], 0.001):,.0f} rows/s while loading)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Bulk Menu Import/Export
+Imports menu items from CSV or JSONL (upserting by stall and name, in
+batches) and exports the menu in the same formats.
+Usage: python cli/menu_transfer.py import menu.csv [--stall-id 3] [--dry-run]
+       python cli/menu_transfer.py export menu.jsonl [--stall-id 3]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import SessionLocal, sync_schema
+import menu_io
+
+
+def import_file(path, fmt=None, stall_id=None, dry_run=False, batch_size=menu_io.BATCH_SIZE):
+    fmt = menu_io.detect_format(path, fmt)
+    sync_schema()
+    db = SessionLocal()
+    try:
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            rows = menu_io.iter_rows(f, fmt)
+            return menu_io.import_menu(db, rows, stall_id=stall_id, batch_size=batch_size, dry_run=dry_run)
+    finally:
+        db.close()
+
+
+def export_file(path, fmt=None, stall_id=None):
+    fmt = menu_io.detect_format(path, fmt)
+    sync_schema()
+    db = SessionLocal()
+    exported = 0
+
+    def rows():
+        nonlocal exported
+        for row in menu_io.export_rows(db, stall_id=stall_id):
+            exported += 1
+            yield row
+
+    try:
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            for chunk in menu_io.export_lines(rows(), fmt):
+                f.write(chunk)
+    finally:
+        db.close()
+    return exported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import or export PPUM Café menu items as CSV or JSONL")
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("path", help="File to read or write (.csv, .jsonl)")
+    parser.add_argument("--format", choices=menu_io.FORMATS, help="Override the format implied by the file name")
+    parser.add_argument("--stall-id", type=int, help="Only this stall's items (import rows default to it)")
+    parser.add_argument("--dry-run", action="store_true", help="Validate an import without writing")
+    parser.add_argument("--batch-size", type=int, default=menu_io.BATCH_SIZE)
+    parser.add_argument("--json", action="store_true", help="Print the import report as JSON")
+    args = parser.parse_args()
+
+    try:
+        if args.action == "export":
+            count = export_file(args.path, args.format, args.stall_id)
+            print(f"✅ Exported {count} menu items to {args.path}")
+            return
+
+        report = import_file(args.path, args.format, args.stall_id, args.dry_run, args.batch_size)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps(report.to_dict(), indent=2))
+    else:
+        prefix = "🔍 Dry run: " if args.dry_run else "✅ "
+        print(f"{prefix}{report.rows} rows, {report.created} created, {report.updated} updated, "
+              f"{report.error_count} errors")
+        for error in report.errors:
+            print(f"   ❌ Row {error['row']}: {error['error']}")
+    if report.error_count:
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
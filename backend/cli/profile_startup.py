@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+API Startup Profiler
+Reports where cold-start time goes: import time per module (from
+`python -X importtime`, in a fresh interpreter) and, with --startup, how long
+building the app, running the lifespan startup and warming caches take.
+Usage: python cli/profile_startup.py [--top 25] [--startup]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Add parent directory to path to import backend modules
+sys.path.append(BACKEND_DIR)
+
+
+def import_profile(statement="import main; main.create_app()"):
+    """Run statement under -X importtime; returns [(module, self µs, cumulative µs)] and wall seconds"""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed")
+
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules, elapsed
+
+
+def by_package(modules):
+    """Self time summed per top-level package, largest first"""
+    totals = {}
+    for name, self_us, _ in modules:
+        package = name.split(".")[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def startup_profile(timeout=30.0):
+    """Time create_app, the lifespan startup and the wait for /api/ready in this process"""
+    from fastapi.testclient import TestClient
+
+    timings = {}
+    started = time.perf_counter()
+    import main
+    timings["import main"] = time.perf_counter() - started
+
+    mark = time.perf_counter()
+    app = main.create_app()
+    timings["create_app()"] = time.perf_counter() - mark
+
+    mark = time.perf_counter()
+    with TestClient(app) as client:
+        timings["lifespan startup"] = time.perf_counter() - mark
+        mark = time.perf_counter()
+        while client.get("/api/ready").status_code != 200:
+            if time.perf_counter() - mark > timeout:
+                raise RuntimeError(f"/api/ready did not report ready within {timeout:.0f}s")
+            time.sleep(0.01)
+        timings["cache warm-up"] = time.perf_counter() - mark
+    timings["total to ready"] = time.perf_counter() - started
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile PPUM Café API cold start")
+    parser.add_argument("--top", type=int, default=25, help="Modules to list by cumulative import time")
+    parser.add_argument("--startup", action="store_true",
+                        help="Also run the lifespan startup against DATABASE_URL and wait for /api/ready")
+    args = parser.parse_args()
+
+    try:
+        print("⏱️  Profiling imports (python -X importtime)...")
+        modules, elapsed = import_profile()
+        total_us = sum(self_us for _, self_us, _ in modules)
+
+        print(f"\n📦 Slowest imports (cumulative ms, self ms):")
+        for name, self_us, cumulative_us in sorted(modules, key=lambda m: m[2], reverse=True)[:args.top]:
+            print(f"   {name:<48}{cumulative_us / 1000:>9.1f}{self_us / 1000:>9.1f}")
+
+        print(f"\n📊 Import time by package (self ms):")
+        for package, self_us in by_package(modules)[:args.top]:
+            print(f"   {package:<32}{self_us / 1000:>9.1f}  {100 * self_us / total_us:>5.1f}%")
+
+        print(f"\n✅ {len(modules)} modules imported in {total_us / 1e6:.2f}s "
+              f"({elapsed:.2f}s including interpreter start)")
+
+        if args.startup:
+            print(f"\n🚀 Startup phases (seconds):")
+            for phase, seconds in startup_profile().items():
+                print(f"   {phase:<32}{seconds:>9.3f}")
+
+    except (RuntimeError, OSError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
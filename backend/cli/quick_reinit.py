@@ -11,7 +11,6 @@ import sys
 # Add parent directory to path to import backend modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from datetime import datetime
 from reinit_database import reinit_database, check_database_exists
 
 def quick_reinit():
@@ -25,9 +24,8 @@ def quick_reinit():
     if db_exists:
         print("📊 Existing database found - will clear and reseed")
         
-        # Create backup with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        print(f"💾 Creating backup: ppum_cafe_backup_{timestamp}.db")
+        # Online backup into BACKUP_DIR (see cli/backup_database.py)
+        print("💾 Creating backup before clearing data")
         
         # Use clear_data method (faster)
         method = "clear_data"
@@ -20,15 +20,24 @@ def clear_all_data():
         print("   - Clearing notifications...")
         db.query(models.Notification).delete()
         
+        print("   - Clearing stall orders...")
+        db.query(models.StallOrder).delete()
+        
         print("   - Clearing food trackers...")
         db.query(models.FoodTracker).delete()
         
         print("   - Clearing order items...")
         db.query(models.OrderItem).delete()
         
+        print("   - Clearing idempotency keys...")
+        db.query(models.IdempotencyKey).delete()
+        
         print("   - Clearing orders...")
         db.query(models.Order).delete()
         
+        print("   - Clearing availability windows...")
+        db.query(models.AvailabilityWindow).delete()
+        
         print("   - Clearing menu items...")
         db.query(models.MenuItem).delete()
         
@@ -74,17 +83,12 @@ def check_database_exists():
     return os.path.exists(db_file)
 
 def backup_database():
-    """Create a backup of the current database"""
-    import shutil
-    from datetime import datetime
+    """Create an online backup of the current database (safe while the API is running)"""
+    import backup
     
-    db_file = "ppum_cafe.db"
-    if os.path.exists(db_file):
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_file = f"ppum_cafe_backup_{timestamp}.db"
-        
+    if check_database_exists():
         try:
-            shutil.copy2(db_file, backup_file)
+            backup_file = backup.create_backup()
             print(f"✅ Database backed up to: {backup_file}")
             return backup_file
         except Exception as e:
@@ -14,10 +14,11 @@ from sqlalchemy.orm import Session
 from database import SessionLocal, engine
 import models
 import crud
+import cascade
 from datetime import datetime
 
 def reset_orders_only():
-    """Reset only orders, order_items, food_trackers, and notifications"""
+    """Reset only orders, order_items, food_trackers, notifications and idempotency keys"""
     db = SessionLocal()
     
     try:
@@ -27,12 +28,18 @@ def reset_orders_only():
         print("   - Clearing notifications...")
         db.query(models.Notification).delete()
         
+        print("   - Clearing stall orders...")
+        db.query(models.StallOrder).delete()
+        
         print("   - Clearing food trackers...")
         db.query(models.FoodTracker).delete()
         
         print("   - Clearing order items...")
         db.query(models.OrderItem).delete()
         
+        print("   - Clearing idempotency keys...")
+        db.query(models.IdempotencyKey).delete()
+        
         print("   - Clearing orders...")
         db.query(models.Order).delete()
         
@@ -53,11 +60,12 @@ def reset_menu_items_only():
     try:
         print("🔄 Resetting menu items...")
         
-        # Clear menu items (this will cascade to order_items if there are any)
+        # Order items and food trackers referencing the menu go with it
         print("   - Clearing menu items...")
-        db.query(models.MenuItem).delete()
+        menu_item_ids = [item_id for (item_id,) in db.query(models.MenuItem.id).execution_options(include_deleted=True)]
+        for table, count in cascade.delete(db, models.MenuItem, menu_item_ids).items():
+            print(f"     {table}: {count} rows")
         
-        db.commit()
         print("✅ Menu items reset successfully!")
         
     except Exception as e:
@@ -78,12 +86,18 @@ def reset_users_only():
         print("   - Clearing notifications...")
         db.query(models.Notification).delete()
         
+        print("   - Clearing stall orders...")
+        db.query(models.StallOrder).delete()
+        
         print("   - Clearing food trackers...")
         db.query(models.FoodTracker).delete()
         
         print("   - Clearing order items...")
         db.query(models.OrderItem).delete()
         
+        print("   - Clearing idempotency keys...")
+        db.query(models.IdempotencyKey).delete()
+        
         print("   - Clearing orders...")
         db.query(models.Order).delete()
         
@@ -107,8 +121,8 @@ def reseed_users_only():
     try:
         print("🌱 Reseeding users...")
         
-        # Get existing stalls for stall owners
-        stalls = db.query(models.Stall).all()
+        # Get existing stalls for stall owners, skipping deleted ones
+        stalls = db.query(models.Stall).order_by(models.Stall.id).all()
         
         if not stalls:
             print("⚠️  No stalls found! Please reseed stalls first.")
@@ -212,10 +226,12 @@ def get_database_stats():
     try:
         stats = {
             "users": db.query(models.User).count(),
-            "stalls": db.query(models.Stall).count(),
-            "menu_items": db.query(models.MenuItem).count(),
+            "stalls": db.query(models.Stall).execution_options(include_deleted=True).count(),
+            "menu_items": db.query(models.MenuItem).execution_options(include_deleted=True).count(),
+            "availability_windows": db.query(models.AvailabilityWindow).count(),
             "orders": db.query(models.Order).count(),
             "order_items": db.query(models.OrderItem).count(),
+            "stall_orders": db.query(models.StallOrder).count(),
             "food_trackers": db.query(models.FoodTracker).count(),
             "notifications": db.query(models.Notification).count()
         }
@@ -228,15 +244,15 @@ def get_database_stats():
 def print_database_stats():
     """Print current database statistics"""
     print("\n📊 Current Database Statistics:")
-    print("=" * 35)
+    print("=" * 40)
     
     stats = get_database_stats()
     
     for table, count in stats.items():
-        print(f"   {table.replace('_', ' ').title():<15}: {count:>4}")
+        print(f"   {table.replace('_', ' ').title():<20}: {count:>4}")
     
     total_records = sum(stats.values())
-    print(f"   {'Total Records':<15}: {total_records:>4}")
+    print(f"   {'Total Records':<20}: {total_records:>4}")
 
 def main():
     """Interactive utility menu"""
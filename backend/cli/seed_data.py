@@ -1,6 +1,8 @@
 import asyncio
 import os
+import random
 import sys
+from datetime import datetime, timedelta
 
 # Add parent directory to path to import backend modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -367,5 +369,114 @@ def seed_database():
     finally:
         db.close()
 
+CUISINES = [
+    ("Malay", "Melayu", ["Nasi Lemak", "Mee Goreng", "Rendang", "Soto", "Laksa"]),
+    ("Western", "Barat", ["Chicken Chop", "Fish and Chips", "Spaghetti", "Burger", "Salad"]),
+    ("Chinese", "Cina", ["Chicken Rice", "Wonton Mee", "Fried Rice", "Char Kuey Teow", "Dumplings"]),
+    ("Indian", "India", ["Roti Canai", "Thosai", "Nasi Briyani", "Curry Mee", "Vegetable Curry"]),
+]
+
+def seed_scaled_dataset(db, stalls=8, items_per_stall=25, users=200, orders=2000, seed=42):
+    """Seed a larger, realistic dataset for benchmarks and load tests.
+
+    Every account shares one precomputed password hash and rows are added in
+    bulk, so this stays fast at thousands of orders. Returns the ids needed
+    to drive load scenarios.
+    """
+    rng = random.Random(seed)
+    password_hash = crud.get_password_hash("bench123")
+    
+    db_stalls = []
+    for n in range(stalls):
+        cuisine, cuisine_bm, _ = CUISINES[n % len(CUISINES)]
+        db_stalls.append(models.Stall(
+            name=f"{cuisine} Stall {n + 1}",
+            name_bm=f"Gerai {cuisine_bm} {n + 1}",
+            cuisine_type=cuisine,
+            cuisine_type_bm=cuisine_bm,
+            description=f"{cuisine} favourites from stall {n + 1}",
+            description_bm=f"Hidangan {cuisine_bm} dari gerai {n + 1}",
+            rating=round(rng.uniform(3.5, 5.0), 1),
+            average_prep_time=rng.randint(8, 15)
+        ))
+    db.add_all(db_stalls)
+    db.flush()
+    
+    db_items = []
+    for n, stall in enumerate(db_stalls):
+        dishes = CUISINES[n % len(CUISINES)][2]
+        for i in range(items_per_stall):
+            dish = dishes[i % len(dishes)]
+            db_items.append(models.MenuItem(
+                stall_id=stall.id,
+                name=f"{dish} {i + 1}",
+                description=f"House {dish.lower()} number {i + 1}",
+                price=round(rng.uniform(4.0, 18.0), 2),
+                category=rng.choice(["Main Course", "Noodles", "Rice", "Snacks", "Drinks"]),
+                is_best_seller=i == 0,
+                base_prep_time=rng.randint(3, 15),
+                complexity_multiplier=round(rng.uniform(0.5, 1.5), 1),
+                calories=rng.randint(150, 900),
+                allergens=rng.sample(["Gluten", "Dairy", "Nuts", "Egg", "Shellfish"], k=rng.randint(0, 2))
+            ))
+    db.add_all(db_items)
+    
+    owners = [
+        models.User(name=f"Owner {n + 1}", email=f"owner{stall.id}@bench.local", password_hash=password_hash,
+                    role="stall_owner", stall_id=stall.id)
+        for n, stall in enumerate(db_stalls)
+    ]
+    customers = [
+        models.User(name=f"Customer {n + 1}", email=f"customer{n + 1}@bench.local", password_hash=password_hash)
+        for n in range(users)
+    ]
+    db.add_all(owners + customers)
+    db.flush()
+    
+    # Popular items get most of the orders
+    weights = [1.0 / (i % items_per_stall + 1) for i in range(len(db_items))]
+    now = datetime.now()
+    for n in range(orders):
+        created_at = now - timedelta(minutes=rng.randint(0, 7 * 24 * 60))
+        picked = rng.choices(db_items, weights=weights, k=rng.randint(1, 3))
+        order = models.Order(
+            user_id=rng.choice(customers).id,
+            order_number=f"{n:06d}",
+            status="Completed",
+            payment_method=rng.choice(["Online Payment", "Cash at Counter"]),
+            subtotal=0,
+            service_fee=1.50,
+            total_amount=0,
+            created_at=created_at
+        )
+        for item in picked:
+            quantity = rng.randint(1, 2)
+            order_item = models.OrderItem(menu_item_id=item.id, stall_id=item.stall_id, quantity=quantity,
+                                          unit_price=item.price, total_price=item.price * quantity)
+            order.order_items.append(order_item)
+            order.subtotal += order_item.total_price
+            for item_number in range(1, quantity + 1):
+                prep_start = created_at + timedelta(minutes=rng.randint(0, 10))
+                prep_minutes = max(int(item.base_prep_time * item.complexity_multiplier), 3)
+                ready = prep_start + timedelta(minutes=prep_minutes * rng.uniform(0.8, 1.4))
+                order_item.food_trackers.append(models.FoodTracker(
+                    order=order, menu_item_id=item.id, stall_id=item.stall_id, item_number=item_number,
+                    status="Collected", queue_position=item_number, estimated_ready_time=ready,
+                    prep_start_time=prep_start, actual_ready_time=ready, prep_duration_minutes=prep_minutes,
+                    created_at=created_at
+                ))
+        for stall_id in {item.stall_id for item in picked}:
+            order.stall_orders.append(models.StallOrder(stall_id=stall_id, status="Completed", created_at=created_at))
+        order.total_amount = order.subtotal + order.service_fee
+        db.add(order)
+    db.commit()
+    
+    return {
+        "stall_ids": [stall.id for stall in db_stalls],
+        "menu_item_ids": [item.id for item in db_items],
+        "owner_emails": [owner.email for owner in owners],
+        "customer_emails": [customer.email for customer in customers],
+    }
+
 if __name__ == "__main__":
     seed_database() 
\ No newline at end of file
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Kitchen Capacity Simulator
+Replays a day of food trackers through the stall queue model with different
+numbers of parallel stations to help size staffing.
+Usage: python cli/simulate_kitchen.py [--date 2025-01-31] [--max-stations 6] [--target-wait 10]
+       python cli/simulate_kitchen.py --benchmark 2000
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from database import SessionLocal, sync_schema
+import models
+import kitchen_queue
+
+
+def load_day(db, day):
+    """Load (arrival, prep seconds) per stall for trackers created on a day"""
+    # Deleted stalls still have trackers on past days
+    stalls = {stall.id: stall for stall in db.query(models.Stall).execution_options(include_deleted=True)}
+    start = datetime.combine(day, datetime.min.time())
+    rows = db.query(
+        models.FoodTracker.stall_id,
+        models.FoodTracker.created_at,
+        models.FoodTracker.prep_start_time,
+        models.FoodTracker.actual_ready_time,
+        models.FoodTracker.prep_duration_minutes,
+    ).filter(
+        models.FoodTracker.created_at >= start,
+        models.FoodTracker.created_at < start + timedelta(days=1)
+    ).order_by(models.FoodTracker.created_at, models.FoodTracker.id).all()
+
+    by_stall = {}
+    for stall_id, created_at, prep_start, ready, planned_minutes in rows:
+        if prep_start and ready:
+            duration = (ready - prep_start).total_seconds()
+        elif planned_minutes:
+            duration = planned_minutes * 60
+        else:
+            duration = (stalls[stall_id].average_prep_time or 10) * 60
+        by_stall.setdefault(stall_id, ([], []))
+        by_stall[stall_id][0].append(created_at.timestamp())
+        by_stall[stall_id][1].append(duration)
+    return stalls, by_stall
+
+
+def latest_day(db):
+    latest = db.query(models.FoodTracker.created_at).order_by(models.FoodTracker.created_at.desc()).first()
+    return latest[0].date() if latest else None
+
+
+def size_stall(arrivals, durations, max_stations, target_wait):
+    """Simulate 1..max_stations and report waits and utilisation for each"""
+    options = []
+    busy = float(np.sum(durations))
+    for stations in range(1, max_stations + 1):
+        waits, finishes = kitchen_queue.simulate(arrivals, durations, stations)
+        waits = np.asarray(waits) / 60
+        span = max(max(finishes) - arrivals[0], 1.0) if finishes else 1.0
+        options.append({
+            "stations": stations,
+            "mean_wait_minutes": round(float(waits.mean()), 1),
+            "p95_wait_minutes": round(float(np.percentile(waits, 95)), 1),
+            "max_wait_minutes": round(float(waits.max()), 1),
+            "utilisation": round(busy / (stations * span), 2),
+        })
+    recommended = next((o["stations"] for o in options if o["p95_wait_minutes"] <= target_wait), max_stations)
+    return options, recommended
+
+
+def run_simulation(day=None, max_stations=6, target_wait=10.0):
+    sync_schema()
+    db = SessionLocal()
+    try:
+        day = day or latest_day(db)
+        if day is None:
+            raise ValueError("No food trackers found to replay")
+        stalls, by_stall = load_day(db, day)
+    finally:
+        db.close()
+
+    report = {"date": day.isoformat(), "target_p95_wait_minutes": target_wait, "stalls": []}
+    for stall_id, (arrivals, durations) in sorted(by_stall.items()):
+        options, recommended = size_stall(arrivals, durations, max_stations, target_wait)
+        report["stalls"].append({
+            "stall_id": stall_id,
+            "name": stalls[stall_id].name,
+            "items": len(arrivals),
+            "current_stations": kitchen_queue.stall_stations(stalls[stall_id]),
+            "recommended_stations": recommended,
+            "options": options,
+        })
+    return report
+
+
+def benchmark(orders, stall_count=4, items_per_stall=10, seed=42):
+    """Place orders through crud.create_order_with_tracking on a throwaway database.
+
+    Reports end-to-end orders per second and the share of that time spent
+    in kitchen_queue.plan_order. The live database is never touched.
+    """
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.exc import IntegrityError
+    from sqlalchemy.orm import sessionmaker
+    import database
+    import crud
+    import schemas
+    from seed_data import seed_scaled_dataset
+
+    workdir = tempfile.mkdtemp(prefix="ppum_kitchen_bench_")
+    engine = create_engine(f"sqlite:///{os.path.join(workdir, 'bench.db')}", connect_args={"check_same_thread": False})
+    event.listen(engine, "connect", database._configure_sqlite)
+    database.sync_schema(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = Session()
+
+    plan_order = kitchen_queue.plan_order
+    plan_seconds = 0.0
+
+    def timed_plan_order(*args, **kwargs):
+        nonlocal plan_seconds
+        started = time.perf_counter()
+        try:
+            return plan_order(*args, **kwargs)
+        finally:
+            plan_seconds += time.perf_counter() - started
+
+    try:
+        dataset = seed_scaled_dataset(db, stalls=stall_count, items_per_stall=items_per_stall, users=50, orders=0, seed=seed)
+        user_ids = [user_id for (user_id,) in db.query(models.User.id).filter(models.User.role == "user")]
+        rng = random.Random(seed)
+        workload = [
+            schemas.OrderCreate(
+                user_id=rng.choice(user_ids),
+                payment_method="Cash at Counter",
+                items=[schemas.OrderItemCreate(menu_item_id=menu_item_id, quantity=rng.randint(1, 2))
+                       for menu_item_id in rng.sample(dataset["menu_item_ids"], rng.randint(1, 4))]
+            )
+            for _ in range(orders)
+        ]
+
+        kitchen_queue.plan_order = timed_plan_order
+        retries = 0
+        started = time.perf_counter()
+        for order in workload:
+            # One session per order, like one per request
+            with Session() as order_db:
+                while True:
+                    try:
+                        crud.create_order_with_tracking(order_db, order)
+                        break
+                    except IntegrityError:
+                        # Random 4-digit order numbers collide once a few hundred orders exist
+                        order_db.rollback()
+                        retries += 1
+        elapsed = time.perf_counter() - started
+    finally:
+        kitchen_queue.plan_order = plan_order
+        db.close()
+        engine.dispose()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "orders": orders,
+        "seconds": round(elapsed, 3),
+        "orders_per_second": round(orders / elapsed, 1),
+        "plan_order_ms_per_order": round(plan_seconds * 1000 / orders, 3),
+        "plan_order_share": round(plan_seconds / elapsed, 3),
+        "order_number_retries": retries,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a day of orders through the kitchen queue model")
+    parser.add_argument("--date", type=lambda s: datetime.strptime(s, "%Y-%m-%d").date(), help="Day to replay (default: latest)")
+    parser.add_argument("--max-stations", type=int, default=6, help="Largest station count to try")
+    parser.add_argument("--target-wait", type=float, default=10.0, help="Acceptable P95 wait in minutes")
+    parser.add_argument("--benchmark", type=int, metavar="ORDERS", help="Time placing this many orders on a scratch database instead")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print(json.dumps(benchmark(args.benchmark), indent=2))
+        return
+
+    try:
+        report = run_simulation(args.date, args.max_stations, args.target_wait)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print("=" * 60)
+    print(f"👩‍🍳 Kitchen Capacity Simulation for {report['date']}")
+    print("=" * 60)
+    for stall in report["stalls"]:
+        print(f"\n🏪 {stall['name']} - {stall['items']} items "
+              f"(stations now: {stall['current_stations']}, recommended: {stall['recommended_stations']})")
+        print(f"   {'Stations':>8}{'Mean wait':>12}{'P95 wait':>12}{'Max wait':>12}{'Util':>8}")
+        for option in stall["options"]:
+            print(f"   {option['stations']:>8}{option['mean_wait_minutes']:>12}"
+                  f"{option['p95_wait_minutes']:>12}{option['max_wait_minutes']:>12}{option['utilisation']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,18 @@
 #!/usr/bin/env python3
 """
 API Testing Script for PPUM Café Backend
-Tests authentication, protected endpoints, and role-based access.
+Tests authentication, protected endpoints, and role-based access, and
+checks per-request SQL query budgets in-process.
 """
 
 import os
+import sqlite3
 import sys
+import tempfile
 
 # Add parent directory to path to import backend modules
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
 
 import requests
 import json
@@ -17,6 +21,14 @@ from datetime import datetime
 # Base URL for the API
 BASE_URL = "http://localhost:8000"
 
+# Most SQL statements a request may run (counted by instrumentation.py); an N+1 shows up here first
+QUERY_BUDGETS = {
+    "GET /api/stalls/": 2,
+    "POST /api/orders/ (1 item)": 30,
+    "POST /api/orders/ (3 items, 3 stalls)": 45,
+    "PUT /api/stall-owner/food-trackers/{id}/status": 20,
+}
+
 def test_health_endpoint():
     """Test the health check endpoint"""
     try:
@@ -85,6 +97,62 @@ def test_search_endpoints():
         print(f"Search Endpoints Failed: {e}")
         return False
 
+def test_query_budgets():
+    """Check SQL query budgets through the in-process client, on a scratch copy of the database"""
+    scratch = tempfile.TemporaryDirectory()
+    try:
+        # Orders placed here must not land in the real database
+        source = sqlite3.connect(os.path.join(BACKEND_DIR, "ppum_cafe.db"))
+        copy_path = os.path.join(scratch.name, "ppum_cafe.db")
+        with sqlite3.connect(copy_path) as target:
+            source.backup(target)
+        source.close()
+        os.environ["DATABASE_URL"] = f"sqlite:///{copy_path}"
+        
+        from fastapi.testclient import TestClient
+        import main as app_main
+        from instrumentation import assert_max_queries
+        
+        def check(name, response):
+            if response.status_code != 200:
+                raise AssertionError(f"{name} returned {response.status_code}: {response.text[:200]}")
+            count = assert_max_queries(response, QUERY_BUDGETS[name])
+            print(f"  {name}: {count} queries (budget {QUERY_BUDGETS[name]})")
+        
+        with TestClient(app_main.app) as client:
+            check("GET /api/stalls/", client.get("/api/stalls/"))
+            
+            login = client.post("/api/auth/login", json={"email": "johndoe@email.com", "password": "password123"}).json()
+            headers = {"Authorization": f"Bearer {login['access_token']}"}
+            first_per_stall = {}
+            for item in client.get("/api/menu-items/").json():
+                first_per_stall.setdefault(item["stall_id"], item["id"])
+            menu_item_ids = list(first_per_stall.values())[:3]
+            for name, ids in (("POST /api/orders/ (1 item)", menu_item_ids[:1]),
+                              ("POST /api/orders/ (3 items, 3 stalls)", menu_item_ids)):
+                order = {"user_id": login["user"]["id"], "payment_method": "Cash at Counter",
+                         "items": [{"menu_item_id": menu_item_id, "quantity": 2} for menu_item_id in ids]}
+                check(name, client.post("/api/orders/", json=order, headers=headers))
+            
+            login = client.post("/api/auth/login", json={"email": "malay.owner@ppumcafe.com", "password": "stall123"}).json()
+            headers = {"Authorization": f"Bearer {login['access_token']}"}
+            queued = [tracker for tracker in client.get("/api/stall-owner/food-trackers", headers=headers).json()
+                      if tracker["status"] == "Queued"]
+            if not queued:
+                raise AssertionError("No queued food tracker to update")
+            check("PUT /api/stall-owner/food-trackers/{id}/status",
+                  client.put(f"/api/stall-owner/food-trackers/{queued[0]['id']}/status?status=Preparing", headers=headers))
+        app_main.engine.dispose()
+        return True
+    except AssertionError as e:
+        print(f"  Over budget: {e}")
+        return False
+    except Exception as e:
+        print(f"Query Budgets Failed: {e}")
+        return False
+    finally:
+        scratch.cleanup()
+
 def main():
     """Run all tests"""
     print("=" * 50)
@@ -97,6 +165,7 @@ def main():
         ("Stalls Endpoint", test_stalls_endpoint),
         ("Menu Items Endpoint", test_menu_items_endpoint),
         ("Search Endpoints", test_search_endpoints),
+        ("Query Budgets", test_query_budgets),
     ]
     
     passed = 0
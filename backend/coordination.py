@@ -0,0 +1,56 @@
+"""
+Cross-process coordination for PPUM Café.
+
+When the API runs with several workers, background jobs that mutate shared
+state (such as the food tracker scheduler) must run in exactly one process.
+Leadership is a row in scheduler_leases that the holder renews before it
+expires; any worker can take over a lease that has lapsed.
+"""
+
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+
+# Identity of this process in leases and events
+PROCESS_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# A leader that misses renewals for this long loses its lease
+LEASE_TTL_SECONDS = int(os.getenv("SCHEDULER_LEASE_TTL_SECONDS", "90"))
+
+TRACKER_SCHEDULER_LEASE = "food_tracker_scheduler"
+BACKUP_LEASE = "database_backup"
+
+
+def try_acquire_lease(db: Session, name: str, ttl_seconds: int = LEASE_TTL_SECONDS, holder: str = PROCESS_ID) -> bool:
+    """Acquire or renew a named lease; returns True while this process holds it"""
+    now = datetime.now()
+    expires_at = now + timedelta(seconds=ttl_seconds)
+    try:
+        updated = db.query(models.SchedulerLease).filter(
+            models.SchedulerLease.name == name,
+            or_(models.SchedulerLease.holder == holder, models.SchedulerLease.expires_at < now)
+        ).update({"holder": holder, "expires_at": expires_at}, synchronize_session=False)
+        if not updated:
+            db.add(models.SchedulerLease(name=name, holder=holder, expires_at=expires_at))
+        db.commit()
+        return True
+    except IntegrityError:
+        # Another live process holds the lease
+        db.rollback()
+        return False
+
+
+def release_lease(db: Session, name: str, holder: str = PROCESS_ID):
+    """Give up a lease on shutdown so another worker can take over at once"""
+    db.query(models.SchedulerLease).filter(
+        models.SchedulerLease.name == name,
+        models.SchedulerLease.holder == holder
+    ).delete(synchronize_session=False)
+    db.commit()
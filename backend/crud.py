@@ -1,21 +1,34 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, and_
+from sqlalchemy.orm import Session, joinedload, selectinload, raiseload
+from sqlalchemy import case, func, and_, insert, or_, select
 from typing import List, Optional
 import models
 import schemas
+import prep_estimator
+import kitchen_queue
+import event_bus
+import soft_delete
+import availability
+import inventory
+import idempotency
 from datetime import datetime, timedelta
 import random
 import string
-from passlib.context import CryptContext
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing (passlib is imported on first use to keep API startup fast)
+_pwd_context = None
+
+def password_context():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return password_context().hash(password)
 
 # Authentication CRUD
 def authenticate_user(db: Session, email: str, password: str):
@@ -91,15 +104,60 @@ def get_users_by_role(db: Session, role: str, skip: int = 0, limit: int = 100):
     ).filter(models.User.role == role).offset(skip).limit(limit).all()
 
 def get_stall_orders(db: Session, stall_id: int, skip: int = 0, limit: int = 100):
-    """Get orders for a specific stall"""
-    return db.query(models.Order).options(
-        joinedload(models.Order.order_items).joinedload(models.OrderItem.menu_item),
-        joinedload(models.Order.order_items).joinedload(models.OrderItem.stall),
-        joinedload(models.Order.food_trackers).joinedload(models.FoodTracker.menu_item),
-        joinedload(models.Order.user)
-    ).join(models.OrderItem).filter(
-        models.OrderItem.stall_id == stall_id
-    ).order_by(models.Order.created_at.desc()).offset(skip).limit(limit).all()
+    """Newest orders with items from a stall, each with only that stall's items, status and ETA"""
+    rows = db.query(models.Order, models.StallOrder.status, models.StallOrder.estimated_ready_time).join(
+        models.StallOrder, models.StallOrder.order_id == models.Order.id
+    ).options(
+        selectinload(models.Order.order_items.and_(models.OrderItem.stall_id == stall_id)).options(
+            _menu_item_brief(joinedload(models.OrderItem.menu_item)),
+            _stall_brief(joinedload(models.OrderItem.stall)),
+            raiseload("*", sql_only=True)
+        ),
+        joinedload(models.Order.user).load_only(models.User.id, models.User.name),
+        raiseload("*", sql_only=True)
+    ).filter(
+        models.StallOrder.stall_id == stall_id
+    ).order_by(models.StallOrder.created_at.desc(), models.StallOrder.order_id.desc()).offset(skip).limit(limit).all()
+    
+    result = []
+    for order, stall_status, stall_ready_time in rows:
+        order_dict = order.__dict__.copy()
+        order_dict['stall_status'] = stall_status
+        order_dict['stall_estimated_ready_time'] = stall_ready_time
+        result.append(order_dict)
+    
+    return result
+
+def backfill_stall_orders(db: Session) -> int:
+    """Index orders placed before stall_orders existed (or written without it), deriving each stall's status"""
+    last_indexed = db.query(func.coalesce(func.max(models.StallOrder.order_id), 0)).scalar_subquery()
+    counts = {
+        status: func.sum(case((models.FoodTracker.status == status, 1), else_=0))
+        for status in ("Ready", "Collected", "Preparing")
+    }
+    total = func.count(models.FoodTracker.id)
+    # _status_from_trackers in SQL, over the trackers of each (order, stall)
+    stall_status = case(
+        (total == 0, models.Order.status),
+        (counts["Collected"] == total, "Completed"),
+        (counts["Ready"] + counts["Collected"] == total, "Ready for Pickup"),
+        (counts["Ready"] + counts["Collected"] > 0, "Partially Ready"),
+        (counts["Preparing"] > 0, "Preparing"),
+        else_="Accepted"
+    )
+    rows = select(
+        models.OrderItem.stall_id, models.Order.id, stall_status, models.Order.created_at
+    ).join(models.Order, models.Order.id == models.OrderItem.order_id).join(
+        models.Stall, models.Stall.id == models.OrderItem.stall_id  # Skip items of stalls deleted before foreign keys were enforced
+    ).outerjoin(
+        models.FoodTracker, models.FoodTracker.order_item_id == models.OrderItem.id
+    ).where(models.Order.id > last_indexed).group_by(models.OrderItem.stall_id, models.Order.id)
+    
+    result = db.execute(insert(models.StallOrder).from_select(
+        ["stall_id", "order_id", "status", "created_at"], rows
+    ).prefix_with("OR IGNORE"))
+    db.commit()
+    return result.rowcount
 
 def get_stall_food_trackers(db: Session, stall_id: int, status: Optional[str] = None):
     """Get food trackers for a specific stall"""
@@ -152,8 +210,28 @@ def get_stalls(db: Session, skip: int = 0, limit: int = 100):
     
     return result
 
-def get_stall(db: Session, stall_id: int):
-    return db.query(models.Stall).filter(models.Stall.id == stall_id).first()
+def get_stall(db: Session, stall_id: int, include_deleted: bool = False):
+    return db.query(models.Stall).execution_options(include_deleted=include_deleted).filter(
+        models.Stall.id == stall_id
+    ).first()
+
+def soft_delete_stall(db: Session, stall: models.Stall):
+    """Hide a stall and its menu; orders keep pointing at both"""
+    now = datetime.now()
+    soft_delete.soft_delete(stall, now)
+    for item in db.query(models.MenuItem).filter(models.MenuItem.stall_id == stall.id):
+        soft_delete.soft_delete(item, now)
+    db.commit()
+
+def restore_stall(db: Session, stall: models.Stall):
+    """Bring back a stall with the menu items that were deleted along with it"""
+    items = db.query(models.MenuItem).execution_options(include_deleted=True).filter(
+        models.MenuItem.stall_id == stall.id, models.MenuItem.deleted_at == stall.deleted_at
+    ).all()
+    for item in items:
+        soft_delete.restore(item)
+    soft_delete.restore(stall)
+    db.commit()
 
 def create_stall(db: Session, stall: schemas.StallCreate):
     db_stall = models.Stall(**stall.model_dump())
@@ -176,8 +254,19 @@ def get_menu_items(db: Session, stall_id: Optional[int] = None, category: Option
     
     return query.all()
 
-def get_menu_item(db: Session, item_id: int):
-    return db.query(models.MenuItem).filter(models.MenuItem.id == item_id).first()
+def get_menu_item(db: Session, item_id: int, include_deleted: bool = False):
+    return db.query(models.MenuItem).execution_options(include_deleted=include_deleted).filter(
+        models.MenuItem.id == item_id
+    ).first()
+
+def soft_delete_menu_item(db: Session, item: models.MenuItem):
+    """Hide a menu item from menus and new orders; order history keeps it"""
+    soft_delete.soft_delete(item)
+    db.commit()
+
+def restore_menu_item(db: Session, item: models.MenuItem):
+    soft_delete.restore(item)
+    db.commit()
 
 def create_menu_item(db: Session, item: schemas.MenuItemCreate):
     db_item = models.MenuItem(**item.model_dump())
@@ -193,40 +282,83 @@ def get_menu_categories(db: Session, stall_id: int):
     return [cat[0] for cat in categories]
 
 def calculate_prep_time(db: Session, menu_item_id: int) -> int:
-    """Calculate dynamic preparation time based on queue and complexity"""
+    """Estimate preparation time from the fitted tracker history model"""
     menu_item = get_menu_item(db, menu_item_id)
     if not menu_item:
         return 10  # Default fallback
     
-    # Base calculation: base_prep_time * complexity_multiplier + queue_factor
-    base_time = menu_item.base_prep_time * menu_item.complexity_multiplier
-    queue_factor = menu_item.current_queue_count * 2  # 2 minutes per item in queue
-    
-    total_time = int(base_time + queue_factor)
-    return max(total_time, 3)  # Minimum 3 minutes
+    return prep_estimator.get_model().prep_minutes(menu_item)
 
 def update_menu_item_queue(db: Session, menu_item_id: int, increment: int):
     """Update the queue count for a menu item"""
-    menu_item = get_menu_item(db, menu_item_id)
+    menu_item = get_menu_item(db, menu_item_id, include_deleted=True)
     if menu_item:
         menu_item.current_queue_count = max(0, menu_item.current_queue_count + increment)
         db.commit()
 
+# Availability window CRUD (evaluated in memory by availability.py)
+def get_availability_windows(db: Session, stall_id: int):
+    return db.query(models.AvailabilityWindow).filter(
+        models.AvailabilityWindow.stall_id == stall_id
+    ).order_by(models.AvailabilityWindow.menu_item_id, models.AvailabilityWindow.start_time).all()
+
+def get_availability_window(db: Session, window_id: int, stall_id: int):
+    return db.query(models.AvailabilityWindow).filter(
+        models.AvailabilityWindow.id == window_id,
+        models.AvailabilityWindow.stall_id == stall_id
+    ).first()
+
+def _check_availability_window(db: Session, stall_id: int, window: schemas.AvailabilityWindowCreate):
+    if window.weekdays is not None and any(day not in availability.WEEKDAYS for day in window.weekdays):
+        raise ValueError("weekdays must be numbers from 0 (Monday) to 6 (Sunday)")
+    if window.menu_item_id is not None:
+        item = get_menu_item(db, window.menu_item_id)
+        if not item or item.stall_id != stall_id:
+            raise ValueError(f"Menu item {window.menu_item_id} not found in this stall")
+
+def create_availability_window(db: Session, stall_id: int, window: schemas.AvailabilityWindowCreate):
+    """Add a window; every worker reloads its schedule index"""
+    _check_availability_window(db, stall_id, window)
+    db_window = models.AvailabilityWindow(stall_id=stall_id, **window.model_dump())
+    db.add(db_window)
+    event_bus.publish(db, "availability.changed", stall_id=stall_id)
+    db.commit()
+    db.refresh(db_window)
+    return db_window
+
+def update_availability_window(db: Session, db_window: models.AvailabilityWindow, window: schemas.AvailabilityWindowCreate):
+    _check_availability_window(db, db_window.stall_id, window)
+    for field, value in window.model_dump().items():
+        setattr(db_window, field, value)
+    event_bus.publish(db, "availability.changed", stall_id=db_window.stall_id)
+    db.commit()
+    db.refresh(db_window)
+    return db_window
+
+def delete_availability_window(db: Session, db_window: models.AvailabilityWindow):
+    db.delete(db_window)
+    event_bus.publish(db, "availability.changed", stall_id=db_window.stall_id)
+    db.commit()
+
 # Order CRUD
 def generate_order_number():
     """Generate a unique order number"""
     return ''.join(random.choices(string.digits, k=4))
 
-def create_order_with_tracking(db: Session, order_data: schemas.OrderCreate):
-    """Create order with individual food item tracking"""
+def create_order_with_tracking(db: Session, order_data: schemas.OrderCreate,
+                               idempotency_key: Optional[models.IdempotencyKey] = None):
+    """Create order with individual food item tracking (committed together with its idempotency key, if any)"""
     # Calculate totals
     subtotal = 0
     order_items_data = []
+    menu_on_now = availability.current(db)
     
     for item in order_data.items:
         menu_item = get_menu_item(db, item.menu_item_id)
         if not menu_item:
             raise ValueError(f"Menu item {item.menu_item_id} not found")
+        if not menu_on_now.is_open(menu_item.id, menu_item.stall_id):
+            raise ValueError(f"{menu_item.name} is not being served right now")
         
         total_price = menu_item.price * item.quantity
         subtotal += total_price
@@ -240,12 +372,20 @@ def create_order_with_tracking(db: Session, order_data: schemas.OrderCreate):
             "menu_item": menu_item
         })
     
+    # Take the portions before writing anything else; one sold-out item undoes the reservations
+    low_stock = []
+    try:
+        for item_data in order_items_data:
+            left = inventory.reserve(db, item_data["menu_item"], item_data["quantity"])
+            if inventory.crossed_low_stock(item_data["menu_item"], left, item_data["quantity"]):
+                low_stock.append((item_data["menu_item"], left))
+    except (inventory.OutOfStock, inventory.Unavailable):
+        db.rollback()
+        raise
+    
     service_fee = 1.50
     total_amount = subtotal + service_fee
     
-    # Calculate estimated completion time (when all items will be ready)
-    max_completion_time = datetime.now()
-    
     # Create order
     db_order = models.Order(
         user_id=order_data.user_id,
@@ -257,8 +397,22 @@ def create_order_with_tracking(db: Session, order_data: schemas.OrderCreate):
     )
     
     db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
+    db.flush()
+    
+    # Schedule every portion against its stall's current backlog in one pass,
+    # using the fitted prep time coefficients cached in memory
+    prep_model = prep_estimator.get_model()
+    jobs = []
+    for item_data in order_items_data:
+        menu_item = item_data["menu_item"]
+        prep_time = prep_model.prep_minutes(menu_item)
+        item_data["prep_time"] = prep_time
+        jobs.extend([(menu_item.stall, prep_time)] * item_data["quantity"])
+    slots = iter(kitchen_queue.plan_order(db, jobs))
+    
+    # Calculate estimated completion time (when all items will be ready), overall and per stall
+    max_completion_time = datetime.now()
+    stall_ready_times = {}
     
     # Create order items and food trackers
     for item_data in order_items_data:
@@ -272,18 +426,12 @@ def create_order_with_tracking(db: Session, order_data: schemas.OrderCreate):
             total_price=item_data["total_price"]
         )
         db.add(db_order_item)
-        db.commit()
-        db.refresh(db_order_item)
+        db.flush()
         
         # Create individual food trackers for each quantity
         menu_item = item_data["menu_item"]
         for item_number in range(1, item_data["quantity"] + 1):
-            # Calculate prep time and queue position
-            prep_time = calculate_prep_time(db, menu_item.id)
-            queue_position = menu_item.current_queue_count + item_number
-            
-            # Calculate estimated ready time
-            estimated_ready = datetime.now() + timedelta(minutes=prep_time + (queue_position * 2))
+            _, estimated_ready, queue_position = next(slots)
             
             # Create food tracker
             food_tracker = models.FoodTracker(
@@ -293,20 +441,33 @@ def create_order_with_tracking(db: Session, order_data: schemas.OrderCreate):
                 stall_id=menu_item.stall_id,
                 item_number=item_number,
                 queue_position=queue_position,
+                initial_queue_position=queue_position,
                 estimated_ready_time=estimated_ready,
-                prep_duration_minutes=prep_time
+                initial_estimated_ready_time=estimated_ready,
+                prep_duration_minutes=item_data["prep_time"]
             )
             db.add(food_tracker)
             
             # Update max completion time
             if estimated_ready > max_completion_time:
                 max_completion_time = estimated_ready
+            stall_ready_times[menu_item.stall_id] = max(stall_ready_times.get(menu_item.stall_id, estimated_ready), estimated_ready)
         
         # Update menu item queue count
-        update_menu_item_queue(db, menu_item.id, item_data["quantity"])
+        menu_item.current_queue_count = menu_item.current_queue_count + item_data["quantity"]
     
     # Update order with estimated completion time
     db_order.estimated_completion_time = max_completion_time
+    
+    stall_quantities = {}
+    for item_data in order_items_data:
+        stall_quantities[item_data["stall_id"]] = stall_quantities.get(item_data["stall_id"], 0) + item_data["quantity"]
+    for stall_id in stall_quantities:
+        db.add(models.StallOrder(stall_id=stall_id, order_id=db_order.id,
+                                 estimated_ready_time=stall_ready_times[stall_id]))
+    event_bus.publish(db, "order.created", order_id=db_order.id, stall_quantities=stall_quantities)
+    if idempotency_key is not None:
+        idempotency.attach(idempotency_key, db_order.id)
     db.commit()
     
     # Create initial notification
@@ -317,24 +478,64 @@ def create_order_with_tracking(db: Session, order_data: schemas.OrderCreate):
         message=f"Your order #{db_order.order_number} has been confirmed. Estimated completion: {max_completion_time.strftime('%H:%M')}",
         notification_type="success"
     ))
+    for menu_item, left in low_stock:
+        notify_low_stock(db, menu_item, left, db_order.id)
     
     return get_order_with_tracking(db, db_order.id)
 
+def notify_low_stock(db: Session, menu_item: models.MenuItem, left: int, order_id: int):
+    """Warn the stall's owners that an item is running out (order_id is the order that took the stock down)"""
+    owners = db.query(models.User.id).filter(
+        models.User.role == "stall_owner", models.User.stall_id == menu_item.stall_id
+    ).all()
+    for (owner_id,) in owners:
+        create_notification(db, schemas.NotificationCreate(
+            user_id=owner_id,
+            order_id=order_id,
+            title="Low Stock",
+            message=f"Only {left} portions of {menu_item.name} left",
+            notification_type="warning"
+        ))
+
+def _menu_item_brief(loader):
+    return loader.load_only(models.MenuItem.id, models.MenuItem.name, models.MenuItem.name_bm, models.MenuItem.image_url)
+
+def _stall_brief(loader):
+    return loader.load_only(models.Stall.id, models.Stall.name, models.Stall.name_bm)
+
+def order_list_options():
+    """Loader options for order lists (schemas.OrderListItem): names only, never password hashes"""
+    return (
+        selectinload(models.Order.order_items).options(
+            _menu_item_brief(joinedload(models.OrderItem.menu_item)),
+            _stall_brief(joinedload(models.OrderItem.stall)),
+            raiseload("*", sql_only=True)
+        ),
+        joinedload(models.Order.user).load_only(models.User.id, models.User.name),
+        raiseload("*", sql_only=True)
+    )
+
+def order_detail_options():
+    """Loader options for order detail and tracking views (schemas.OrderDetail)"""
+    return order_list_options() + (
+        selectinload(models.Order.food_trackers).options(
+            _menu_item_brief(joinedload(models.FoodTracker.menu_item)),
+            _stall_brief(joinedload(models.FoodTracker.stall)),
+            raiseload("*", sql_only=True)
+        ),
+        selectinload(models.Order.stall_orders).options(
+            _stall_brief(joinedload(models.StallOrder.stall)),
+            raiseload("*", sql_only=True)
+        ),
+    )
+
 def get_orders(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.Order).options(
-        joinedload(models.Order.order_items).joinedload(models.OrderItem.menu_item),
-        joinedload(models.Order.order_items).joinedload(models.OrderItem.stall),
-        joinedload(models.Order.food_trackers).joinedload(models.FoodTracker.menu_item),
-        joinedload(models.Order.user)
-    ).filter(models.Order.user_id == user_id).order_by(models.Order.created_at.desc()).offset(skip).limit(limit).all()
+    return db.query(models.Order).options(*order_list_options()).filter(
+        models.Order.user_id == user_id
+    ).order_by(models.Order.created_at.desc()).offset(skip).limit(limit).all()
 
 def get_order(db: Session, order_id: int):
-    return db.query(models.Order).options(
-        joinedload(models.Order.order_items).joinedload(models.OrderItem.menu_item),
-        joinedload(models.Order.order_items).joinedload(models.OrderItem.stall),
-        joinedload(models.Order.food_trackers).joinedload(models.FoodTracker.menu_item),
-        joinedload(models.Order.user)
-    ).filter(models.Order.id == order_id).first()
+    return db.query(models.Order).options(*order_detail_options()).filter(models.Order.id == order_id).first()
 
 def get_order_with_tracking(db: Session, order_id: int):
     """Get order with detailed food tracking information"""
@@ -342,17 +543,15 @@ def get_order_with_tracking(db: Session, order_id: int):
     if not order:
         return None
     
-    food_trackers = db.query(models.FoodTracker).options(
-        joinedload(models.FoodTracker.menu_item),
-        joinedload(models.FoodTracker.stall)
-    ).filter(models.FoodTracker.order_id == order_id).all()
+    food_trackers = order.food_trackers
     
     return {
         "order": order,
         "food_trackers": food_trackers,
         "ready_items": [ft for ft in food_trackers if ft.status == "Ready"],
         "preparing_items": [ft for ft in food_trackers if ft.status == "Preparing"],
-        "queued_items": [ft for ft in food_trackers if ft.status == "Queued"]
+        "queued_items": [ft for ft in food_trackers if ft.status == "Queued"],
+        "stall_orders": order.stall_orders
     }
 
 def update_food_tracker_status(db: Session, tracker_id: int, status: str):
@@ -361,89 +560,299 @@ def update_food_tracker_status(db: Session, tracker_id: int, status: str):
     if not tracker:
         return None
     
-    old_status = tracker.status
-    tracker.status = status
-    tracker.updated_at = datetime.now()
-    
-    if status == "Preparing" and old_status == "Queued":
-        tracker.prep_start_time = datetime.now()
-    elif status == "Ready" and old_status == "Preparing":
-        tracker.actual_ready_time = datetime.now()
+    update_food_tracker_statuses(db, [(tracker, status)])
+    return tracker
+
+def update_food_tracker_statuses(db: Session, changes, now: Optional[datetime] = None):
+    """Apply (tracker, status) changes in one transaction.
+    
+    Notifications, menu item queue counts, one re-flow per stall and the
+    sub-order and order statuses are written with the status changes in a
+    single commit.
+    """
+    now = now or datetime.now()
+    changed = []
+    finished_counts = {}
+    for tracker, status in changes:
+        old_status = tracker.status
+        tracker.status = status
         
-        # Create notification for ready item
-        create_notification(db, schemas.NotificationCreate(
-            user_id=tracker.order.user_id,
-            order_id=tracker.order_id,
-            food_tracker_id=tracker.id,
-            title="Food Ready! 🍽️",
-            message=f"Your {tracker.menu_item.name} (#{tracker.order.order_number}) is ready for pickup!",
-            notification_type="food_ready"
-        ))
+        if status == "Preparing" and old_status == "Queued":
+            tracker.prep_start_time = now
+        elif status == "Ready" and old_status == "Preparing":
+            tracker.actual_ready_time = now
+            
+            # Create notification for ready item
+            add_notification(db, schemas.NotificationCreate(
+                user_id=tracker.order.user_id,
+                order_id=tracker.order_id,
+                food_tracker_id=tracker.id,
+                title="Food Ready! 🍽️",
+                message=f"Your {tracker.menu_item.name} (#{tracker.order.order_number}) is ready for pickup!",
+                notification_type="food_ready"
+            ))
+            finished_counts[tracker.menu_item_id] = finished_counts.get(tracker.menu_item_id, 0) + 1
+        elif status == "Collected" and old_status == "Ready":
+            # Create notification for collected item
+            add_notification(db, schemas.NotificationCreate(
+                user_id=tracker.order.user_id,
+                order_id=tracker.order_id,
+                food_tracker_id=tracker.id,
+                title="Item Collected ✅",
+                message=f"Your {tracker.menu_item.name} (#{tracker.order.order_number}) has been collected!",
+                notification_type="success"
+            ))
         
-        # Update menu item queue count
-        update_menu_item_queue(db, tracker.menu_item_id, -1)
-    elif status == "Collected" and old_status == "Ready":
-        # Create notification for collected item
-        create_notification(db, schemas.NotificationCreate(
-            user_id=tracker.order.user_id,
-            order_id=tracker.order_id,
-            food_tracker_id=tracker.id,
-            title="Item Collected ✅",
-            message=f"Your {tracker.menu_item.name} (#{tracker.order.order_number}) has been collected!",
-            notification_type="success"
-        ))
+        event_bus.publish(db, "tracker.status", tracker_id=tracker.id, stall_id=tracker.stall_id,
+                          old_status=old_status, new_status=status)
+        changed.append((tracker, old_status))
+    
+    # Finished items leave the menu item queue counts, one UPDATE per menu item
+    if finished_counts:
+        menu_items = db.query(models.MenuItem).execution_options(include_deleted=True).filter(
+            models.MenuItem.id.in_(finished_counts)
+        ).all()
+        for menu_item in menu_items:
+            menu_item.current_queue_count = func.max(models.MenuItem.current_queue_count - finished_counts[menu_item.id], 0)
+    
+    # Items starting or finishing shift the ETAs of everything queued behind them
+    stall_changes = {}
+    for tracker, old_status in changed:
+        if old_status in kitchen_queue.ACTIVE_STATUSES or tracker.status in kitchen_queue.ACTIVE_STATUSES:
+            stall_changes.setdefault(tracker.stall_id, []).append((tracker, old_status))
+    for stall_id in sorted(stall_changes):
+        kitchen_queue.reflow_stall(db, stall_id, stall_changes[stall_id])
+    
+    # Each changed stall's sub-order, then the order status
+    order_stalls = {}
+    for tracker, _ in changed:
+        order_stalls.setdefault(tracker.order_id, set()).add(tracker.stall_id)
+    for order_id, order_stall_ids in order_stalls.items():
+        _apply_order_status(db, order_id, order_stall_ids)
     
     db.commit()
-    
-    # Check if order status should be updated
-    update_order_status_based_on_trackers(db, tracker.order_id)
-    
-    return tracker
 
-def update_order_status_based_on_trackers(db: Session, order_id: int):
-    """Update order status based on food tracker statuses"""
-    trackers = db.query(models.FoodTracker).filter(models.FoodTracker.order_id == order_id).all()
-    order = db.query(models.Order).filter(models.Order.id == order_id).first()
-    
-    if not trackers or not order:
-        return
+def _status_from_trackers(statuses) -> str:
+    """Order status implied by the statuses of its food trackers; cancelled items don't count"""
+    statuses = [status for status in statuses if status != "Cancelled"]
+    if not statuses:
+        return "Cancelled"
     
-    # Count different statuses
-    ready_count = sum(1 for t in trackers if t.status == "Ready")
-    collected_count = sum(1 for t in trackers if t.status == "Collected")
-    preparing_count = sum(1 for t in trackers if t.status == "Preparing")
-    queued_count = sum(1 for t in trackers if t.status == "Queued")
-    total_count = len(trackers)
+    ready_count = statuses.count("Ready")
+    collected_count = statuses.count("Collected")
+    preparing_count = statuses.count("Preparing")
+    total_count = len(statuses)
     
-    # Determine new status based on tracker states
     if collected_count == total_count:
         # All items have been collected
-        new_status = "Completed"
+        return "Completed"
     elif ready_count + collected_count == total_count:
-        # All items are either ready or collected
-        if ready_count > 0:
-            new_status = "Ready for Pickup"
-        else:
-            new_status = "Completed"  # This shouldn't happen but just in case
+        # All items are either ready or collected (some ready, or the first branch would have matched)
+        return "Ready for Pickup"
     elif ready_count + collected_count > 0:
         # Some items are ready/collected, others still preparing/queued
-        new_status = "Partially Ready"
+        return "Partially Ready"
     elif preparing_count > 0:
         # Some items are being prepared
-        new_status = "Preparing"
+        return "Preparing"
     else:
         # All items are still queued
-        new_status = "Accepted"
-    
-    if order.status != new_status:
-        order.status = new_status
-        order.updated_at = datetime.now()
+        return "Accepted"
+
+def _status_from_stall_orders(statuses) -> str:
+    """Order status implied by the statuses of its per-stall sub-orders (same result as over all its trackers)"""
+    statuses = [status for status in statuses if status != "Cancelled"]
+    if not statuses:
+        return "Cancelled"
+    
+    if all(status == "Completed" for status in statuses):
+        return "Completed"
+    elif all(status in ("Ready for Pickup", "Completed") for status in statuses):
+        return "Ready for Pickup"
+    elif any(status in ("Ready for Pickup", "Completed", "Partially Ready") for status in statuses):
+        return "Partially Ready"
+    elif "Preparing" in statuses:
+        return "Preparing"
+    else:
+        return "Accepted"
+
+def update_order_status_based_on_trackers(db: Session, order_id: int, stall_id: Optional[int] = None):
+    """Update one stall's sub-order (every stall's without stall_id) from its food trackers, then the order status"""
+    if _apply_order_status(db, order_id, None if stall_id is None else [stall_id]):
         db.commit()
 
+def _apply_order_status(db: Session, order_id: int, stall_ids=None) -> bool:
+    """Recompute sub-order and order statuses in the current transaction; returns whether any changed.
+    
+    Only the trackers of the given stalls are read; the order status follows
+    from the sub-order statuses. A sub-order whose items are all ready gets a
+    pickup notification for its stall.
+    """
+    # Tracker status changes must be visible to the queries below
+    db.flush()
+    stall_orders = db.query(models.StallOrder).filter(models.StallOrder.order_id == order_id).all()
+    refreshed = [stall_order for stall_order in stall_orders if stall_ids is None or stall_order.stall_id in stall_ids]
+    if not refreshed:
+        return False
+    
+    trackers = db.query(models.FoodTracker.stall_id, models.FoodTracker.status).filter(
+        models.FoodTracker.order_id == order_id,
+        models.FoodTracker.stall_id.in_([stall_order.stall_id for stall_order in refreshed])
+    ).all()
+    
+    changed = [
+        stall_order for stall_order in refreshed
+        if stall_order.status != _status_from_trackers([status for stall_id, status in trackers if stall_id == stall_order.stall_id])
+    ]
+    if not changed:
+        return False
+    
+    order = db.query(models.Order).filter(models.Order.id == order_id).first()
+    for stall_order in changed:
+        stall_order.status = _status_from_trackers([status for stall_id, status in trackers if stall_id == stall_order.stall_id])
+        if stall_order.status == "Ready for Pickup" and stall_order.ready_at is None:
+            stall_order.ready_at = datetime.now()
+            add_notification(db, schemas.NotificationCreate(
+                user_id=order.user_id,
+                order_id=order_id,
+                title="Ready for Pickup 🛍️",
+                message=f"Everything from {stall_order.stall.name} (#{order.order_number}) is ready. Collect it at the stall!",
+                notification_type="food_ready"
+            ))
+    
+    order.status = _status_from_stall_orders([stall_order.status for stall_order in stall_orders])
+    return True
+
+def cancel_trackers(db: Session, trackers) -> dict:
+    """Mark active trackers Cancelled in the current transaction and undo their kitchen bookkeeping.
+    
+    Queue counts and portions go back with one UPDATE per menu item and each
+    stall re-flows the items behind the cancelled ones. Order statuses are
+    left to the caller. Returns {stall_id: [(tracker, old status)]}.
+    """
+    cancelled_counts = {}
+    stall_changes = {}
+    for tracker in trackers:
+        event_bus.publish(db, "tracker.status", tracker_id=tracker.id, stall_id=tracker.stall_id,
+                          old_status=tracker.status, new_status="Cancelled")
+        stall_changes.setdefault(tracker.stall_id, []).append((tracker, tracker.status))
+        tracker.status = "Cancelled"
+        cancelled_counts[tracker.menu_item_id] = cancelled_counts.get(tracker.menu_item_id, 0) + 1
+    
+    menu_items = db.query(models.MenuItem).execution_options(include_deleted=True).filter(
+        models.MenuItem.id.in_(cancelled_counts)
+    ).all()
+    for menu_item in menu_items:
+        count = cancelled_counts[menu_item.id]
+        menu_item.current_queue_count = func.max(models.MenuItem.current_queue_count - count, 0)
+        inventory.release(db, menu_item, count)
+    
+    # Later items move up the queue and pick up the time freed
+    for stall_id in sorted(stall_changes):
+        kitchen_queue.reflow_stall(db, stall_id, stall_changes[stall_id])
+    return stall_changes
+
+def settle_orders(db: Session, order_ids):
+    """Recompute the bill and status of orders that lost items to a purge (see cascade.py).
+    
+    What is left of each order is billed the way cancel_order would leave
+    it: cancelled items are refunded, and so is the service fee once
+    nothing else is left. Changes join the current transaction.
+    """
+    subtotals = dict(db.query(models.OrderItem.order_id, func.sum(models.OrderItem.total_price)).filter(
+        models.OrderItem.order_id.in_(order_ids)
+    ).group_by(models.OrderItem.order_id).all())
+    
+    statuses = {}
+    refunds = {}
+    remaining = db.query(models.FoodTracker.order_id, models.FoodTracker.status, models.OrderItem.unit_price).join(
+        models.OrderItem, models.FoodTracker.order_item_id == models.OrderItem.id
+    ).filter(models.FoodTracker.order_id.in_(order_ids))
+    for order_id, status, unit_price in remaining:
+        statuses.setdefault(order_id, []).append(status)
+        if status == "Cancelled":
+            refunds[order_id] = refunds.get(order_id, 0.0) + unit_price
+    
+    for order in db.query(models.Order).filter(models.Order.id.in_(order_ids)):
+        order.subtotal = subtotals.get(order.id, 0.0)
+        order.total_amount = order.subtotal + order.service_fee
+        order.status = _status_from_trackers(statuses.get(order.id, []))
+        order.refund_amount = refunds.get(order.id, 0.0)
+        if order.status == "Cancelled":
+            order.refund_amount += order.service_fee
+            order.cancelled_at = order.cancelled_at or datetime.now()
+
+def cancel_order(db: Session, order: models.Order, stall_id: Optional[int] = None,
+                 reason: Optional[str] = None, by_customer: bool = True):
+    """Cancel the items of an order still in the kitchen (only one stall's with stall_id), in one transaction.
+    
+    The trackers become Cancelled, their queue counts and portions are given
+    back with one UPDATE per menu item and the stalls re-flow the queue
+    positions and ETAs of everything behind them. Customers can only cancel
+    before anything is being prepared. Returns (items cancelled, refund).
+    """
+    trackers = db.query(models.FoodTracker).filter(models.FoodTracker.order_id == order.id)
+    if stall_id is not None:
+        trackers = trackers.filter(models.FoodTracker.stall_id == stall_id)
+    trackers = trackers.order_by(models.FoodTracker.id).all()
+    
+    if by_customer and any(tracker.status not in ("Queued", "Cancelled") for tracker in trackers):
+        raise ValueError("This order is already being prepared and can no longer be cancelled")
+    trackers = [tracker for tracker in trackers if tracker.status in kitchen_queue.ACTIVE_STATUSES]
+    if not trackers:
+        raise ValueError("Nothing left to cancel in this order")
+    
+    unit_prices = {order_item.id: order_item.unit_price for order_item in order.order_items}
+    refund = sum((unit_prices[tracker.order_item_id] for tracker in trackers), 0.0)
+    stall_ids = sorted(cancel_trackers(db, trackers))
+    
+    _apply_order_status(db, order.id, stall_ids)
+    if order.status == "Cancelled":
+        refund += order.service_fee
+        order.cancelled_at = datetime.now()
+        order.cancellation_reason = reason
+    order.refund_amount = (order.refund_amount or 0.0) + refund
+    
+    if order.payment_method == "Online Payment":
+        refund_note = f"RM {refund:.2f} will be refunded to your payment method."
+    else:
+        refund_note = f"RM {refund:.2f} has been taken off your bill."
+    reason_note = f" Reason: {reason}" if reason else ""
+    if order.status == "Cancelled":
+        title = "Order Cancelled"
+        message = f"Your order #{order.order_number} has been cancelled. {refund_note}{reason_note}"
+    else:
+        title = "Items Cancelled"
+        message = (f"{len(trackers)} item(s) of your order #{order.order_number} from {trackers[0].stall.name} "
+                   f"were cancelled. {refund_note}{reason_note}")
+    add_notification(db, schemas.NotificationCreate(
+        user_id=order.user_id, order_id=order.id, title=title, message=message, notification_type="warning"
+    ))
+    
+    if by_customer:
+        owners = db.query(models.User.id).filter(
+            models.User.role == "stall_owner", models.User.stall_id.in_(stall_ids)
+        ).all()
+        for (owner_id,) in owners:
+            add_notification(db, schemas.NotificationCreate(
+                user_id=owner_id, order_id=order.id, title="Order Cancelled",
+                message=f"Order #{order.order_number} was cancelled by the customer.{reason_note}",
+                notification_type="warning"
+            ))
+    
+    db.commit()
+    return len(trackers), refund
+
 # Notification CRUD
-def create_notification(db: Session, notification: schemas.NotificationCreate):
+def add_notification(db: Session, notification: schemas.NotificationCreate):
+    """Add a notification to the current transaction"""
     db_notification = models.Notification(**notification.model_dump())
     db.add(db_notification)
+    event_bus.publish(db, "notification.created", user_id=notification.user_id)
+    return db_notification
+
+def create_notification(db: Session, notification: schemas.NotificationCreate):
+    db_notification = add_notification(db, notification)
     db.commit()
     db.refresh(db_notification)
     return db_notification
@@ -460,12 +869,66 @@ def get_notifications(db: Session, user_id: int, unread_only: bool = False):
 
 def mark_notification_read(db: Session, notification_id: int):
     db_notification = db.query(models.Notification).filter(models.Notification.id == notification_id).first()
-    if db_notification:
+    if db_notification and not db_notification.is_read:
         db_notification.is_read = True
+        event_bus.publish(db, "notification.read", user_id=db_notification.user_id)
         db.commit()
         db.refresh(db_notification)
     return db_notification
 
+# Delta sync for polling clients (GET /api/users/{id}/updates), keyed on row_version
+def _changed_food_trackers(db: Session, user_id: int, since: int):
+    # Driven by the row_version index with a primary key probe per changed tracker,
+    # so the cost does not grow with the user's order history
+    return db.query(models.FoodTracker).filter(
+        models.FoodTracker.row_version > since,
+        models.FoodTracker.order.has(user_id=user_id)
+    )
+
+def has_user_updates(db: Session, user_id: int, since: int) -> bool:
+    """One statement of index probes: has anything of this user's changed after since?"""
+    orders = db.query(models.Order.id).filter(models.Order.user_id == user_id, models.Order.row_version > since)
+    trackers = _changed_food_trackers(db, user_id, since).with_entities(models.FoodTracker.id)
+    notifications = db.query(models.Notification.id).filter(
+        models.Notification.user_id == user_id, models.Notification.row_version > since
+    )
+    return db.scalar(select(or_(orders.exists(), trackers.exists(), notifications.exists())))
+
+def get_user_updates(db: Session, user_id: int, since: int):
+    """Orders, food trackers and notifications of a user changed after since"""
+    orders = db.query(models.Order).options(*order_list_options()).filter(
+        models.Order.user_id == user_id, models.Order.row_version > since
+    ).order_by(models.Order.created_at.desc()).all()
+    
+    food_trackers = _changed_food_trackers(db, user_id, since).options(
+        _menu_item_brief(joinedload(models.FoodTracker.menu_item)),
+        _stall_brief(joinedload(models.FoodTracker.stall)),
+        raiseload("*", sql_only=True)
+    ).order_by(models.FoodTracker.id).all()
+    
+    notifications = db.query(models.Notification).options(raiseload("*", sql_only=True)).filter(
+        models.Notification.user_id == user_id, models.Notification.row_version > since
+    ).order_by(models.Notification.created_at.desc()).all()
+    
+    return {"orders": orders, "food_trackers": food_trackers, "notifications": notifications}
+
+def prune_notifications(db: Session, retention_days: int, batch_size: int = 1000) -> int:
+    """Delete read notifications older than retention_days in small batches (unread ones are kept)"""
+    cutoff = datetime.now() - timedelta(days=retention_days)
+    deleted = 0
+    while True:
+        batch = db.query(models.Notification.id).filter(
+            models.Notification.is_read == True,
+            models.Notification.created_at < cutoff
+        ).limit(batch_size).subquery()
+        count = db.query(models.Notification).filter(
+            models.Notification.id.in_(db.query(batch.c.id))
+        ).delete(synchronize_session=False)
+        db.commit()
+        deleted += count
+        if count < batch_size:
+            return deleted
+
 # Search functionality
 def search_menu_items(db: Session, query: str, stall_id: Optional[int] = None):
     search_query = db.query(models.MenuItem).filter(
@@ -0,0 +1,112 @@
+"""
+Cross-process event bus for PPUM Café.
+
+Events are rows in the events table written in the same transaction as the
+change they describe. Subscribers in the publishing process are called right
+after that transaction commits; every other worker picks the event up by
+polling the table by id, so in-memory state (metrics gauges, kitchen
+backlogs, caches) stays consistent across workers.
+"""
+
+import logging
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import event as sa_event, func
+from sqlalchemy.orm import Session
+
+import models
+from coordination import PROCESS_ID
+
+# How often other workers' events are picked up (seconds)
+POLL_INTERVAL_SECONDS = float(os.getenv("EVENT_BUS_POLL_SECONDS", "1"))
+
+# Events older than this are pruned by the scheduler leader
+RETENTION_MINUTES = int(os.getenv("EVENT_BUS_RETENTION_MINUTES", "10"))
+
+BATCH_SIZE = 500
+
+logger = logging.getLogger("ppum_cafe.events")
+
+_subscribers = {}
+_last_seen_id = None
+
+# Events from other workers still waiting to be dispatched here, as of the last drain
+backlog = 0
+
+
+def subscribe(topic: str, handler):
+    """Register handler(payload, local) for a topic; local is True in the publishing process"""
+    _subscribers.setdefault(topic, []).append(handler)
+
+
+def publish(db: Session, topic: str, **payload):
+    """Record an event as part of the session's current transaction"""
+    db.add(models.Event(topic=topic, payload=payload, origin=PROCESS_ID))
+    db.info.setdefault("pending_events", []).append((topic, payload))
+
+
+def _dispatch(topic, payload, local):
+    for handler in _subscribers.get(topic, ()):
+        try:
+            handler(payload, local)
+        except Exception:
+            # Handlers keep caches in step across workers: a failure must not pass unnoticed
+            logger.exception("Error handling event %s", topic)
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _dispatch_committed(session):
+    for topic, payload in session.info.pop("pending_events", ()):
+        _dispatch(topic, payload, True)
+
+
+@sa_event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop("pending_events", None)
+
+
+def start_from_latest(db: Session):
+    """Skip events published before this process started"""
+    global _last_seen_id
+    _last_seen_id = db.query(func.max(models.Event.id)).scalar() or 0
+
+
+def poll(db: Session) -> int:
+    """Dispatch events published by other processes since the last poll"""
+    global _last_seen_id
+    if _last_seen_id is None:
+        start_from_latest(db)
+        return 0
+
+    events = db.query(models.Event).filter(
+        models.Event.id > _last_seen_id
+    ).order_by(models.Event.id).limit(BATCH_SIZE).all()
+    for event in events:
+        _last_seen_id = event.id
+        if event.origin != PROCESS_ID:
+            _dispatch(event.topic, event.payload, False)
+    return len(events)
+
+
+def prune(db: Session, retention_minutes: int = RETENTION_MINUTES) -> int:
+    """Delete events every worker has had time to see"""
+    cutoff = datetime.now() - timedelta(minutes=retention_minutes)
+    deleted = db.query(models.Event).filter(models.Event.created_at < cutoff).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+def drain(db: Session) -> int:
+    """Poll until caught up; run by the supervisor's event_bus job in every worker"""
+    global backlog
+    if _last_seen_id is not None:
+        backlog = db.query(func.count(models.Event.id)).filter(
+            models.Event.id > _last_seen_id, models.Event.origin != PROCESS_ID
+        ).scalar()
+    total = 0
+    while True:
+        count = poll(db)
+        total += count
+        if count < BATCH_SIZE:
+            return total
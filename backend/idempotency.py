@@ -0,0 +1,125 @@
+"""
+Idempotency keys for PPUM Café.
+
+Clients send an Idempotency-Key header with requests that must not run
+twice (order submission). The first request claims the key with a pending
+row; when it finishes its response is stored on that row, and retries with
+the same key get the stored response back instead of repeating the work.
+The handler ties its result to the key in its own transaction (attach()),
+so once an order is committed the key is kept even if a later step fails,
+and a retry replays that order instead of placing another one. Duplicates
+arriving while the first attempt is still running get 409 with Retry-After.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+
+# How long a completed response is replayed for
+TTL_HOURS = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+
+# A pending key whose request died is reclaimable after this long
+PENDING_TIMEOUT_SECONDS = 60
+
+# Striped locks serialize claims of the same key within a worker without a lock per key
+_locks = [threading.Lock() for _ in range(64)]
+
+
+def request_fingerprint(body: dict) -> str:
+    return hashlib.sha256(json.dumps(body, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _claim(db: Session, user_id: int, key: str, fingerprint: str):
+    """Insert a pending row for the key; returns (record, claimed)"""
+    now = datetime.now()
+    record = models.IdempotencyKey(
+        user_id=user_id, key=key, request_hash=fingerprint,
+        expires_at=now + timedelta(seconds=PENDING_TIMEOUT_SECONDS)
+    )
+    db.add(record)
+    try:
+        db.commit()
+        return record, True
+    except IntegrityError:
+        db.rollback()
+    
+    record = db.query(models.IdempotencyKey).filter(
+        models.IdempotencyKey.user_id == user_id,
+        models.IdempotencyKey.key == key
+    ).first()
+    if record is not None and record.expires_at < now:
+        # Expired response or abandoned attempt: start over with this request
+        record.request_hash = fingerprint
+        record.response = None
+        record.order_id = None
+        record.expires_at = now + timedelta(seconds=PENDING_TIMEOUT_SECONDS)
+        db.commit()
+        return record, True
+    return record, False
+
+
+def attach(record: models.IdempotencyKey, order_id: int):
+    """Tie the order to the key in the caller's transaction; from its commit on, the key is never given up"""
+    record.order_id = order_id
+    record.expires_at = datetime.now() + timedelta(hours=TTL_HOURS)
+
+
+def _store(db: Session, record: models.IdempotencyKey, result):
+    record.response = result
+    record.expires_at = datetime.now() + timedelta(hours=TTL_HOURS)
+    db.commit()
+
+
+def run_once(db: Session, user_id: int, key: str, body: dict, handler, replay):
+    """Run handler(record) once per (user, key) and replay its JSON-able result to retries.
+
+    handler should attach() its order to the record before committing it;
+    replay(order_id) rebuilds the result for an order whose response was
+    never stored. Returns (result, replayed).
+    """
+    fingerprint = request_fingerprint(body)
+    with _locks[hash((user_id, key)) % len(_locks)]:
+        record, claimed = _claim(db, user_id, key, fingerprint)
+    
+    if not claimed:
+        if record.request_hash != fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+        if record.response is None and record.order_id is not None:
+            # The order committed but its response was never stored
+            result = replay(record.order_id)
+            _store(db, record, result)
+            return result, True
+        if record.response is None:
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still being processed",
+                                headers={"Retry-After": "1"})
+        return record.response, True
+    
+    try:
+        result = handler(record)
+    except Exception:
+        db.rollback()
+        # Let the client retry the same key, unless the order went through before the failure
+        if record.order_id is None:
+            db.delete(record)
+            db.commit()
+        raise
+    
+    _store(db, record, result)
+    return result, False
+
+
+def prune(db: Session) -> int:
+    """Delete expired keys"""
+    deleted = db.query(models.IdempotencyKey).filter(
+        models.IdempotencyKey.expires_at < datetime.now()
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
@@ -0,0 +1,154 @@
+"""
+SQL query instrumentation for PPUM Café.
+
+Counts and times every statement a request runs by hooking SQLAlchemy's
+cursor events. Per-request totals live in a context variable set by an ASGI
+middleware, are reported in a Server-Timing header (queries run before the
+response starts), and statements slower than SLOW_QUERY_MS are logged
+together with the route that ran them.
+"""
+
+import contextvars
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+# Statements slower than this (milliseconds) are logged
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+
+logger = logging.getLogger("ppum_cafe.sql")
+
+
+class QueryStats:
+    """Query totals for one request (or one counted block)"""
+
+    __slots__ = ("route", "count", "duration")
+
+    def __init__(self, route: str = ""):
+        self.route = route
+        self.count = 0
+        self.duration = 0.0
+
+    def server_timing(self, total_seconds: float) -> str:
+        return (f'db;dur={self.duration * 1000:.1f};desc="{self.count} queries", '
+                f'app;dur={total_seconds * 1000:.1f}')
+
+
+_current_stats = contextvars.ContextVar("query_stats", default=None)
+
+
+def current_stats():
+    """QueryStats of the request being handled, if any"""
+    return _current_stats.get()
+
+
+# Start times are keyed by cursor so a statement that raises (see _handle_error)
+# cannot leave a stale entry behind for the next statement to pick up
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", {})[cursor] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started", {}).pop(cursor, None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += elapsed
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        logger.warning("Slow query (%.1f ms) on %s: %s", elapsed * 1000,
+                       stats.route if stats else "<no request>", " ".join(statement.split()))
+
+
+def _handle_error(exception_context):
+    connection, context = exception_context.connection, exception_context.execution_context
+    if connection is not None and context is not None:
+        connection.info.get("query_started", {}).pop(context.cursor, None)
+
+
+def install(engine):
+    """Attach the cursor event hooks to an engine (idempotent)"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+class QueryCountMiddleware:
+    """ASGI middleware collecting per-request query counts and durations
+
+    Server-Timing has to go out with the response headers, so it covers the
+    queries run before the response starts. Statements run after that (a
+    streamed body, background tasks, dependency teardown) are left out of
+    the header, but still count towards the request's QueryStats and so
+    towards ppum_http_request_db_queries_total.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(f"{scope['method']} {scope['path']}")
+        token = _current_stats.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                route = scope.get("route")
+                if route is not None:
+                    stats.route = f"{scope['method']} {route.path}"
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", stats.server_timing(time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_stats.reset(token)
+
+
+# Test helpers
+
+_SERVER_TIMING_COUNT = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+def query_count(response) -> int:
+    """Number of queries a response's request ran, read from Server-Timing"""
+    match = _SERVER_TIMING_COUNT.search(response.headers.get("server-timing", ""))
+    if not match:
+        raise AssertionError("Response has no Server-Timing query count; is QueryCountMiddleware installed?")
+    return int(match.group(1))
+
+
+def assert_max_queries(response, limit: int):
+    """Fail if the request behind a response ran more than limit queries"""
+    count = query_count(response)
+    if count > limit:
+        raise AssertionError(f"{response.request.method} {response.request.url.path} "
+                             f"ran {count} queries (limit {limit})")
+    return count
+
+
+@contextmanager
+def count_queries(limit: int = None, label: str = "block"):
+    """Count queries run directly in this context, e.g. around a crud call"""
+    stats = QueryStats(label)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+    if limit is not None and stats.count > limit:
+        raise AssertionError(f"{label} ran {stats.count} queries (limit {limit})")
@@ -0,0 +1,93 @@
+"""
+Portion inventory for PPUM Café.
+
+A menu item with a stock_quantity has that many portions left; NULL means
+the item is not counted. Portions are reserved while an order is being
+placed with one conditional UPDATE per item ("... WHERE stock_quantity >=
+quantity"), so two concurrent orders can never both take the last portion
+and no application lock is needed: the losing order sees no row, rolls back
+and is refused. The reservation commits or rolls back with the order's own
+transaction; release() hands portions back when an order is cancelled.
+
+An item whose stock reaches zero is marked unavailable in the same UPDATE
+and becomes available again when portions are released or restocked. An
+item switched off by its stall (is_available false with portions left, or
+not counted) is refused as Unavailable rather than sold out.
+Crossing low_stock_threshold is reported to the caller so the stall owner
+can be notified once the order commits.
+"""
+
+from typing import Optional
+
+from sqlalchemy import case, or_, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import flag_modified
+
+import models
+
+
+class OutOfStock(ValueError):
+    """Not enough portions left (or the item is sold out)"""
+
+
+class Unavailable(ValueError):
+    """The item was switched off by its stall, whatever its stock"""
+
+
+def reserve(db: Session, menu_item: models.MenuItem, quantity: int) -> Optional[int]:
+    """Take quantity portions in the current transaction; returns the portions left (None if not counted)"""
+    stock = models.MenuItem.stock_quantity
+    row = db.execute(
+        update(models.MenuItem).where(
+            models.MenuItem.id == menu_item.id,
+            models.MenuItem.is_available == True,
+            or_(stock.is_(None), stock >= quantity)
+        ).values(
+            stock_quantity=stock - quantity,
+            is_available=case((stock - quantity <= 0, False), else_=models.MenuItem.is_available)
+        ).returning(stock).execution_options(synchronize_session=False)
+    ).first()
+
+    if row is None:
+        available, left = db.execute(
+            select(models.MenuItem.is_available, stock).where(models.MenuItem.id == menu_item.id)
+        ).one()
+        if left == 0:
+            raise OutOfStock(f"{menu_item.name} is sold out")
+        if not available:
+            raise Unavailable(f"{menu_item.name} is not available right now")
+        raise OutOfStock(f"Only {left} portions of {menu_item.name} left")
+
+    # Bulk updates skip change tracking: have the next flush stamp the row
+    flag_modified(menu_item, "row_version")
+    return row.stock_quantity
+
+
+def crossed_low_stock(menu_item: models.MenuItem, left: Optional[int], quantity: int) -> bool:
+    """Whether taking quantity portions brought the stock down to the item's low-stock threshold"""
+    threshold = menu_item.low_stock_threshold
+    return left is not None and threshold is not None and left <= threshold < left + quantity
+
+
+def release(db: Session, menu_item: models.MenuItem, quantity: int):
+    """Give reserved portions back (cancelled orders); flushed and stamped with the caller's changes"""
+    if menu_item.stock_quantity is None:
+        return
+    stock = models.MenuItem.stock_quantity
+    # Both SET expressions see the old stock: an item sold out at zero comes back
+    menu_item.is_available = case((stock <= 0, True), else_=models.MenuItem.is_available)
+    menu_item.stock_quantity = stock + quantity
+
+
+def restock(db: Session, menu_item: models.MenuItem, stock_quantity: Optional[int],
+            low_stock_threshold: Optional[int] = None):
+    """Set the portions on hand (None stops counting); a counted item is available while it has portions"""
+    if stock_quantity is not None and stock_quantity < 0:
+        raise ValueError("stock_quantity can't be negative")
+    menu_item.stock_quantity = stock_quantity
+    menu_item.low_stock_threshold = low_stock_threshold
+    if stock_quantity is not None:
+        menu_item.is_available = stock_quantity > 0
+    db.commit()
+    db.refresh(menu_item)
+    return menu_item
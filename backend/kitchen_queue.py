@@ -0,0 +1,329 @@
+"""
+Stall kitchen capacity model for PPUM Café.
+
+Each stall is modelled as a discrete-event queue with a fixed number of
+parallel stations. Items are served first-come first-served: an item starts
+on the earliest free station and occupies it for its preparation time. The
+same scheduling core is used on the order creation path, to re-flow ETAs
+when items finish early or late, and offline to replay a day of orders.
+
+A tracker's queue_position is its place among the stall's queued items in
+service order (1 = next to start). New items take the next place from the
+cached backlog; every re-flow renumbers the queue behind items that started,
+finished or were cancelled, in the same pass that moves their ETAs.
+
+Planning and re-flows work on copies of the cached stall state, staged on
+the session; the copies replace the cache only when that transaction
+commits, so an order that rolls back leaves no jobs behind.
+"""
+
+import heapq
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import Session
+
+import event_bus
+import models
+
+ACTIVE_STATUSES = ("Queued", "Preparing")
+
+# Cached stall backlogs are rebuilt from the database after this many seconds
+BACKLOG_TTL_SECONDS = float(os.getenv("KITCHEN_BACKLOG_TTL_SECONDS", "30"))
+
+# Only ETAs that move by more than this are written back during a re-flow
+REFLOW_TOLERANCE_SECONDS = 30
+
+
+def schedule(stations: int, busy_until, durations, now: float):
+    """Assign jobs to the earliest free station.
+
+    busy_until holds the finish times of items already being prepared and
+    durations the preparation seconds of queued items in service order.
+    Returns (start, finish) per job and the station heap afterwards.
+    """
+    stations = max(int(stations or 1), 1)
+    free_at = sorted(busy_until)[-stations:]
+    free_at += [now] * (stations - len(free_at))
+    heapq.heapify(free_at)
+
+    slots = []
+    for duration in durations:
+        start = max(heapq.heappop(free_at), now)
+        finish = start + duration
+        heapq.heappush(free_at, finish)
+        slots.append((start, finish))
+    return slots, free_at
+
+
+class StallKitchen:
+    """In-memory station state for one stall after its current backlog"""
+
+    __slots__ = ("stall_id", "stations", "free_at", "loaded_at", "waiting")
+
+    def __init__(self, stall_id: int, stations: int, free_at, loaded_at: float, waiting: int = 0):
+        self.stall_id = stall_id
+        self.stations = stations
+        self.free_at = free_at
+        self.loaded_at = loaded_at
+        self.waiting = waiting  # Queued items, i.e. the last queue_position handed out
+
+    def add_jobs(self, durations, now: float):
+        """Append new jobs to the back of the queue and return their slots"""
+        free_at = self.free_at
+        slots = []
+        for duration in durations:
+            start = max(heapq.heappop(free_at), now)
+            finish = start + duration
+            heapq.heappush(free_at, finish)
+            slots.append((start, finish))
+        self.waiting += len(durations)
+        return slots
+
+    def copy(self) -> "StallKitchen":
+        return StallKitchen(self.stall_id, self.stations, list(self.free_at), self.loaded_at, self.waiting)
+
+
+# Backlog cache keyed by stall id
+_kitchens = {}
+_lock = threading.Lock()
+
+
+def _timestamp(value: datetime) -> float:
+    return value.timestamp()
+
+
+def stall_stations(stall: models.Stall) -> int:
+    return max(stall.kitchen_stations or 1, 1) if stall else 1
+
+
+def active_trackers(db: Session, stall_id: int):
+    """Queued and preparing trackers of a stall in service order"""
+    return db.query(models.FoodTracker).filter(
+        models.FoodTracker.stall_id == stall_id,
+        models.FoodTracker.status.in_(ACTIVE_STATUSES)
+    ).order_by(models.FoodTracker.created_at, models.FoodTracker.id).all()
+
+
+def service_key(tracker):
+    return (tracker.created_at, tracker.id)
+
+
+def _waiting(trackers) -> int:
+    return sum(1 for tracker in trackers if tracker.status == "Queued")
+
+
+def _backlog(trackers, now: float):
+    """Split active trackers into station finish times and queued durations"""
+    busy_until = []
+    queued = []
+    for tracker in trackers:
+        duration = tracker.prep_duration_minutes * 60
+        if tracker.status == "Preparing" and tracker.prep_start_time:
+            # An overdue item is assumed to be finishing right now
+            busy_until.append(max(_timestamp(tracker.prep_start_time) + duration, now))
+        else:
+            queued.append((tracker, duration))
+    return busy_until, queued
+
+
+def load_kitchen(db: Session, stall: models.Stall, now: float) -> StallKitchen:
+    """Rebuild a stall's station state from its active trackers"""
+    trackers = active_trackers(db, stall.id)
+    busy_until, queued = _backlog(trackers, now)
+    _, free_at = schedule(stall_stations(stall), busy_until, [d for _, d in queued], now)
+    return StallKitchen(stall.id, stall_stations(stall), free_at, time.monotonic(), _waiting(trackers))
+
+
+def get_kitchen(db: Session, stall: models.Stall, now: float) -> StallKitchen:
+    """Return the cached kitchen for a stall, reloading it when stale"""
+    kitchen = _kitchens.get(stall.id)
+    if (kitchen is None or kitchen.stations != stall_stations(stall)
+            or time.monotonic() - kitchen.loaded_at > BACKLOG_TTL_SECONDS):
+        kitchen = load_kitchen(db, stall, now)
+        _kitchens[stall.id] = kitchen
+    return kitchen
+
+
+def invalidate(stall_id: int = None):
+    """Drop cached backlog state for one stall (or all stalls)"""
+    with _lock:
+        if stall_id is None:
+            _kitchens.clear()
+        else:
+            _kitchens.pop(stall_id, None)
+
+
+def _staged(db: Session):
+    """Kitchens changed in the session's open transaction: stall id -> (cached kitchen it started from, new kitchen)"""
+    return db.info.setdefault("staged_kitchens", {})
+
+
+def plan_order(db: Session, jobs, now: datetime = None):
+    """Compute consistent ETAs for every item of an incoming order.
+
+    jobs is a list of (stall, prep_minutes) in the order the items were
+    placed. Returns (prep_start, ready_time, queue_position) per job. The
+    jobs join the cached backlogs when the order commits.
+    """
+    now = now or datetime.now()
+    now_ts = _timestamp(now)
+    slots = []
+    with _lock:
+        staged = _staged(db)
+        for stall, prep_minutes in jobs:
+            if stall.id not in staged:
+                cached = get_kitchen(db, stall, now_ts)
+                staged[stall.id] = (cached, cached.copy())
+            kitchen = staged[stall.id][1]
+            start, finish = kitchen.add_jobs((prep_minutes * 60,), now_ts)[0]
+            slots.append((datetime.fromtimestamp(start), datetime.fromtimestamp(finish), kitchen.waiting))
+    return slots
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _install_staged(session):
+    staged = session.info.pop("staged_kitchens", None)
+    if not staged:
+        return
+    with _lock:
+        for stall_id, (cached, kitchen) in staged.items():
+            if _kitchens.get(stall_id) is cached:
+                _kitchens[stall_id] = kitchen
+            else:
+                # Reloaded or re-flowed by another session meanwhile: rebuild from the database
+                _kitchens.pop(stall_id, None)
+
+
+@sa_event.listens_for(Session, "after_transaction_end")
+def _discard_staged(session, transaction):
+    # Rolled back, or closed without committing
+    if transaction.parent is None:
+        session.info.pop("staged_kitchens", None)
+
+
+def _first_moved(trackers, changes):
+    """Service key of the first tracker the changes can move, or None when any of them can.
+
+    First-come first-served service never lets an item delay one ahead of it:
+    an item leaving the queue without taking a station, or the head of the
+    queue starting, only moves the items behind it. A freed station, or an
+    item started out of turn, can move every queued item.
+    """
+    queued = [service_key(tracker) for tracker in trackers if tracker.status == "Queued"]
+    head = min(queued) if queued else None
+    first = None
+    for tracker, old_status in changes:
+        key = service_key(tracker)
+        if old_status != "Queued":
+            return None
+        if tracker.status == "Preparing" and head is not None and head < key:
+            return None
+        first = key if first is None else min(first, key)
+    return first
+
+
+def reflow_stall(db: Session, stall_id: int, changes=None, now: datetime = None) -> int:
+    """Recompute ETAs and queue positions of a stall's active trackers against its real progress.
+
+    Called when items start, finish or are cancelled so later items pick up
+    the time gained or lost and move up the queue. changes lists the
+    (tracker, old_status) pairs behind the call; trackers ahead of the first
+    one they can move are left alone (all are checked without changes).
+    Only trackers whose ETA or position changed are modified, along with the
+    ETA of those orders' sub-orders at this stall, so the caller's commit
+    writes just those rows. Returns the number of trackers updated.
+    """
+    stall = db.query(models.Stall).execution_options(include_deleted=True).filter(models.Stall.id == stall_id).first()
+    if not stall:
+        return 0
+
+    # Pending status changes must be visible to the backlog query
+    db.flush()
+    now_ts = _timestamp(now or datetime.now())
+    trackers = active_trackers(db, stall_id)
+    busy_until, queued = _backlog(trackers, now_ts)
+    slots, free_at = schedule(stall_stations(stall), busy_until, [d for _, d in queued], now_ts)
+    first = _first_moved(trackers, changes) if changes else None
+
+    changed = set()
+    for tracker in trackers:
+        if tracker.status == "Preparing" and tracker.prep_start_time and (first is None or service_key(tracker) >= first):
+            # Planned finish; an overdue item only counts as finishing now in the schedule above
+            if _set_eta(tracker, _timestamp(tracker.prep_start_time) + tracker.prep_duration_minutes * 60):
+                changed.add(tracker.id)
+    position = 0
+    for (tracker, _), (_, finish) in zip(queued, slots):
+        if tracker.status == "Queued":
+            position += 1
+        if first is not None and service_key(tracker) < first:
+            continue
+        if _set_eta(tracker, finish):
+            changed.add(tracker.id)
+        if tracker.status == "Queued" and tracker.queue_position != position:
+            tracker.queue_position = position
+            changed.add(tracker.id)
+
+    # Each order's sub-order here is ready when its last active item is
+    moved_orders = {tracker.order_id for tracker in trackers if tracker.id in changed}
+    if moved_orders:
+        ready_times = {}
+        for tracker in trackers:
+            if tracker.order_id in moved_orders:
+                ready_times[tracker.order_id] = max(ready_times.get(tracker.order_id, tracker.estimated_ready_time),
+                                                    tracker.estimated_ready_time)
+        for stall_order in db.query(models.StallOrder).filter(
+            models.StallOrder.stall_id == stall_id, models.StallOrder.order_id.in_(moved_orders)
+        ):
+            if stall_order.estimated_ready_time != ready_times[stall_order.order_id]:
+                stall_order.estimated_ready_time = ready_times[stall_order.order_id]
+
+    kitchen = StallKitchen(stall_id, stall_stations(stall), free_at, time.monotonic(), position)
+    with _lock:
+        staged = _staged(db)
+        staged[stall_id] = (staged[stall_id][0] if stall_id in staged else _kitchens.get(stall_id), kitchen)
+    return len(changed)
+
+
+def _set_eta(tracker, finish: float) -> int:
+    if abs(_timestamp(tracker.estimated_ready_time) - finish) <= REFLOW_TOLERANCE_SECONDS:
+        return 0
+    tracker.estimated_ready_time = datetime.fromtimestamp(finish)
+    return 1
+
+
+def simulate(arrivals, durations, stations: int):
+    """Replay arrivals (seconds, ascending) through a stall with N stations.
+
+    Returns per-item wait and finish times, the basis for staffing reports.
+    """
+    stations = max(int(stations), 1)
+    free_at = [float("-inf")] * stations
+    waits = []
+    finishes = []
+    for arrival, duration in zip(arrivals, durations):
+        start = max(heapq.heappop(free_at), arrival)
+        finish = start + duration
+        heapq.heappush(free_at, finish)
+        waits.append(start - arrival)
+        finishes.append(finish)
+    return waits, finishes
+
+
+def _on_remote_change(payload, local):
+    # Orders and status changes made by other workers invalidate our cached backlog
+    if local:
+        return
+    if "stall_quantities" in payload:
+        for stall_id in payload["stall_quantities"]:
+            invalidate(int(stall_id))
+    else:
+        invalidate(payload["stall_id"])
+
+
+event_bus.subscribe("order.created", _on_remote_change)
+event_bus.subscribe("tracker.status", _on_remote_change)
+event_bus.subscribe("records.deleted", lambda payload, local: invalidate())
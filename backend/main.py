@@ -1,104 +1,248 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, APIRouter, Depends, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 import asyncio
-from datetime import datetime, timedelta, timezone
+import logging
+import os
+from datetime import datetime, timedelta
 
 import models
 import crud
-from database import SessionLocal, engine, get_db
-
-# Import all routers
-from routers import auth, stalls, menu_items, orders, admin, stall_owner, search, notifications, users
-
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
-
-app = FastAPI(
-    title="PPUM Café API",
-    description="Backend API for PPUM Café Scan & Order System with Authentication",
-    version="2.0.0"
-)
-
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000"],  # Frontend URL
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Background task for food tracker updates
-async def update_food_trackers_background():
-    """Background task to simulate food preparation and update trackers"""
-    while True:
-        db = SessionLocal()
-        try:
-            # Get all queued and preparing trackers
-            trackers = db.query(models.FoodTracker).filter(
-                models.FoodTracker.status.in_(["Queued", "Preparing"])
-            ).all()
-            
-            current_time = datetime.now()
-            
-            for tracker in trackers:
-                # Start preparing if it's time
-                if tracker.status == "Queued":
-                    # Check if it's time to start preparing (based on queue position)
-                    queue_delay = tracker.queue_position * 2  # 2 minutes per position
-                    start_time = tracker.created_at + timedelta(minutes=queue_delay)
-                    
-                    if current_time >= start_time:
-                        crud.update_food_tracker_status(db, tracker.id, "Preparing")
-                
-                # Mark as ready if preparation time is complete
-                elif tracker.status == "Preparing" and tracker.prep_start_time:
-                    ready_time = tracker.prep_start_time + timedelta(minutes=tracker.prep_duration_minutes)
-                    
-                    if current_time >= ready_time:
-                        crud.update_food_tracker_status(db, tracker.id, "Ready")
-                        
-        except Exception as e:
-            print(f"Error updating food trackers: {e}")
-        finally:
-            db.close()
-        
-        await asyncio.sleep(30)  # Check every 30 seconds
-
-@app.on_event("startup")
-async def startup_event():
-    # Start background task
-    asyncio.create_task(update_food_trackers_background())
-
-# Include all routers
-app.include_router(auth.router)
-app.include_router(stalls.router)
-app.include_router(menu_items.router)
-app.include_router(orders.router)
-app.include_router(admin.router)
-app.include_router(stall_owner.router)
-app.include_router(search.router)
-app.include_router(notifications.router)
-app.include_router(users.router)
+import prep_estimator
+import kitchen_queue
+import instrumentation
+import metrics
+import coordination
+import event_bus
+import idempotency
+import backup
+import analytics
+import availability
+import supervisor
+from database import SessionLocal, engine, get_db, sync_schema
+
+TRACKER_LOOP_INTERVAL_SECONDS = 30
+RETENTION_INTERVAL_SECONDS = int(os.getenv("RETENTION_INTERVAL_SECONDS", "300"))
+NOTIFICATION_RETENTION_DAYS = int(os.getenv("NOTIFICATION_RETENTION_DAYS", "30"))
+
+# Application loggers (ppum_cafe.*) print INFO and above alongside uvicorn's own
+app_logger = logging.getLogger("ppum_cafe")
+if not app_logger.handlers:
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(levelname)s:     %(name)s: %(message)s"))
+    app_logger.addHandler(handler)
+    app_logger.setLevel(logging.INFO)
+
+logger = logging.getLogger("ppum_cafe.jobs")
+
+def advance_food_trackers(db):
+    """Finish items whose prep time has elapsed and start queued ones on free stations, in one transaction"""
+    # Get all queued and preparing trackers in service order
+    trackers = db.query(models.FoodTracker).filter(
+        models.FoodTracker.status.in_(["Queued", "Preparing"])
+    ).order_by(models.FoodTracker.created_at, models.FoodTracker.id).all()
+    
+    current_time = datetime.now()
+    changes = []
+    preparing_counts = {}
+    queued_by_stall = {}
+    
+    # Mark as ready if preparation time is complete (frees a station)
+    for tracker in trackers:
+        if tracker.status == "Preparing":
+            ready_time = tracker.prep_start_time and tracker.prep_start_time + timedelta(minutes=tracker.prep_duration_minutes)
+            if ready_time and current_time >= ready_time:
+                changes.append((tracker, "Ready"))
+            else:
+                preparing_counts[tracker.stall_id] = preparing_counts.get(tracker.stall_id, 0) + 1
+        else:
+            queued_by_stall.setdefault(tracker.stall_id, []).append(tracker)
+    
+    # Start queued items as soon as their stall has a free station
+    if queued_by_stall:
+        # Orders placed before a delete still get cooked
+        stalls = db.query(models.Stall).execution_options(include_deleted=True).filter(
+            models.Stall.id.in_(queued_by_stall)
+        ).all()
+        for stall in stalls:
+            free = kitchen_queue.stall_stations(stall) - preparing_counts.get(stall.id, 0)
+            changes.extend((tracker, "Preparing") for tracker in queued_by_stall[stall.id][:max(free, 0)])
+    
+    if changes:
+        crud.update_food_tracker_statuses(db, changes, current_time)
+
+def prune_expired(db):
+    """Retention: old events, expired idempotency keys and old read notifications"""
+    event_bus.prune(db)
+    idempotency.prune(db)
+    crud.prune_notifications(db, NOTIFICATION_RETENTION_DAYS)
+
+def back_up_database(db):
+    """Online backup of the live database, then drop backups beyond BACKUP_RETENTION"""
+    path = backup.create_backup()
+    backup.apply_retention()
+    logger.info("Database backed up to %s", path)
+
+def warm_caches(db):
+    """Fill the caches and load the lazy imports that the first requests would otherwise pay for"""
+    # Seed domain gauges once; afterwards they are maintained in memory
+    metrics.load_domain_gauges(db)
+    prep_estimator.refresh(db)
+    analytics.refresh(db)
+    availability.load(db)
+    crud.password_context()
+    from jose import jwt  # noqa: F401
+
+def register_jobs(jobs: supervisor.Supervisor, app: FastAPI):
+    """Background jobs; those with a lease run in one worker at a time"""
+    def warm_up(db):
+        warm_caches(db)
+        app.state.ready = True
+    
+    jobs.add("warm_up", warm_up)
+    jobs.add("event_bus", event_bus.drain, interval=event_bus.POLL_INTERVAL_SECONDS)
+    jobs.add("food_trackers", advance_food_trackers, interval=TRACKER_LOOP_INTERVAL_SECONDS,
+             lease=coordination.TRACKER_SCHEDULER_LEASE)
+    jobs.add("retention", prune_expired, interval=RETENTION_INTERVAL_SECONDS,
+             initial_delay=TRACKER_LOOP_INTERVAL_SECONDS, lease=coordination.TRACKER_SCHEDULER_LEASE)
+    # The first fit and rollup run during warm-up
+    jobs.add("prep_model", prep_estimator.refresh, interval=prep_estimator.REFRESH_INTERVAL_SECONDS,
+             initial_delay=prep_estimator.REFRESH_INTERVAL_SECONDS)
+    jobs.add("analytics", analytics.refresh, interval=analytics.ROLLUP_INTERVAL_SECONDS,
+             initial_delay=analytics.ROLLUP_INTERVAL_SECONDS)
+    if backup.INTERVAL_HOURS > 0:
+        # Workers wake at about the same time; a lease held for half the interval lets one of them back up
+        interval = backup.INTERVAL_HOURS * 3600
+        jobs.add("backup", back_up_database, interval=interval, initial_delay=interval,
+                 lease=coordination.BACKUP_LEASE, lease_ttl=int(interval / 2))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Check the schema and start background jobs; the server accepts requests once this yields"""
+    app.state.ready = False
+    
+    # Create tables (and any columns added since the file was created)
+    await asyncio.to_thread(sync_schema)
+    db = SessionLocal()
+    try:
+        # Index orders placed before the stall_orders table existed
+        await asyncio.to_thread(crud.backfill_stall_orders, db)
+        event_bus.start_from_latest(db)
+    finally:
+        db.close()
+    
+    jobs = supervisor.Supervisor(SessionLocal)
+    register_jobs(jobs, app)
+    jobs.start()
+    app.state.jobs = jobs
+    
+    yield
+    
+    await jobs.stop()
+    
+    # Hand the tracker scheduler to another worker straight away
+    db = SessionLocal()
+    try:
+        coordination.release_lease(db, coordination.TRACKER_SCHEDULER_LEASE)
+    except Exception:
+        logger.exception("Error releasing scheduler lease")
+    finally:
+        db.close()
 
 # Health check and root endpoints
-@app.get("/api/health")
+router = APIRouter()
+
+@router.get("/api/health")
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (liveness: the process is up)"""
     return {"status": "healthy", "message": "PPUM Café API is running"}
 
-@app.get("/")
+@router.get("/api/ready")
+def readiness_check(request: Request, db: Session = Depends(get_db)):
+    """Readiness endpoint: 503 until caches are warm and while the database is unreachable"""
+    if not request.app.state.ready:
+        return ORJSONResponse({"status": "starting"}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    try:
+        db.execute(text("SELECT 1"))
+    except Exception as e:
+        return ORJSONResponse({"status": "unavailable", "detail": str(e)},
+                              status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return {"status": "ready"}
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus metrics (served from memory, never queries the database)"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/")
 def read_root():
     """Root endpoint"""
     return {"message": "Welcome to PPUM Café API", "version": "2.0.0"}
 
 # Additional stall-specific endpoints that don't fit in other routers
-@app.get("/api/stalls/{stall_id}/categories")
+@router.get("/api/stalls/{stall_id}/categories")
 def get_menu_categories(stall_id: int, db: Session = Depends(get_db)):
-    """Get unique menu categories for a specific stall"""
-    categories = db.query(models.MenuItem.category).filter(
+    """Get unique menu categories for a specific stall, among items on the menu right now"""
+    items = db.query(models.MenuItem.id, models.MenuItem.stall_id, models.MenuItem.category).filter(
         models.MenuItem.stall_id == stall_id
-    ).distinct().all()
-    return {"categories": [category[0] for category in categories]} 
\ No newline at end of file
+    ).all()
+    categories = {item.category: None for item in availability.open_items(db, items)}
+    return {"categories": list(categories)} 
+
+def create_app() -> FastAPI:
+    """Build the API; routers and middleware are imported here rather than when main is imported"""
+    import rate_limit
+    from routers import auth, stalls, menu_items, orders, admin, stall_owner, search, notifications, users
+    
+    app = FastAPI(
+        title="PPUM Café API",
+        description="Backend API for PPUM Café Scan & Order System with Authentication",
+        version="2.0.0",
+        default_response_class=ORJSONResponse,  # orjson serializes large order lists much faster
+        lifespan=lifespan
+    )
+    app.state.ready = False
+    
+    # Token-bucket rate limits and write concurrency cap (inside CORS so 429s stay readable)
+    app.add_middleware(rate_limit.RateLimitMiddleware)
+    
+    # CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:3000"],  # Frontend URL
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["Server-Timing", "Idempotent-Replayed", "Retry-After"],
+    )
+    
+    # Request latency and in-flight metrics (inside the query counter so it can read its totals)
+    app.add_middleware(metrics.MetricsMiddleware)
+    
+    # Per-request SQL query counts, slow query log and Server-Timing header
+    instrumentation.install(engine)
+    app.add_middleware(instrumentation.QueryCountMiddleware)
+    
+    # Include all routers
+    app.include_router(auth.router)
+    app.include_router(stalls.router)
+    app.include_router(menu_items.router)
+    app.include_router(orders.router)
+    app.include_router(admin.router)
+    app.include_router(stall_owner.router)
+    app.include_router(search.router)
+    app.include_router(notifications.router)
+    app.include_router(users.router)
+    app.include_router(router)
+    return app
+
+def __getattr__(name):
+    # `uvicorn main:app` and `from main import app` build the app on first access
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,218 @@
+"""
+Bulk menu import/export for PPUM Café.
+
+Rows are read one at a time from CSV or JSONL, validated with
+schemas.MenuItemCreate and upserted in batches keyed by (stall_id, name),
+one transaction per batch. An existing item is only updated in the columns
+its row provides. Invalid rows are reported with their row number and
+skipped. A single "menu.changed" event is published when the import
+finishes, so the admin stats rollup is refreshed once rather than per item.
+"""
+
+import csv
+import io
+import json
+
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+import models
+import schemas
+import event_bus
+
+FORMATS = ("csv", "jsonl")
+MEDIA_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+# Columns in export order; also the accepted import columns
+FIELDS = list(schemas.MenuItemCreate.model_fields)
+LIST_FIELDS = {"allergens", "allergens_bm"}
+LIST_SEPARATOR = ";"
+
+BATCH_SIZE = 200
+MAX_REPORTED_ERRORS = 200
+
+
+def detect_format(filename: str = None, requested: str = None) -> str:
+    if requested:
+        if requested not in FORMATS:
+            raise ValueError(f"Unsupported format '{requested}', expected one of: {', '.join(FORMATS)}")
+        return requested
+    if filename and filename.lower().endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return "csv"
+
+
+def _csv_row(row: dict) -> dict:
+    """CSV cells are strings: blanks mean 'leave as is' (the default for new items), lists are ;-separated"""
+    parsed = {}
+    for field, value in row.items():
+        if field is None or value is None or value.strip() == "":
+            continue
+        value = value.strip()
+        if field in LIST_FIELDS:
+            value = [part.strip() for part in value.split(LIST_SEPARATOR) if part.strip()]
+        parsed[field.strip()] = value
+    return parsed
+
+
+def iter_rows(stream, fmt: str):
+    """Yield (row number, dict) from a text stream, or (row number, error message) for unreadable rows"""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, _csv_row(row)
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(row, dict):
+            yield line_number, "Each line must be a JSON object"
+            continue
+        yield line_number, row
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in error.errors())
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []
+        self.stall_ids = set()
+
+    def error(self, row_number: int, message: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "error": message})
+
+    def to_dict(self):
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "updated": self.updated,
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
+
+
+def _upsert_batch(db: Session, batch, report: ImportReport, commit: bool = True):
+    """Upsert validated items keyed by (stall_id, name) in one transaction"""
+    by_stall = {}
+    for item in batch.values():
+        by_stall.setdefault(item.stall_id, []).append(item.name)
+
+    existing = {}
+    for stall_id, names in by_stall.items():
+        for db_item in db.query(models.MenuItem).filter(
+            models.MenuItem.stall_id == stall_id,
+            models.MenuItem.name.in_(names)
+        ):
+            existing[(db_item.stall_id, db_item.name)] = db_item
+
+    for key, item in batch.items():
+        db_item = existing.get(key)
+        if db_item is None:
+            db.add(models.MenuItem(**item.model_dump()))
+            report.created += 1
+        else:
+            for field, value in item.model_dump(exclude_unset=True).items():
+                setattr(db_item, field, value)
+            report.updated += 1
+        report.stall_ids.add(item.stall_id)
+    if commit:
+        db.commit()
+    else:
+        db.rollback()
+
+
+def import_menu(db: Session, rows, stall_id: int = None, batch_size: int = BATCH_SIZE, dry_run: bool = False):
+    """Validate and upsert menu rows; stall_id restricts the import to one stall (stall owners).
+
+    Returns an ImportReport. With dry_run rows are validated and classified but nothing is written.
+    """
+    report = ImportReport()
+    valid_stalls = {sid for (sid,) in db.query(models.Stall.id)}
+    batch = {}
+
+    for row_number, row in rows:
+        report.rows += 1
+        if isinstance(row, str):
+            report.error(row_number, row)
+            continue
+
+        if stall_id is not None:
+            row.setdefault("stall_id", stall_id)
+        try:
+            item = schemas.MenuItemCreate.model_validate(row)
+        except ValidationError as e:
+            report.error(row_number, _validation_message(e))
+            continue
+
+        if item.stall_id not in valid_stalls:
+            report.error(row_number, f"Stall {item.stall_id} does not exist")
+            continue
+        if stall_id is not None and item.stall_id != stall_id:
+            report.error(row_number, "Cannot import menu items for other stalls")
+            continue
+
+        # A later row for the same item wins
+        batch[(item.stall_id, item.name)] = item
+        if len(batch) >= batch_size:
+            _upsert_batch(db, batch, report, commit=not dry_run)
+            batch = {}
+
+    if batch:
+        _upsert_batch(db, batch, report, commit=not dry_run)
+
+    if report.stall_ids and not dry_run:
+        event_bus.publish(db, "menu.changed", stall_ids=sorted(report.stall_ids),
+                          created=report.created, updated=report.updated)
+        db.commit()
+    return report
+
+
+def export_rows(db: Session, stall_id: int = None):
+    """Yield menu items as dicts of FIELDS, streaming from the database"""
+    query = db.query(models.MenuItem).order_by(models.MenuItem.stall_id, models.MenuItem.id)
+    if stall_id is not None:
+        query = query.filter(models.MenuItem.stall_id == stall_id)
+    for item in query.yield_per(500):
+        yield {field: getattr(item, field) for field in FIELDS}
+
+
+def _csv_cell(field, value):
+    if value is None:
+        return ""
+    if field in LIST_FIELDS:
+        return LIST_SEPARATOR.join(value)
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return value
+
+
+def export_lines(rows, fmt: str):
+    """Encode exported rows as CSV or JSONL text, one chunk per row"""
+    if fmt == "jsonl":
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False) + "\n"
+        return
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({field: _csv_cell(field, value) for field, value in row.items()})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
@@ -0,0 +1,306 @@
+"""
+Prometheus-compatible metrics for PPUM Café.
+
+A small in-process registry of counters, gauges and histograms rendered in
+the Prometheus text exposition format. Everything is updated in memory on
+the request paths and by background jobs, so a scrape never touches the
+database.
+"""
+
+import threading
+import time
+
+from sqlalchemy.orm import Session
+
+import event_bus
+import instrumentation
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + (extra or [])
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def replace(self, values):
+        """Swap in a full {label tuple: value} snapshot"""
+        with self._lock:
+            self._values = dict(values)
+
+
+class CallbackGauge(Metric):
+    """Gauge whose samples are read from a cheap callback at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, callback, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def render(self):
+        lines = self.header()
+        try:
+            samples = self.callback()
+        except Exception:
+            samples = {}
+        for key, value in sorted(samples.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        lines = self.header()
+        # observe() updates bucket lists in place, so snapshot them under the lock
+        with self._lock:
+            items = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# HTTP
+http_requests = registry.register(Counter(
+    "ppum_http_requests_total", "HTTP requests handled", ("method", "route", "status")))
+http_request_duration = registry.register(Histogram(
+    "ppum_http_request_duration_seconds", "HTTP request latency", ("method", "route")))
+http_requests_in_flight = registry.register(Gauge(
+    "ppum_http_requests_in_flight", "HTTP requests currently being handled"))
+http_request_queries = registry.register(Counter(
+    "ppum_http_request_db_queries_total", "SQL statements run by HTTP requests", ("method", "route")))
+
+# Background jobs (see supervisor.py)
+JOB_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+job_duration = registry.register(Histogram(
+    "ppum_background_job_duration_seconds", "Duration of background job runs", ("job",), buckets=JOB_BUCKETS))
+job_lag = registry.register(Gauge(
+    "ppum_background_job_lag_seconds", "How late the last run of a background job started", ("job",)))
+job_last_success = registry.register(Gauge(
+    "ppum_background_job_last_success_timestamp_seconds", "Unix time of a job's last successful run", ("job",)))
+job_failures = registry.register(Counter(
+    "ppum_background_job_failures_total", "Background job runs that raised", ("job",)))
+job_lease_held = registry.register(Gauge(
+    "ppum_background_job_lease_held", "1 if this worker held the job's lease on its last run", ("job",)))
+
+# Kitchen pipeline
+orders_created = registry.register(Counter(
+    "ppum_orders_created_total", "Orders created"))
+trackers_by_status = registry.register(Gauge(
+    "ppum_food_trackers", "Food trackers per status per stall", ("stall_id", "status")))
+notifications_unread = registry.register(Gauge(
+    "ppum_notifications_unread", "Notifications not yet read by their recipient"))
+# The events table is the outbox: rows commit with their change, other workers poll them
+event_backlog = registry.register(CallbackGauge(
+    "ppum_event_bus_backlog", "Events from other workers awaiting dispatch here, as of the last poll",
+    lambda: {(): event_bus.backlog}))
+
+# Admission control
+rate_limited = registry.register(Counter(
+    "ppum_rate_limited_total", "Requests rejected with 429", ("route_class", "reason")))
+write_requests_in_flight = registry.register(Gauge(
+    "ppum_write_requests_in_flight", "Write requests holding a concurrency slot"))
+write_queue_depth = registry.register(Gauge(
+    "ppum_write_queue_depth", "Write requests waiting for a concurrency slot"))
+write_queue_wait = registry.register(Histogram(
+    "ppum_write_queue_wait_seconds", "Time write requests waited for a concurrency slot"))
+
+
+def db_pool_samples():
+    from database import engine
+    pool = engine.pool
+    samples = {}
+    for state, reader in (("checked_out", "checkedout"), ("size", "size"), ("overflow", "overflow")):
+        if hasattr(pool, reader):
+            samples[(state,)] = getattr(pool, reader)()
+    return samples
+
+
+db_pool = registry.register(CallbackGauge(
+    "ppum_db_pool_connections", "Database connection pool usage", db_pool_samples, ("state",)))
+
+
+def render() -> str:
+    return registry.render()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency, status and in-flight count"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_holder = {"status": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status_holder["status"] = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_flight.dec()
+            # Route templates keep label cardinality bounded
+            route = scope.get("route")
+            route = route.path if route is not None else "<unmatched>"
+            method = scope["method"]
+            http_requests.inc(method=method, route=route, status=str(status_holder["status"]))
+            http_request_duration.observe(elapsed, method=method, route=route)
+            stats = instrumentation.current_stats()
+            if stats is not None:
+                http_request_queries.inc(stats.count, method=method, route=route)
+
+
+# Domain gauges follow events from every worker; counters only count local work
+
+def _on_order_created(payload, local):
+    if local:
+        orders_created.inc()
+    for stall_id, quantity in payload["stall_quantities"].items():
+        trackers_by_status.inc(quantity, stall_id=str(stall_id), status="Queued")
+
+
+def _on_tracker_status(payload, local):
+    stall_id = str(payload["stall_id"])
+    if payload["old_status"]:
+        trackers_by_status.dec(stall_id=stall_id, status=payload["old_status"])
+    trackers_by_status.inc(stall_id=stall_id, status=payload["new_status"])
+
+
+event_bus.subscribe("order.created", _on_order_created)
+event_bus.subscribe("tracker.status", _on_tracker_status)
+event_bus.subscribe("notification.created", lambda payload, local: notifications_unread.inc())
+event_bus.subscribe("notification.read", lambda payload, local: notifications_unread.dec())
+
+
+def _on_records_deleted(payload, local):
+    # Bulk deletes (cascade.py) publish counts, not statuses: recount from the database
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        load_domain_gauges(db)
+    finally:
+        db.close()
+
+
+event_bus.subscribe("records.deleted", _on_records_deleted)
+
+
+def load_domain_gauges(db: Session):
+    """Seed domain gauges from the database once (startup / resync), not per scrape"""
+    import models
+    from sqlalchemy import func
+
+    rows = db.query(models.FoodTracker.stall_id, models.FoodTracker.status, func.count()).group_by(
+        models.FoodTracker.stall_id, models.FoodTracker.status
+    ).all()
+    trackers_by_status.replace({(str(stall_id), status): count for stall_id, status, count in rows})
+
+    unread = db.query(func.count(models.Notification.id)).filter(models.Notification.is_read == False).scalar()
+    notifications_unread.set(unread or 0)
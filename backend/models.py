@@ -1,9 +1,16 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, JSON
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Time, ForeignKey, Text, JSON, Index, text
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
 from database import Base
+from change_tracking import Versioned
+from soft_delete import SoftDeletable
+
+# Every timestamp is naive local time (datetime.now()), the clock the kitchen,
+# ETAs and availability windows run on; created_at is set by the application
+# rather than SQLite's CURRENT_TIMESTAMP, which is UTC
 
-class User(Base):
+class User(Versioned, Base):
     __tablename__ = "users"
     
     id = Column(Integer, primary_key=True, index=True)
@@ -12,17 +19,17 @@ class User(Base):
     phone = Column(String(20), nullable=True)
     password_hash = Column(String(255), nullable=False)  # Added for authentication
     role = Column(String(20), default="user")  # user, stall_owner, admin
-    stall_id = Column(Integer, ForeignKey("stalls.id"), nullable=True)  # For stall owners
+    stall_id = Column(Integer, ForeignKey("stalls.id"), nullable=True, index=True)  # For stall owners
     language_preference = Column(String(10), default="English")
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), default=datetime.now)
     last_login = Column(DateTime(timezone=True), nullable=True)
     
     # Relationships
     orders = relationship("Order", back_populates="user")
     managed_stall = relationship("Stall", foreign_keys=[stall_id])
 
-class Stall(Base):
+class Stall(SoftDeletable, Versioned, Base):
     __tablename__ = "stalls"
     
     id = Column(Integer, primary_key=True, index=True)
@@ -36,17 +43,21 @@ class Stall(Base):
     image_url = Column(String(255), nullable=True)
     is_active = Column(Boolean, default=True)
     average_prep_time = Column(Integer, default=10)  # Average preparation time in minutes
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    kitchen_stations = Column(Integer, default=2)  # Items the kitchen can prepare in parallel
+    created_at = Column(DateTime(timezone=True), default=datetime.now)
     
     # Relationships
     menu_items = relationship("MenuItem", back_populates="stall")
     order_items = relationship("OrderItem", back_populates="stall")
+    
+    # Stall listings only ever read live rows (see soft_delete.py)
+    __table_args__ = (Index("ix_stalls_live_is_active", "is_active", sqlite_where=text("deleted_at IS NULL")),)
 
-class MenuItem(Base):
+class MenuItem(SoftDeletable, Versioned, Base):
     __tablename__ = "menu_items"
     
     id = Column(Integer, primary_key=True, index=True)
-    stall_id = Column(Integer, ForeignKey("stalls.id"), nullable=False)
+    stall_id = Column(Integer, ForeignKey("stalls.id"), nullable=False, index=True)
     name = Column(String(100), nullable=False)
     name_bm = Column(String(100), nullable=True)  # Bahasa Malaysia name
     description = Column(Text, nullable=True)
@@ -63,6 +74,10 @@ class MenuItem(Base):
     complexity_multiplier = Column(Float, default=1.0)  # Complexity factor for prep time
     current_queue_count = Column(Integer, default=0)  # Current orders in queue
     
+    # Portion inventory (see inventory.py)
+    stock_quantity = Column(Integer, nullable=True)  # Portions left; NULL when not counted
+    low_stock_threshold = Column(Integer, nullable=True)  # Notify the stall owner when stock falls to this
+    
     # Nutrition information
     calories = Column(Integer, nullable=True)
     protein = Column(Float, nullable=True)
@@ -72,13 +87,30 @@ class MenuItem(Base):
     allergens = Column(JSON, nullable=True)  # Store as JSON array
     allergens_bm = Column(JSON, nullable=True)  # Bahasa Malaysia allergens
     
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), default=datetime.now)
     
     # Relationships
     stall = relationship("Stall", back_populates="menu_items")
     order_items = relationship("OrderItem", back_populates="menu_item")
+    
+    # Customer menus (by stall and category) scan live rows only; deleted items stay for order history
+    __table_args__ = (
+        Index("ix_menu_items_live_stall_id_category", "stall_id", "category", sqlite_where=text("deleted_at IS NULL")),
+    )
+
+class AvailabilityWindow(Versioned, Base):
+    __tablename__ = "availability_windows"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    stall_id = Column(Integer, ForeignKey("stalls.id"), nullable=False, index=True)
+    menu_item_id = Column(Integer, ForeignKey("menu_items.id"), nullable=True, index=True)  # NULL: the stall's opening hours
+    name = Column(String(50), nullable=False)  # Breakfast, Lunch, Dinner, ...
+    weekdays = Column(JSON, nullable=True)  # Days the window opens, 0 = Monday; NULL for every day
+    start_time = Column(Time, nullable=False)  # Local time
+    end_time = Column(Time, nullable=False)  # At or before start_time: closes the next day
+    created_at = Column(DateTime(timezone=True), default=datetime.now)
 
-class Order(Base):
+class Order(Versioned, Base):
     __tablename__ = "orders"
     
     id = Column(Integer, primary_key=True, index=True)
@@ -90,21 +122,27 @@ class Order(Base):
     service_fee = Column(Float, default=1.50)
     total_amount = Column(Float, nullable=False)
     estimated_completion_time = Column(DateTime(timezone=True), nullable=True)  # When all items will be ready
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    refund_amount = Column(Float, default=0.0)  # Value of cancelled items (and the service fee once all are cancelled)
+    cancelled_at = Column(DateTime(timezone=True), nullable=True)  # When the last item was cancelled
+    cancellation_reason = Column(String(200), nullable=True)
+    created_at = Column(DateTime(timezone=True), default=datetime.now)
     
     # Relationships
     user = relationship("User", back_populates="orders")
     order_items = relationship("OrderItem", back_populates="order")
     food_trackers = relationship("FoodTracker", back_populates="order")
+    stall_orders = relationship("StallOrder", back_populates="order")
+    
+    # User order lists and the /updates delta lookup
+    __table_args__ = (Index("ix_orders_user_id_row_version", "user_id", "row_version"),)
 
-class OrderItem(Base):
+class OrderItem(Versioned, Base):
     __tablename__ = "order_items"
     
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
-    menu_item_id = Column(Integer, ForeignKey("menu_items.id"), nullable=False)
-    stall_id = Column(Integer, ForeignKey("stalls.id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
+    menu_item_id = Column(Integer, ForeignKey("menu_items.id"), nullable=False, index=True)
+    stall_id = Column(Integer, ForeignKey("stalls.id"), nullable=False, index=True)
     quantity = Column(Integer, nullable=False)
     unit_price = Column(Float, nullable=False)
     total_price = Column(Float, nullable=False)
@@ -115,28 +153,48 @@ class OrderItem(Base):
     stall = relationship("Stall", back_populates="order_items")
     food_trackers = relationship("FoodTracker", back_populates="order_item")
 
-class FoodTracker(Base):
+class StallOrder(Versioned, Base):
+    __tablename__ = "stall_orders"
+    
+    # One row per stall an order has items from, written with the order: the
+    # stall's sub-order, which its owner and tracker updates read and write alone
+    stall_id = Column(Integer, ForeignKey("stalls.id"), primary_key=True)
+    order_id = Column(Integer, ForeignKey("orders.id"), primary_key=True, index=True)
+    status = Column(String(20), default="Accepted")  # Order status computed from this stall's food trackers only
+    estimated_ready_time = Column(DateTime(timezone=True), nullable=True)  # When this stall's last item will be ready
+    ready_at = Column(DateTime(timezone=True), nullable=True)  # When every item from this stall was ready for pickup
+    created_at = Column(DateTime(timezone=True), default=datetime.now)  # When the order was placed, for recency scans
+    
+    # Relationships
+    order = relationship("Order", back_populates="stall_orders")
+    stall = relationship("Stall")
+    
+    # Owner dashboards: newest orders of a stall in one index range scan
+    __table_args__ = (Index("ix_stall_orders_stall_id_created_at", "stall_id", "created_at", "order_id"),)
+
+class FoodTracker(Versioned, Base):
     __tablename__ = "food_trackers"
     
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
-    order_item_id = Column(Integer, ForeignKey("order_items.id"), nullable=False)
-    menu_item_id = Column(Integer, ForeignKey("menu_items.id"), nullable=False)
-    stall_id = Column(Integer, ForeignKey("stalls.id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
+    order_item_id = Column(Integer, ForeignKey("order_items.id"), nullable=False, index=True)
+    menu_item_id = Column(Integer, ForeignKey("menu_items.id"), nullable=False, index=True)
+    stall_id = Column(Integer, ForeignKey("stalls.id"), nullable=False, index=True)
     
     # Individual item tracking
     item_number = Column(Integer, nullable=False)  # For multiple quantities (1st, 2nd, 3rd item)
-    status = Column(String(20), default="Queued")  # Queued, Preparing, Ready, Collected
-    queue_position = Column(Integer, nullable=False)  # Position in stall's queue
-    estimated_ready_time = Column(DateTime(timezone=True), nullable=False)
+    status = Column(String(20), default="Queued")  # Queued, Preparing, Ready, Collected, Cancelled
+    queue_position = Column(Integer, nullable=False)  # Place among the stall's queued items, kept current by re-flows
+    initial_queue_position = Column(Integer, nullable=True)  # queue_position when the order was placed
+    estimated_ready_time = Column(DateTime(timezone=True), nullable=False)  # Kept current by re-flows
+    initial_estimated_ready_time = Column(DateTime(timezone=True), nullable=True)  # ETA promised when the order was placed
     actual_ready_time = Column(DateTime(timezone=True), nullable=True)
     
     # Timing details
     prep_start_time = Column(DateTime(timezone=True), nullable=True)
     prep_duration_minutes = Column(Integer, nullable=False)  # Calculated prep time
     
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    created_at = Column(DateTime(timezone=True), default=datetime.now)
     
     # Relationships
     order = relationship("Order", back_populates="food_trackers")
@@ -144,18 +202,52 @@ class FoodTracker(Base):
     menu_item = relationship("MenuItem")
     stall = relationship("Stall")
 
-class Notification(Base):
+class Notification(Versioned, Base):
     __tablename__ = "notifications"
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
-    food_tracker_id = Column(Integer, ForeignKey("food_trackers.id"), nullable=True)  # For individual item notifications
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
+    food_tracker_id = Column(Integer, ForeignKey("food_trackers.id"), nullable=True, index=True)  # For individual item notifications
     title = Column(String(100), nullable=False)
     message = Column(Text, nullable=False)
     notification_type = Column(String(20), default="info")  # info, success, warning, food_ready
     is_read = Column(Boolean, default=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), default=datetime.now)
     
     # Relationships
-    food_tracker = relationship("FoodTracker") 
\ No newline at end of file
+    food_tracker = relationship("FoodTracker")
+    
+    __table_args__ = (Index("ix_notifications_user_id_row_version", "user_id", "row_version"),)
+
+class SchedulerLease(Base):
+    __tablename__ = "scheduler_leases"
+    
+    name = Column(String(50), primary_key=True)  # e.g. food_tracker_scheduler
+    holder = Column(String(100), nullable=False)  # host:pid:token of the current leader
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+class Event(Base):
+    __tablename__ = "events"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    topic = Column(String(50), nullable=False)  # tracker.status, order.created, notification.created, ...
+    payload = Column(JSON, nullable=False)
+    origin = Column(String(100), nullable=False)  # Process that published the event
+    created_at = Column(DateTime(timezone=True), default=datetime.now, index=True)
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    key = Column(String(100), primary_key=True)  # Idempotency-Key header sent by the client
+    request_hash = Column(String(64), nullable=False)  # SHA-256 of the request body
+    response = Column(JSON, nullable=True)  # Stored response; NULL while the first attempt is running
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=True)  # Order placed under the key, committed with it
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+class ChangeSequence(Base):
+    __tablename__ = "change_sequence"
+    
+    name = Column(String(50), primary_key=True)  # "global" (see change_tracking.py)
+    value = Column(Integer, nullable=False, default=0)  # Last row_version handed out
@@ -0,0 +1,178 @@
+"""
+Preparation time estimator for PPUM Café.
+
+Fits per-item and per-stall preparation durations from FoodTracker history
+in one vectorised NumPy pass. The fitted coefficients are cached in memory
+so the order creation path never has to touch the history tables. NumPy is
+only imported by the fitting functions, so importing this module (and the
+API) stays cheap until the first refit.
+
+Only durations are fitted. How long an item waits before it starts follows
+from the stall's backlog (kitchen_queue.py). Fitting it from history would
+only learn back the app's own ETAs: the scheduler finishes items, and so
+starts the ones behind them, on the times it estimated.
+"""
+
+import os
+import threading
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+import models
+
+# How often the background loop refits the model (seconds)
+REFRESH_INTERVAL_SECONDS = int(os.getenv("PREP_MODEL_REFRESH_SECONDS", "900"))
+
+# Only the most recent trackers are used for fitting
+HISTORY_LIMIT = int(os.getenv("PREP_MODEL_HISTORY_LIMIT", "50000"))
+
+# Pseudo-observations pulling sparse items towards their stall average
+PRIOR_WEIGHT = 5.0
+
+# Durations outside this range (minutes) are treated as bad data
+MIN_DURATION_MINUTES = 0.5
+MAX_DURATION_MINUTES = 180.0
+
+# Shortest estimate handed out
+MIN_PREP_MINUTES = 3
+
+
+class PrepTimeModel:
+    """Immutable set of fitted coefficients"""
+
+    def __init__(self, item_minutes=None, stall_minutes=None, global_minutes=None, samples=0, fitted_at=None):
+        self.item_minutes = item_minutes or {}
+        self.stall_minutes = stall_minutes or {}
+        self.global_minutes = global_minutes
+        self.samples = samples
+        self.fitted_at = fitted_at
+
+    def prep_minutes(self, menu_item) -> int:
+        """Estimated preparation minutes for a single portion of a menu item"""
+        minutes = self.item_minutes.get(menu_item.id)
+        if minutes is None:
+            # Unseen item: scale the configured formula by how the stall really performs
+            minutes = menu_item.base_prep_time * menu_item.complexity_multiplier
+            stall_minutes = self.stall_minutes.get(menu_item.stall_id)
+            if stall_minutes is not None and self.global_minutes:
+                minutes *= stall_minutes / self.global_minutes
+        return max(int(round(minutes)), MIN_PREP_MINUTES)
+
+    def to_dict(self):
+        return {
+            "samples": self.samples,
+            "fitted_at": self.fitted_at.isoformat() if self.fitted_at else None,
+            "global_minutes": self.global_minutes,
+            "items": len(self.item_minutes),
+            "stalls": len(self.stall_minutes),
+        }
+
+
+def load_history(db: Session, limit: int = HISTORY_LIMIT, before: datetime = None):
+    """Load completed tracker timings as NumPy arrays (minutes)"""
+    query = db.query(
+        models.FoodTracker.menu_item_id,
+        models.FoodTracker.stall_id,
+        models.FoodTracker.prep_start_time,
+        models.FoodTracker.actual_ready_time,
+    ).filter(
+        models.FoodTracker.prep_start_time.isnot(None),
+        models.FoodTracker.actual_ready_time.isnot(None),
+    )
+    if before is not None:
+        query = query.filter(models.FoodTracker.created_at < before)
+
+    rows = query.order_by(models.FoodTracker.id.desc()).limit(limit).all()
+    return history_to_arrays(rows)
+
+
+def history_to_arrays(rows):
+    """Convert (item, stall, started, ready) rows to arrays"""
+    import numpy as np
+
+    if not rows:
+        empty = np.empty(0)
+        return {
+            "item_ids": empty.astype(np.int64),
+            "stall_ids": empty.astype(np.int64),
+            "durations": empty,
+        }
+
+    item_ids, stall_ids, started, ready = zip(*rows)
+    started = np.array([_naive(t) for t in started], dtype="datetime64[s]")
+    ready = np.array([_naive(t) for t in ready], dtype="datetime64[s]")
+    minute = np.timedelta64(60, "s")
+
+    return {
+        "item_ids": np.asarray(item_ids, dtype=np.int64),
+        "stall_ids": np.asarray(stall_ids, dtype=np.int64),
+        "durations": (ready - started) / minute,
+    }
+
+
+def _naive(value):
+    # SQLite hands back naive datetimes; drop tzinfo from anything else for NumPy
+    return value.replace(tzinfo=None) if value.tzinfo else value
+
+
+def _group_sums(ids, values):
+    """Return unique ids, per-id sums and per-id counts"""
+    import numpy as np
+
+    unique_ids, inverse = np.unique(ids, return_inverse=True)
+    sums = np.bincount(inverse, weights=values, minlength=len(unique_ids))
+    counts = np.bincount(inverse, minlength=len(unique_ids)).astype(np.float64)
+    return unique_ids, inverse, sums, counts
+
+
+def fit(history) -> PrepTimeModel:
+    """Fit a PrepTimeModel from arrays produced by load_history"""
+    import numpy as np
+
+    durations = history["durations"]
+    valid = (durations >= MIN_DURATION_MINUTES) & (durations <= MAX_DURATION_MINUTES)
+    if not valid.any():
+        return PrepTimeModel(fitted_at=datetime.now())
+
+    item_ids = history["item_ids"][valid]
+    stall_ids = history["stall_ids"][valid]
+    durations = durations[valid]
+    global_minutes = float(durations.mean())
+
+    # Per-stall mean preparation time
+    stall_keys, stall_inverse, stall_sums, stall_counts = _group_sums(stall_ids, durations)
+    stall_means = stall_sums / stall_counts
+
+    # Per-item mean shrunk towards the mean of the item's stall
+    item_keys, item_inverse, item_sums, item_counts = _group_sums(item_ids, durations)
+    item_prior = np.zeros(len(item_keys))
+    item_prior[item_inverse] = stall_means[stall_inverse]
+    item_means = (item_sums + PRIOR_WEIGHT * item_prior) / (item_counts + PRIOR_WEIGHT)
+
+    return PrepTimeModel(
+        item_minutes=dict(zip(item_keys.tolist(), item_means.tolist())),
+        stall_minutes=dict(zip(stall_keys.tolist(), stall_means.tolist())),
+        global_minutes=global_minutes,
+        samples=int(valid.sum()),
+        fitted_at=datetime.now(),
+    )
+
+
+# In-memory cache of the current coefficients
+_model = PrepTimeModel()
+_lock = threading.Lock()
+
+
+def get_model() -> PrepTimeModel:
+    """Return the cached model (never touches the database)"""
+    return _model
+
+
+def refresh(db: Session) -> PrepTimeModel:
+    """Refit the model from tracker history and swap it into the cache"""
+    global _model
+    model = fit(load_history(db))
+    with _lock:
+        _model = model
+    return model
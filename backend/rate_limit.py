@@ -0,0 +1,190 @@
+"""
+Rate limiting and admission control for PPUM Café.
+
+Token buckets per (route class, client) throttle order submission, login
+and search, where the client is the authenticated user or, failing that,
+the remote IP. Independently, write requests share a small pool of
+concurrency slots so bursts queue briefly in memory instead of piling up on
+the single SQLite writer. Rejections are fast 429s with Retry-After.
+"""
+
+import asyncio
+import math
+import os
+import threading
+import time
+
+from jose import JWTError
+from starlette.responses import JSONResponse
+
+import metrics
+from routers.auth import SECRET_KEY, ALGORITHM
+
+ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") != "0"
+
+
+def _parse_limit(value: str):
+    """'10/60' -> (capacity 10, refill 10 tokens per 60 seconds)"""
+    count, seconds = value.split("/")
+    return int(count), int(count) / float(seconds)
+
+
+# Limits per route class as "requests/seconds"
+LIMITS = {
+    "orders": _parse_limit(os.getenv("RATE_LIMIT_ORDERS", "10/60")),
+    "login": _parse_limit(os.getenv("RATE_LIMIT_LOGIN", "10/60")),
+    "search": _parse_limit(os.getenv("RATE_LIMIT_SEARCH", "60/10")),
+}
+
+# (method, path, prefix match, route class)
+ROUTE_CLASSES = (
+    ("POST", "/api/orders/", False, "orders"),
+    ("POST", "/api/auth/login", False, "login"),
+    ("GET", "/api/search/", True, "search"),
+)
+
+# Write requests allowed to run at once, and how many may wait for a slot
+WRITE_CONCURRENCY = int(os.getenv("WRITE_CONCURRENCY", "4"))
+WRITE_QUEUE_MAX = int(os.getenv("WRITE_QUEUE_MAX", "16"))
+WRITE_QUEUE_TIMEOUT_SECONDS = float(os.getenv("WRITE_QUEUE_TIMEOUT_SECONDS", "2"))
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Idle full buckets are dropped once this many exist
+MAX_BUCKETS = 10000
+
+
+class TokenBucket:
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, capacity: int, rate: float, now: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = float(capacity)
+        self.updated = now
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Take a token; returns 0 on success, otherwise seconds until one is available"""
+        self.refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def _sweep(now: float):
+    for key, bucket in list(_buckets.items()):
+        bucket.refill(now)
+        if bucket.tokens >= bucket.capacity:
+            del _buckets[key]
+
+
+def check(route_class: str, client: str, now: float = None) -> float:
+    """Charge one request to a client's bucket; returns seconds to wait (0 if allowed)"""
+    now = time.monotonic() if now is None else now
+    capacity, rate = LIMITS[route_class]
+    with _buckets_lock:
+        bucket = _buckets.get((route_class, client))
+        if bucket is None:
+            if len(_buckets) >= MAX_BUCKETS:
+                _sweep(now)
+            bucket = _buckets[(route_class, client)] = TokenBucket(capacity, rate, now)
+        return bucket.take(now)
+
+
+def route_class(method: str, path: str):
+    for route_method, route_path, prefix, name in ROUTE_CLASSES:
+        if method == route_method and (path.startswith(route_path) if prefix else path == route_path):
+            return name
+    return None
+
+
+def client_identity(scope) -> str:
+    """Authenticated user if the bearer token is valid, otherwise the remote IP"""
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            auth = value.decode("latin-1")
+            if auth.startswith("Bearer "):
+                from jose import jwt
+                try:
+                    email = jwt.decode(auth[7:], SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+                    if email:
+                        return f"user:{email}"
+                except JWTError:
+                    pass
+            break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+def _too_many_requests(detail: str, retry_after: float):
+    return JSONResponse(
+        {"detail": detail},
+        status_code=429,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying token buckets and the write concurrency cap"""
+
+    def __init__(self, app):
+        self.app = app
+        self._write_slots = None
+        self._waiting = 0
+
+    async def __call__(self, scope, receive, send):
+        if not ENABLED or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method, path = scope["method"], scope["path"]
+        name = route_class(method, path)
+        if name is not None:
+            retry_after = check(name, client_identity(scope))
+            if retry_after:
+                metrics.rate_limited.inc(route_class=name, reason="rate")
+                await _too_many_requests("Too many requests, please slow down", retry_after)(scope, receive, send)
+                return
+
+        if method not in WRITE_METHODS or not path.startswith("/api/"):
+            await self.app(scope, receive, send)
+            return
+
+        if self._write_slots is None:
+            self._write_slots = asyncio.Semaphore(WRITE_CONCURRENCY)
+
+        # Queue briefly for a write slot rather than contending for the database lock
+        if self._write_slots.locked() and self._waiting >= WRITE_QUEUE_MAX:
+            metrics.rate_limited.inc(route_class=name or "write", reason="write_queue_full")
+            await _too_many_requests("Server is busy, please retry", 1)(scope, receive, send)
+            return
+
+        self._waiting += 1
+        metrics.write_queue_depth.inc()
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._write_slots.acquire(), WRITE_QUEUE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            metrics.rate_limited.inc(route_class=name or "write", reason="write_queue_timeout")
+            await _too_many_requests("Server is busy, please retry", 1)(scope, receive, send)
+            return
+        finally:
+            self._waiting -= 1
+            metrics.write_queue_depth.dec()
+            metrics.write_queue_wait.observe(time.perf_counter() - started)
+
+        metrics.write_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            metrics.write_requests_in_flight.dec()
+            self._write_slots.release()
@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
+import codecs
 
 import models
 import schemas
 import crud
+import menu_io
+import analytics
+import cascade
 from database import get_db
 from .auth import get_current_user
 
@@ -21,47 +26,45 @@ def require_admin(current_user: models.User = Depends(get_current_user)):
 
 @router.get("/stats")
 def get_admin_stats(db: Session = Depends(get_db), current_admin: models.User = Depends(require_admin)):
-    """Get admin dashboard statistics"""
-    total_users = db.query(models.User).count()
-    total_stalls = db.query(models.Stall).count()
-    total_menu_items = db.query(models.MenuItem).count()
-    total_orders = db.query(models.Order).count()
-    
-    # Get users by role
-    users_by_role = {}
-    for role in ["user", "stall_owner", "admin"]:
-        count = db.query(models.User).filter(models.User.role == role).count()
-        users_by_role[role] = count
-    
-    return {
-        "total_users": total_users,
-        "total_stalls": total_stalls,
-        "total_menu_items": total_menu_items,
-        "total_orders": total_orders,
-        "users_by_role": users_by_role
-    }
+    """Get admin dashboard statistics (rolled up in the background, see analytics.py)"""
+    return analytics.get_stats(db)
 
 # Stall management endpoints
 @router.delete("/stalls/{stall_id}")
-def delete_stall(stall_id: int, db: Session = Depends(get_db), current_admin: models.User = Depends(require_admin)):
-    """Delete a stall and all associated data"""
-    db_stall = crud.get_stall(db, stall_id=stall_id)
+def delete_stall(
+    stall_id: int,
+    purge: bool = Query(False, description="Remove the stall and its order history for good instead of hiding it"),
+    db: Session = Depends(get_db),
+    current_admin: models.User = Depends(require_admin)
+):
+    """Delete a stall (soft by default, so order history keeps it)"""
+    db_stall = crud.get_stall(db, stall_id=stall_id, include_deleted=purge)
     if db_stall is None:
         raise HTTPException(status_code=404, detail="Stall not found")
     
     try:
-        # Delete associated menu items first
-        db.query(models.MenuItem).filter(models.MenuItem.stall_id == stall_id).delete()
+        if not purge:
+            crud.soft_delete_stall(db, db_stall)
+            return {"message": "Stall deleted successfully"}
         
-        # Delete the stall
-        db.delete(db_stall)
-        db.commit()
+        # Menu items, this stall's part of every order, and orders left empty
+        deleted = cascade.delete_stall(db, stall_id)
         
-        return {"message": "Stall deleted successfully"}
+        return {"message": "Stall purged successfully", "deleted": deleted}
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error deleting stall: {str(e)}")
 
+@router.post("/stalls/{stall_id}/restore")
+def restore_stall(stall_id: int, db: Session = Depends(get_db), current_admin: models.User = Depends(require_admin)):
+    """Undo a soft delete of a stall and the menu items deleted with it"""
+    db_stall = crud.get_stall(db, stall_id=stall_id, include_deleted=True)
+    if db_stall is None or db_stall.deleted_at is None:
+        raise HTTPException(status_code=404, detail="Deleted stall not found")
+    
+    crud.restore_stall(db, db_stall)
+    return {"message": "Stall restored successfully"}
+
 @router.put("/stalls/{stall_id}")
 def update_stall(stall_id: int, stall: schemas.StallCreate, db: Session = Depends(get_db), current_admin: models.User = Depends(require_admin)):
     """Update a stall"""
@@ -88,26 +91,39 @@ def create_stall_admin(stall: schemas.StallCreate, db: Session = Depends(get_db)
 
 # Menu item management endpoints
 @router.get("/menu-items")
-def get_admin_menu_items(db: Session = Depends(get_db), current_admin: models.User = Depends(require_admin)):
+def get_admin_menu_items(include_deleted: bool = False, db: Session = Depends(get_db), current_admin: models.User = Depends(require_admin)):
     """Get all menu items with stall information for admin panel"""
-    menu_items = db.query(models.MenuItem).options(joinedload(models.MenuItem.stall)).all()
+    menu_items = db.query(models.MenuItem).execution_options(include_deleted=include_deleted).options(
+        joinedload(models.MenuItem.stall)
+    ).all()
     return menu_items
 
 @router.delete("/menu-items/{item_id}")
 def delete_menu_item(item_id: int, db: Session = Depends(get_db), current_admin: models.User = Depends(require_admin)):
-    """Delete a menu item"""
+    """Delete a menu item (soft, so past orders keep it)"""
     db_item = crud.get_menu_item(db, item_id=item_id)
     if db_item is None:
         raise HTTPException(status_code=404, detail="Menu item not found")
     
     try:
-        db.delete(db_item)
-        db.commit()
+        crud.soft_delete_menu_item(db, db_item)
         return {"message": "Menu item deleted successfully"}
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error deleting menu item: {str(e)}")
 
+@router.post("/menu-items/{item_id}/restore")
+def restore_menu_item(item_id: int, db: Session = Depends(get_db), current_admin: models.User = Depends(require_admin)):
+    """Undo a soft delete of a menu item"""
+    db_item = crud.get_menu_item(db, item_id=item_id, include_deleted=True)
+    if db_item is None or db_item.deleted_at is None:
+        raise HTTPException(status_code=404, detail="Deleted menu item not found")
+    if crud.get_stall(db, stall_id=db_item.stall_id) is None:
+        raise HTTPException(status_code=409, detail="The item's stall is deleted; restore the stall first")
+    
+    crud.restore_menu_item(db, db_item)
+    return {"message": "Menu item restored successfully"}
+
 @router.put("/menu-items/{item_id}")
 def update_menu_item(item_id: int, item: schemas.MenuItemCreate, db: Session = Depends(get_db), current_admin: models.User = Depends(require_admin)):
     """Update a menu item"""
@@ -132,14 +148,47 @@ def create_menu_item_admin(item: schemas.MenuItemCreate, db: Session = Depends(g
     """Create a new menu item (admin only)"""
     return crud.create_menu_item(db=db, item=item)
 
+@router.post("/menu-items/import")
+def import_menu_items(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="csv or jsonl (default: from the file name)"),
+    dry_run: bool = False,
+    db: Session = Depends(get_db),
+    current_admin: models.User = Depends(require_admin)
+):
+    """Bulk create/update menu items for any stall from a CSV or JSONL upload (admin only)"""
+    try:
+        fmt = menu_io.detect_format(file.filename, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    rows = menu_io.iter_rows(codecs.iterdecode(file.file, "utf-8-sig"), fmt)
+    return menu_io.import_menu(db, rows, dry_run=dry_run).to_dict()
+
+@router.get("/menu-items/export")
+def export_menu_items(
+    format: str = Query("csv", description="csv or jsonl"),
+    stall_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_admin: models.User = Depends(require_admin)
+):
+    """Stream all menu items (or one stall's) as CSV or JSONL (admin only)"""
+    try:
+        fmt = menu_io.detect_format(requested=format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return StreamingResponse(
+        menu_io.export_lines(menu_io.export_rows(db, stall_id=stall_id), fmt),
+        media_type=menu_io.MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="menu.{fmt}"'}
+    )
+
 # Order management endpoints
-@router.get("/orders")
+@router.get("/orders", response_model=List[schemas.OrderListItem])
 def get_all_orders(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_admin: models.User = Depends(require_admin)):
     """Get all orders for admin panel"""
-    orders = db.query(models.Order).options(
-        joinedload(models.Order.user),
-        joinedload(models.Order.order_items).joinedload(models.OrderItem.menu_item)
-    ).offset(skip).limit(limit).all()
+    orders = db.query(models.Order).options(*crud.order_list_options()).offset(skip).limit(limit).all()
     return orders
 
 @router.delete("/orders/{order_id}")
@@ -150,17 +199,10 @@ def delete_order(order_id: int, db: Session = Depends(get_db), current_admin: mo
         raise HTTPException(status_code=404, detail="Order not found")
     
     try:
-        # Delete associated food trackers
-        db.query(models.FoodTracker).filter(models.FoodTracker.order_id == order_id).delete()
-        
-        # Delete associated order items
-        db.query(models.OrderItem).filter(models.OrderItem.order_id == order_id).delete()
+        # Food trackers, order items, stall index rows and notifications go with it
+        deleted = cascade.delete(db, models.Order, [order_id])
         
-        # Delete the order
-        db.delete(db_order)
-        db.commit()
-        
-        return {"message": "Order deleted successfully"}
+        return {"message": "Order deleted successfully", "deleted": deleted}
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error deleting order: {str(e)}")
@@ -282,9 +324,9 @@ def delete_user(user_id: int, db: Session = Depends(get_db), current_admin: mode
         raise HTTPException(status_code=400, detail="Cannot delete your own account")
     
     try:
-        db.delete(db_user)
-        db.commit()
-        return {"message": "User deleted successfully"}
+        # Their orders, notifications and idempotency keys go with them
+        deleted = cascade.delete(db, models.User, [user_id])
+        return {"message": "User deleted successfully", "deleted": deleted}
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error deleting user: {str(e)}") 
\ No newline at end of file
@@ -6,6 +6,8 @@ from database import get_db
 from models import MenuItem, Stall, User
 from schemas import MenuItem as MenuItemSchema, MenuItemCreate
 from routers.auth import get_current_user
+import crud
+import availability
 
 router = APIRouter(prefix="/api/menu-items", tags=["menu-items"])
 
@@ -30,7 +32,8 @@ async def get_menu_items(
     if is_hospital_friendly is not None:
         query = query.filter(MenuItem.is_hospital_friendly == is_hospital_friendly)
     
-    menu_items = query.all()
+    # Items outside their availability windows are off the menu (served from memory)
+    menu_items = availability.open_items(db, query.all())
     
     # Transform menu items based on language preference
     # NOTE: We don't transform the category field as it's needed for frontend filtering
@@ -142,7 +145,6 @@ async def delete_menu_item(
             detail="Menu item not found"
         )
     
-    db.delete(menu_item)
-    db.commit()
+    crud.soft_delete_menu_item(db, menu_item)
     
     return {"message": "Menu item deleted successfully"} 
\ No newline at end of file
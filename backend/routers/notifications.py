@@ -5,6 +5,7 @@ from typing import List, Optional
 import models
 import schemas
 import crud
+import event_bus
 from database import get_db
 from .auth import get_current_user
 
@@ -40,7 +41,9 @@ def mark_notification_read(notification_id: int, db: Session = Depends(get_db),
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
     
-    notification.is_read = True
-    db.commit()
+    if not notification.is_read:
+        notification.is_read = True
+        event_bus.publish(db, "notification.read", user_id=notification.user_id)
+        db.commit()
     
     return {"message": "Notification marked as read"} 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
 from datetime import datetime
@@ -6,23 +6,52 @@ from datetime import datetime
 import models
 import schemas
 import crud
+import idempotency
+import inventory
 from database import get_db
 from .auth import get_current_user
 
 router = APIRouter(prefix="/api/orders", tags=["orders"])
 
 @router.post("/", response_model=schemas.OrderTrackingResponse)
-def create_order(order: schemas.OrderCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+def create_order(
+    order: schemas.OrderCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, max_length=100),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
     """Create a new order with individual food tracking"""
     # Set the user_id from the authenticated user
     order.user_id = current_user.id
     
-    db_order = crud.create_order_with_tracking(db=db, order_data=order)
-    
-    # Get the order with tracking information - db_order is already the tracking response
-    return db_order
+    try:
+        if not idempotency_key:
+            # Get the order with tracking information - db_order is already the tracking response
+            return crud.create_order_with_tracking(db=db, order_data=order)
+        
+        # Retried submissions with the same key get the first response back
+        def tracking_response(tracking):
+            return schemas.OrderTrackingResponse.model_validate(tracking).model_dump(mode="json")
+        
+        def place_order(record):
+            return tracking_response(crud.create_order_with_tracking(db=db, order_data=order, idempotency_key=record))
+        
+        def replay_order(order_id):
+            return tracking_response(crud.get_order_with_tracking(db, order_id))
+        
+        result, replayed = idempotency.run_once(db, current_user.id, idempotency_key, order.model_dump(),
+                                                place_order, replay_order)
+    except inventory.OutOfStock as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        # Unknown items, items outside their availability windows or switched off by the stall
+        raise HTTPException(status_code=400, detail=str(e))
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
 
-@router.get("/user/{user_id}")
+@router.get("/user/{user_id}", response_model=List[schemas.OrderListItem])
 def read_user_orders(user_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
     """Get orders for a specific user"""
     if current_user.id != user_id:
@@ -33,15 +62,34 @@ def read_user_orders(user_id: int, skip: int = 0, limit: int = 100, db: Session
 @router.get("/{order_id}/tracking", response_model=schemas.OrderTrackingResponse)
 def get_order_tracking(order_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
     """Get detailed tracking information for an order"""
+    tracking_info = crud.get_order_with_tracking(db, order_id)
+    
     # Check if user owns this order
-    order = crud.get_order(db, order_id)
-    if not order or order.user_id != current_user.id:
+    if not tracking_info or tracking_info["order"].user_id != current_user.id:
         raise HTTPException(status_code=404, detail="Order not found")
     
-    tracking_info = crud.get_order_with_tracking(db, order_id)
     return tracking_info
 
-@router.get("/{order_id}")
+@router.post("/{order_id}/cancel", response_model=schemas.OrderTrackingResponse)
+def cancel_order(
+    order_id: int,
+    cancellation: Optional[schemas.OrderCancel] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Cancel an order before any of it is being prepared"""
+    db_order = crud.get_order(db, order_id=order_id)
+    if db_order is None or db_order.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Order not found")
+    
+    try:
+        crud.cancel_order(db, db_order, reason=cancellation.reason if cancellation else None)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    return crud.get_order_with_tracking(db, order_id)
+
+@router.get("/{order_id}", response_model=schemas.OrderDetail)
 def read_order(order_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
     """Get a specific order"""
     db_order = crud.get_order(db, order_id=order_id)
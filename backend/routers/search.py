@@ -6,6 +6,7 @@ from typing import List, Optional
 import models
 import schemas
 import crud
+import availability
 from database import get_db
 
 router = APIRouter(prefix="/api/search", tags=["search"])
@@ -39,7 +40,7 @@ def search_menu_items(
     if stall_id:
         query = query.filter(models.MenuItem.stall_id == stall_id)
     
-    menu_items = query.all()
+    menu_items = availability.open_items(db, query.all())
     
     # Transform results based on language preference
     if language == "BM":
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
+import codecs
 
 import models
 import schemas
 import crud
+import menu_io
+import inventory
 from database import get_db
 from .auth import get_current_user
 
@@ -19,27 +23,45 @@ def require_stall_owner(current_user: models.User = Depends(get_current_user)):
         )
     return current_user
 
-@router.get("/orders")
+@router.get("/orders", response_model=List[schemas.StallOrderListItem])
 def get_stall_orders(
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
     current_owner: models.User = Depends(require_stall_owner)
 ):
-    """Get orders for the stall owner's stall"""
+    """Get orders for the stall owner's stall, newest first"""
     # Check if user has a stall assigned
     if not current_owner.stall_id:
         raise HTTPException(status_code=404, detail="No stall assigned to this owner")
     
-    # Get orders that contain items from this stall
-    orders = db.query(models.Order).join(models.OrderItem).join(models.MenuItem).filter(
-        models.MenuItem.stall_id == current_owner.stall_id
-    ).options(
-        joinedload(models.Order.user),
-        joinedload(models.Order.order_items).joinedload(models.OrderItem.menu_item)
-    ).offset(skip).limit(limit).all()
+    return crud.get_stall_orders(db, current_owner.stall_id, skip=skip, limit=limit)
+
+@router.post("/orders/{order_id}/cancel")
+def cancel_stall_order(
+    order_id: int,
+    cancellation: Optional[schemas.OrderCancel] = None,
+    db: Session = Depends(get_db),
+    current_owner: models.User = Depends(require_stall_owner)
+):
+    """Cancel this stall's unfinished items of an order; the customer is notified and refunded for them"""
+    if not current_owner.stall_id:
+        raise HTTPException(status_code=404, detail="No stall assigned to this owner")
+    
+    db_order = crud.get_order(db, order_id)
+    if not db_order or not any(item.stall_id == current_owner.stall_id for item in db_order.order_items):
+        raise HTTPException(status_code=404, detail="Order not found or has no items from your stall")
     
-    return orders
+    try:
+        cancelled, refund = crud.cancel_order(
+            db, db_order, stall_id=current_owner.stall_id,
+            reason=cancellation.reason if cancellation else None, by_customer=False
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    return {"message": f"Cancelled {cancelled} item(s)", "cancelled_items": cancelled,
+            "refund_amount": refund, "order_status": db_order.status}
 
 @router.get("/food-trackers")
 def get_stall_food_trackers(
@@ -147,6 +169,49 @@ def create_stall_menu_item(
     
     return crud.create_menu_item(db=db, item=item)
 
+@router.post("/menu-items/import")
+def import_stall_menu_items(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="csv or jsonl (default: from the file name)"),
+    dry_run: bool = False,
+    db: Session = Depends(get_db),
+    current_owner: models.User = Depends(require_stall_owner)
+):
+    """Bulk create/update the stall owner's menu from a CSV or JSONL upload"""
+    # Check if user has a stall assigned
+    if not current_owner.stall_id:
+        raise HTTPException(status_code=404, detail="No stall assigned to this owner")
+    
+    try:
+        fmt = menu_io.detect_format(file.filename, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    rows = menu_io.iter_rows(codecs.iterdecode(file.file, "utf-8-sig"), fmt)
+    return menu_io.import_menu(db, rows, stall_id=current_owner.stall_id, dry_run=dry_run).to_dict()
+
+@router.get("/menu-items/export")
+def export_stall_menu_items(
+    format: str = Query("csv", description="csv or jsonl"),
+    db: Session = Depends(get_db),
+    current_owner: models.User = Depends(require_stall_owner)
+):
+    """Stream the stall owner's menu as CSV or JSONL"""
+    # Check if user has a stall assigned
+    if not current_owner.stall_id:
+        raise HTTPException(status_code=404, detail="No stall assigned to this owner")
+    
+    try:
+        fmt = menu_io.detect_format(requested=format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return StreamingResponse(
+        menu_io.export_lines(menu_io.export_rows(db, stall_id=current_owner.stall_id), fmt),
+        media_type=menu_io.MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="menu.{fmt}"'}
+    )
+
 @router.put("/menu-items/{item_id}", response_model=schemas.MenuItem)
 def update_stall_menu_item(
     item_id: int,
@@ -205,9 +270,95 @@ def delete_stall_menu_item(
         raise HTTPException(status_code=404, detail="Menu item not found or not owned by your stall")
     
     try:
-        db.delete(db_item)
-        db.commit()
+        crud.soft_delete_menu_item(db, db_item)
         return {"message": "Menu item deleted successfully"}
     except Exception as e:
         db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error deleting menu item: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error deleting menu item: {str(e)}")
+
+@router.put("/menu-items/{item_id}/stock", response_model=schemas.MenuItem)
+def update_stall_menu_item_stock(
+    item_id: int,
+    stock: schemas.MenuItemStock,
+    db: Session = Depends(get_db),
+    current_owner: models.User = Depends(require_stall_owner)
+):
+    """Set the portions left of a menu item (null stops counting) and its low-stock threshold"""
+    if not current_owner.stall_id:
+        raise HTTPException(status_code=404, detail="No stall assigned to this owner")
+    
+    db_item = db.query(models.MenuItem).filter(
+        models.MenuItem.id == item_id,
+        models.MenuItem.stall_id == current_owner.stall_id
+    ).first()
+    
+    if not db_item:
+        raise HTTPException(status_code=404, detail="Menu item not found or not owned by your stall")
+    
+    try:
+        return inventory.restock(db, db_item, stock.stock_quantity, stock.low_stock_threshold)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/availability-windows", response_model=List[schemas.AvailabilityWindow])
+def get_availability_windows(
+    db: Session = Depends(get_db),
+    current_owner: models.User = Depends(require_stall_owner)
+):
+    """Opening hours of the owner's stall and the serving windows of its items"""
+    if not current_owner.stall_id:
+        raise HTTPException(status_code=404, detail="No stall assigned to this owner")
+    
+    return crud.get_availability_windows(db, current_owner.stall_id)
+
+@router.post("/availability-windows", response_model=schemas.AvailabilityWindow)
+def create_availability_window(
+    window: schemas.AvailabilityWindowCreate,
+    db: Session = Depends(get_db),
+    current_owner: models.User = Depends(require_stall_owner)
+):
+    """Add an availability window to the stall (menu_item_id null) or one of its items"""
+    if not current_owner.stall_id:
+        raise HTTPException(status_code=404, detail="No stall assigned to this owner")
+    
+    try:
+        return crud.create_availability_window(db, current_owner.stall_id, window)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.put("/availability-windows/{window_id}", response_model=schemas.AvailabilityWindow)
+def update_availability_window(
+    window_id: int,
+    window: schemas.AvailabilityWindowCreate,
+    db: Session = Depends(get_db),
+    current_owner: models.User = Depends(require_stall_owner)
+):
+    """Change an availability window of the owner's stall"""
+    if not current_owner.stall_id:
+        raise HTTPException(status_code=404, detail="No stall assigned to this owner")
+    
+    db_window = crud.get_availability_window(db, window_id, current_owner.stall_id)
+    if not db_window:
+        raise HTTPException(status_code=404, detail="Availability window not found or not owned by your stall")
+    
+    try:
+        return crud.update_availability_window(db, db_window, window)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.delete("/availability-windows/{window_id}")
+def delete_availability_window(
+    window_id: int,
+    db: Session = Depends(get_db),
+    current_owner: models.User = Depends(require_stall_owner)
+):
+    """Remove an availability window of the owner's stall"""
+    if not current_owner.stall_id:
+        raise HTTPException(status_code=404, detail="No stall assigned to this owner")
+    
+    db_window = crud.get_availability_window(db, window_id, current_owner.stall_id)
+    if not db_window:
+        raise HTTPException(status_code=404, detail="Availability window not found or not owned by your stall")
+    
+    crud.delete_availability_window(db, db_window)
+    return {"message": "Availability window deleted successfully"}
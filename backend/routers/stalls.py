@@ -3,15 +3,17 @@ from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
 
 from database import get_db
-from models import Stall, MenuItem
+from models import Stall
 from schemas import Stall as StallSchema, StallCreate
 from routers.auth import get_current_user
+import crud
 from models import User
 
 router = APIRouter(prefix="/api/stalls", tags=["stalls"])
 
 @router.get("/admin/all", response_model=List[StallSchema])
 async def get_all_stalls_admin(
+    include_deleted: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -24,7 +26,7 @@ async def get_all_stalls_admin(
     
     # Return all stalls without any language transformation
     # This ensures admin panel gets both English and BM fields separately
-    stalls = db.query(Stall).all()
+    stalls = db.query(Stall).execution_options(include_deleted=include_deleted).all()
     return stalls
 
 @router.get("/", response_model=List[StallSchema])
@@ -138,11 +140,7 @@ async def delete_stall(
             detail="Stall not found"
         )
     
-    # Delete associated menu items first
-    db.query(MenuItem).filter(MenuItem.stall_id == stall_id).delete()
-    
-    # Delete the stall
-    db.delete(stall)
-    db.commit()
+    # Soft delete with its menu; order history keeps both
+    crud.soft_delete_stall(db, stall)
     
     return {"message": "Stall deleted successfully"} 
\ No newline at end of file
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
 import models
 import schemas
 import crud
+import change_tracking
 from database import get_db
 from .auth import get_current_user
 
@@ -28,6 +29,26 @@ def read_user(user_id: int, db: Session = Depends(get_db), current_user: models.
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
 
+@router.get("/{user_id}/updates", response_model=schemas.UserUpdates,
+            responses={204: {"description": "Nothing changed since the cursor"}})
+def read_user_updates(user_id: int, since: Optional[int] = None, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    """Orders, food trackers and notifications changed since a cursor (204 if none).
+
+    The cursor is a row_version (see change_tracking.py). Without `since` only a fresh
+    cursor is returned; fetch it before loading the full lists.
+    """
+    if current_user.id != user_id:
+        raise HTTPException(status_code=403, detail="Not authorized to access this user")
+    
+    # Read before the changes: anything committed in between is returned again next poll, never skipped
+    cursor = change_tracking.current_version(db)
+    if since is None:
+        return {"cursor": cursor}
+    
+    if not crud.has_user_updates(db, user_id, since):
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+    return {"cursor": cursor, **crud.get_user_updates(db, user_id, since)}
+
 @router.put("/{user_id}/language")
 def update_user_language(user_id: int, language: str, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
     """Update user's language preference"""
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import List, Optional, Any, TYPE_CHECKING
-from datetime import datetime
+from datetime import datetime, time
 
 # Use TYPE_CHECKING to avoid circular imports
 if TYPE_CHECKING:
@@ -66,6 +66,7 @@ class StallBase(BaseModel):
     description_bm: Optional[str] = None
     image_url: Optional[str] = None
     average_prep_time: Optional[int] = 10
+    kitchen_stations: Optional[int] = 2
     rating: float = 0.0
     is_active: bool = True
 
@@ -75,6 +76,7 @@ class StallCreate(StallBase):
 class Stall(StallBase):
     id: int
     created_at: datetime
+    deleted_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
@@ -112,12 +114,38 @@ class MenuItemCreate(MenuItemBase):
 class MenuItem(MenuItemBase):
     id: int
     current_queue_count: int
+    stock_quantity: Optional[int] = None
+    low_stock_threshold: Optional[int] = None
     created_at: datetime
+    deleted_at: Optional[datetime] = None
     stall: Optional[Stall] = None
     
     class Config:
         from_attributes = True
 
+class MenuItemStock(BaseModel):
+    stock_quantity: Optional[int] = None  # None: stop counting portions
+    low_stock_threshold: Optional[int] = None
+
+# Availability Window Schemas
+class AvailabilityWindowBase(BaseModel):
+    menu_item_id: Optional[int] = None  # None: opening hours of the whole stall
+    name: str
+    weekdays: Optional[List[int]] = None  # 0 = Monday; None for every day
+    start_time: time
+    end_time: time
+
+class AvailabilityWindowCreate(AvailabilityWindowBase):
+    pass
+
+class AvailabilityWindow(AvailabilityWindowBase):
+    id: int
+    stall_id: int
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
 # Food Tracker Schemas
 class FoodTrackerBase(BaseModel):
     status: str
@@ -171,6 +199,9 @@ class OrderBase(BaseModel):
 class OrderCreate(OrderBase):
     user_id: int
 
+class OrderCancel(BaseModel):
+    reason: Optional[str] = Field(None, max_length=200)
+
 class Order(BaseModel):
     id: int
     user_id: int
@@ -181,6 +212,9 @@ class Order(BaseModel):
     service_fee: float
     total_amount: float
     estimated_completion_time: Optional[datetime] = None
+    refund_amount: Optional[float] = 0.0
+    cancelled_at: Optional[datetime] = None
+    cancellation_reason: Optional[str] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
     order_items: List[OrderItem] = []
@@ -190,6 +224,101 @@ class Order(BaseModel):
     class Config:
         from_attributes = True
 
+# Lean order views: only the columns list and detail pages render
+class UserBrief(BaseModel):
+    id: int
+    name: str
+    
+    class Config:
+        from_attributes = True
+
+class StallBrief(BaseModel):
+    id: int
+    name: str
+    name_bm: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+class MenuItemBrief(BaseModel):
+    id: int
+    name: str
+    name_bm: Optional[str] = None
+    image_url: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+class OrderItemBrief(BaseModel):
+    id: int
+    menu_item_id: int
+    stall_id: int
+    quantity: int
+    unit_price: float
+    total_price: float
+    menu_item: Optional[MenuItemBrief] = None
+    stall: Optional[StallBrief] = None
+    
+    class Config:
+        from_attributes = True
+
+class FoodTrackerBrief(FoodTrackerBase):
+    id: int
+    order_item_id: int
+    menu_item_id: int
+    stall_id: int
+    item_number: int
+    actual_ready_time: Optional[datetime] = None
+    prep_start_time: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class FoodTrackerView(FoodTrackerBrief):
+    menu_item: Optional[MenuItemBrief] = None
+    stall: Optional[StallBrief] = None
+
+class OrderListItem(BaseModel):
+    id: int
+    user_id: int
+    order_number: str
+    status: str
+    payment_method: str
+    subtotal: float
+    service_fee: float
+    total_amount: float
+    estimated_completion_time: Optional[datetime] = None
+    refund_amount: Optional[float] = 0.0
+    cancelled_at: Optional[datetime] = None
+    cancellation_reason: Optional[str] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    order_items: List[OrderItemBrief] = []
+    user: Optional[UserBrief] = None
+    
+    class Config:
+        from_attributes = True
+
+class StallOrderBrief(BaseModel):
+    """One stall's part of an order (its sub-order)"""
+    stall_id: int
+    status: str
+    estimated_ready_time: Optional[datetime] = None
+    ready_at: Optional[datetime] = None
+    stall: Optional[StallBrief] = None
+    
+    class Config:
+        from_attributes = True
+
+class StallOrderListItem(OrderListItem):
+    """An order as one stall sees it: only its own items, and their combined status and ETA"""
+    stall_status: str
+    stall_estimated_ready_time: Optional[datetime] = None
+
+class OrderDetail(OrderListItem):
+    food_trackers: List[FoodTrackerView] = []
+    stall_orders: List[StallOrderBrief] = []
+
 # Enhanced Notification Schemas
 class NotificationBase(BaseModel):
     title: str
@@ -213,6 +342,24 @@ class Notification(NotificationBase):
     class Config:
         from_attributes = True
 
+class NotificationBrief(NotificationBase):
+    id: int
+    user_id: int
+    order_id: int
+    food_tracker_id: Optional[int] = None
+    is_read: bool
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class UserUpdates(BaseModel):
+    """Rows changed since a cursor; pass `cursor` as `since` on the next poll"""
+    cursor: int
+    orders: List[OrderListItem] = []
+    food_trackers: List[FoodTrackerView] = []
+    notifications: List[NotificationBrief] = []
+
 # Cart Schemas
 class CartItem(BaseModel):
     menu_item_id: int
@@ -237,8 +384,9 @@ class OrderSummary(BaseModel):
     items_by_stall: dict
 
 class OrderTrackingResponse(BaseModel):
-    order: Order
-    food_trackers: List[FoodTracker]
-    ready_items: List[FoodTracker]
-    preparing_items: List[FoodTracker]
-    queued_items: List[FoodTracker] 
\ No newline at end of file
+    order: OrderListItem
+    food_trackers: List[FoodTrackerView]
+    ready_items: List[FoodTrackerView]
+    preparing_items: List[FoodTrackerView]
+    queued_items: List[FoodTrackerView]
+    stall_orders: List[StallOrderBrief] = []
\ No newline at end of file
@@ -0,0 +1,42 @@
+"""
+Soft deletes for PPUM Café.
+
+Stalls and menu items stay referenced by order history, so deleting one
+sets deleted_at instead of removing the row. Every ORM SELECT whose primary
+entity mixes in SoftDeletable gets "deleted_at IS NULL" added here, in one
+place, so menu, search and owner queries only see live rows and can use the
+partial indexes declared on them. Joins and relationship loads from other
+entities are left alone: an old order still shows the item it was for.
+Queries that need deleted rows too pass execution_options(include_deleted=True).
+"""
+
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, event
+from sqlalchemy.orm import Session, with_loader_criteria
+
+
+class SoftDeletable:
+    """Mixin for rows that are hidden rather than deleted"""
+    deleted_at = Column(DateTime(timezone=True), nullable=True)  # NULL while live
+
+
+def soft_delete(obj, when=None):
+    obj.deleted_at = when or datetime.now()
+
+
+def restore(obj):
+    obj.deleted_at = None
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _hide_deleted(state):
+    if not state.is_select or state.is_column_load or state.is_relationship_load:
+        return
+    if state.execution_options.get("include_deleted", False):
+        return
+    mapper = state.bind_mapper
+    if mapper is not None and issubclass(mapper.class_, SoftDeletable):
+        state.statement = state.statement.options(with_loader_criteria(
+            mapper.class_, lambda cls: cls.deleted_at.is_(None), include_aliases=True, propagate_to_loaders=False
+        ))
@@ -3,13 +3,40 @@
 Startup script for PPUM Café Backend API
 """
 
+import argparse
+import os
+
 import uvicorn
 
+def main():
+    parser = argparse.ArgumentParser(description="Run the PPUM Café API")
+    parser.add_argument("--production", action="store_true",
+                        help="Run several worker processes without auto-reload")
+    parser.add_argument("--workers", type=int,
+                        default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+                        help="Worker processes in production mode (default: WEB_CONCURRENCY or CPU count)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    
+    if args.production:
+        # Workers share the tracker scheduler through a database lease and
+        # exchange in-memory state changes through the event bus
+        uvicorn.run(
+            "main:app",
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            log_level="info"
+        )
+    else:
+        uvicorn.run(
+            "main:app",
+            host=args.host,
+            port=args.port,
+            reload=True,  # Auto-reload on code changes (development only)
+            log_level="info"
+        )
+
 if __name__ == "__main__":
-    uvicorn.run(
-        "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,  # Auto-reload on code changes (development only)
-        log_level="info"
-    ) 
\ No newline at end of file
+    main()
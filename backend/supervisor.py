@@ -0,0 +1,115 @@
+"""
+Background job supervisor for PPUM Café.
+
+Every job is a synchronous function taking a database session. The
+supervisor runs each one in its own asyncio task on a fixed schedule,
+executing the function in the default thread executor with a fresh session
+so the event loop keeps serving requests. A run that raises is logged and
+retried with exponential backoff (capped at the job's interval). Jobs with a
+lease only run in the worker holding it. Stopping cancels every task but lets
+runs already in a thread finish their transaction first.
+"""
+
+import asyncio
+import logging
+import time
+
+import coordination
+import metrics
+
+BACKOFF_INITIAL_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 300.0
+
+# How long stop() waits for in-flight runs
+STOP_TIMEOUT_SECONDS = 10.0
+
+logger = logging.getLogger("ppum_cafe.jobs")
+
+
+class Job:
+    def __init__(self, name, func, interval=None, initial_delay=0.0, lease=None,
+                 lease_ttl=coordination.LEASE_TTL_SECONDS):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.initial_delay = initial_delay
+        self.lease = lease
+        self.lease_ttl = lease_ttl
+        self.failures = 0
+
+    def backoff(self) -> float:
+        """Delay before retrying after the current run of consecutive failures"""
+        delay = min(BACKOFF_INITIAL_SECONDS * 2 ** (self.failures - 1), BACKOFF_MAX_SECONDS)
+        return min(delay, self.interval) if self.interval else delay
+
+
+class Supervisor:
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self.jobs = {}
+        self.tasks = {}
+
+    def add(self, name, func, interval=None, initial_delay=0.0, lease=None,
+            lease_ttl=coordination.LEASE_TTL_SECONDS):
+        """Register func(db) to run every interval seconds; without an interval it runs once, retrying until it succeeds"""
+        if name in self.jobs:
+            raise ValueError(f"Job {name} is already registered")
+        self.jobs[name] = Job(name, func, interval, initial_delay, lease, lease_ttl)
+
+    def start(self):
+        for job in self.jobs.values():
+            self.tasks[job.name] = asyncio.create_task(self._supervise(job), name=f"job:{job.name}")
+
+    async def stop(self, timeout: float = STOP_TIMEOUT_SECONDS):
+        tasks = list(self.tasks.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+        self.tasks.clear()
+
+    def _run(self, job: Job) -> bool:
+        """One run in a worker thread; returns False when another worker holds the lease"""
+        db = self.session_factory()
+        try:
+            if job.lease:
+                held = coordination.try_acquire_lease(db, job.lease, ttl_seconds=job.lease_ttl)
+                metrics.job_lease_held.set(int(held), job=job.name)
+                if not held:
+                    return False
+            job.func(db)
+            return True
+        finally:
+            db.close()
+
+    async def _supervise(self, job: Job):
+        next_run = time.monotonic() + job.initial_delay
+        while True:
+            await asyncio.sleep(max(next_run - time.monotonic(), 0))
+            started = time.monotonic()
+            metrics.job_lag.set(max(started - next_run, 0.0), job=job.name)
+
+            run = asyncio.ensure_future(asyncio.to_thread(self._run, job))
+            try:
+                ran = await asyncio.shield(run)
+            except asyncio.CancelledError:
+                # Shutting down: let a run already in its thread commit or roll back
+                await asyncio.wait([run])
+                raise
+            except Exception:
+                job.failures += 1
+                metrics.job_failures.inc(job=job.name)
+                delay = job.backoff()
+                logger.exception("Background job %s failed (%d in a row), retrying in %.0fs",
+                                 job.name, job.failures, delay)
+                next_run = time.monotonic() + delay
+                continue
+
+            job.failures = 0
+            if ran:
+                metrics.job_duration.observe(time.monotonic() - started, job=job.name)
+                metrics.job_last_success.set(time.time(), job=job.name)
+            if job.interval is None:
+                return
+            # Fixed rate: a slow run eats into the wait rather than pushing the schedule back
+            next_run = started + job.interval
@@ -149,7 +149,7 @@ function OrderTrackingDetail({ orderId, onClose }) {
     );
   }
 
-  const { order, food_trackers, ready_items, preparing_items, queued_items } = tracking;
+  const { order, food_trackers, ready_items, preparing_items, queued_items, stall_orders } = tracking;
 
   return (
     <div className="fixed inset-0 bg-black bg-opacity-50 flex items-center justify-center z-50 p-4">
@@ -213,6 +213,36 @@ function OrderTrackingDetail({ orderId, onClose }) {
             </div>
           </div>
 
+          {/* Pickup by Stall */}
+          {stall_orders && stall_orders.length > 1 && (
+            <div className="mb-6">
+              <h4 className="font-semibold mb-3">
+                {t('tracking.byStall') || 'Pickup by Stall'}
+              </h4>
+              <div className="space-y-2">
+                {stall_orders.map((stallOrder) => (
+                  <div key={stallOrder.stall_id} className="flex items-center justify-between bg-gray-50 rounded-lg px-4 py-3">
+                    <div>
+                      <p className="font-medium">{formatStallName(stallOrder.stall)}</p>
+                      <p className="text-sm text-gray-600">{stallOrder.status}</p>
+                    </div>
+                    <div className="text-sm text-right">
+                      {stallOrder.ready_at ? (
+                        <span className="text-green-600 font-medium">
+                          {t('tracking.readyAt') || 'Ready at'} {formatTime(stallOrder.ready_at)}
+                        </span>
+                      ) : stallOrder.estimated_ready_time && stallOrder.status !== 'Cancelled' && (
+                        <span className="text-gray-600">
+                          {t('tracking.estReady') || 'Est. ready'}: {getTimeRemaining(stallOrder.estimated_ready_time)}
+                        </span>
+                      )}
+                    </div>
+                  </div>
+                ))}
+              </div>
+            </div>
+          )}
+
           {/* Ready Items */}
           {ready_items.length > 0 && (
             <div className="mb-6">
@@ -1,4 +1,4 @@
-import { useState, useMemo } from 'react';
+import { useState, useMemo, useRef, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { useApp } from '../../context/AppContext';
 
@@ -7,6 +7,13 @@ function usePayment() {
   const { state, createOrder } = useApp();
   const [paymentMethod, setPaymentMethod] = useState('Online Payment');
   const [isProcessing, setIsProcessing] = useState(false);
+  // One key per checkout, kept across retries so a resubmit cannot create a second order
+  const idempotencyKeyRef = useRef(null);
+
+  // A different cart or payment method is a different order
+  useEffect(() => {
+    idempotencyKeyRef.current = null;
+  }, [state.cart, paymentMethod]);
 
   // Calculate grouped cart
   const groupedCart = useMemo(() => {
@@ -39,8 +46,15 @@ function usePayment() {
     try {
       setIsProcessing(true);
       
+      if (!idempotencyKeyRef.current) {
+        idempotencyKeyRef.current = window.crypto?.randomUUID
+          ? window.crypto.randomUUID()
+          : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+      }
+
       // Create order via API
-      const order = await createOrder(paymentMethod);
+      const order = await createOrder(paymentMethod, idempotencyKeyRef.current);
+      idempotencyKeyRef.current = null;
 
       // Navigate to order tracking
       navigate('/orders');
@@ -69,8 +69,8 @@ function StallOrders({
                         Order #{order.order_number}
                       </p>
                       <div className="ml-2 flex-shrink-0 flex">
-                        <span className={`px-2 inline-flex text-xs leading-5 font-semibold rounded-full ${getStatusColor(order.status)}`}>
-                          {order.status}
+                        <span className={`px-2 inline-flex text-xs leading-5 font-semibold rounded-full ${getStatusColor(order.stall_status || order.status)}`}>
+                          {order.stall_status || order.status}
                         </span>
                       </div>
                     </div>
@@ -1,4 +1,4 @@
-import React, { createContext, useContext, useReducer, useEffect, useCallback } from 'react';
+import React, { createContext, useContext, useReducer, useEffect, useCallback, useRef } from 'react';
 import ApiService from '../services/api';
 
 const AppContext = createContext();
@@ -136,6 +136,43 @@ function appReducer(state, action) {
         cart: []
       };
     
+    case 'APPLY_UPDATES': {
+      // Merge rows changed since the last poll, replacing any we already have
+      const mergeById = (current, changed) => {
+        const changedIds = new Set(changed.map(row => row.id));
+        return [...changed, ...current.filter(row => !changedIds.has(row.id))];
+      };
+      const byCreatedDesc = (a, b) => new Date(b.created_at) - new Date(a.created_at);
+      const { orders = [], food_trackers = [], notifications = [] } = action.payload;
+      
+      let orderTracking = state.orderTracking;
+      if (orderTracking) {
+        const orderId = orderTracking.order.id;
+        const order = orders.find(o => o.id === orderId) || orderTracking.order;
+        const trackers = food_trackers.filter(t => t.order_id === orderId);
+        if (order !== orderTracking.order || trackers.length > 0) {
+          const allTrackers = mergeById(orderTracking.food_trackers, trackers).sort((a, b) => a.id - b.id);
+          orderTracking = {
+            ...orderTracking,
+            order,
+            food_trackers: allTrackers,
+            ready_items: allTrackers.filter(t => t.status === 'Ready'),
+            preparing_items: allTrackers.filter(t => t.status === 'Preparing'),
+            queued_items: allTrackers.filter(t => t.status === 'Queued')
+          };
+        }
+      }
+      
+      return {
+        ...state,
+        orders: orders.length ? mergeById(state.orders, orders).sort(byCreatedDesc) : state.orders,
+        notifications: notifications.length
+          ? mergeById(state.notifications, notifications).sort(byCreatedDesc)
+          : state.notifications,
+        orderTracking
+      };
+    }
+    
     case 'UPDATE_ORDER_STATUS':
       return {
         ...state,
@@ -168,6 +205,8 @@ function appReducer(state, action) {
 
 export function AppProvider({ children }) {
   const [state, dispatch] = useReducer(appReducer, initialState);
+  // Cursor for /users/{id}/updates; null until the initial load has taken one
+  const updatesCursor = useRef(null);
 
   // Check authentication on app load
   useEffect(() => {
@@ -186,12 +225,11 @@ export function AppProvider({ children }) {
     }
   }, [state.isAuthenticated, state.user]);
 
-  // Poll for order updates and notifications
+  // Poll for order, tracker and notification changes (204 when nothing changed)
   useEffect(() => {
     if (state.isAuthenticated && state.user) {
-    const interval = setInterval(() => {
-        loadUserOrders();
-        loadNotifications();
+      const interval = setInterval(() => {
+        pollUpdates();
       }, 30000); // Check every 30 seconds
 
       return () => clearInterval(interval);
@@ -245,6 +283,10 @@ export function AppProvider({ children }) {
     try {
       dispatch({ type: 'SET_LOADING', payload: true });
       
+      // Take the updates cursor first so changes made during the load are picked up by the next poll
+      const updates = await ApiService.getUserUpdates(state.user.id).catch(() => null);
+      updatesCursor.current = updates ? updates.cursor : null;
+      
       // Load stalls
       await loadStalls();
       
@@ -284,6 +326,27 @@ export function AppProvider({ children }) {
     }
   };
 
+  const pollUpdates = async () => {
+    if (!state.user) return;
+    
+    // Without a cursor (initial load failed) fall back to reloading everything
+    if (updatesCursor.current === null) {
+      await loadUserOrders();
+      await loadNotifications();
+      return;
+    }
+    
+    try {
+      const updates = await ApiService.getUserUpdates(state.user.id, updatesCursor.current);
+      if (updates) {
+        dispatch({ type: 'APPLY_UPDATES', payload: updates });
+        updatesCursor.current = updates.cursor;
+      }
+    } catch (error) {
+      console.error('Error polling for updates:', error);
+    }
+  };
+
   const loadStalls = async () => {
     try {
       const stalls = await ApiService.getStalls();
@@ -341,7 +404,7 @@ export function AppProvider({ children }) {
     }
   };
 
-  const createOrder = async (paymentMethod) => {
+  const createOrder = async (paymentMethod, idempotencyKey) => {
     if (!state.user) {
       throw new Error('User not authenticated');
     }
@@ -358,7 +421,7 @@ export function AppProvider({ children }) {
         }))
       };
       
-      const orderTracking = await ApiService.createOrder(orderData);
+      const orderTracking = await ApiService.createOrder(orderData, idempotencyKey);
       dispatch({ type: 'ADD_ORDER', payload: orderTracking.order });
       dispatch({ type: 'SET_ORDER_TRACKING', payload: orderTracking });
       
@@ -435,6 +498,7 @@ export function AppProvider({ children }) {
     try {
       await ApiService.logout();
       localStorage.removeItem('token');
+      updatesCursor.current = null;
       dispatch({ type: 'LOGOUT' });
     } catch (error) {
       console.error('Logout failed:', error);
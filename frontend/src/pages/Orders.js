@@ -3,6 +3,7 @@ import { useNavigate } from 'react-router-dom';
 import { useApp } from '../context/AppContext';
 import { useTranslation } from '../hooks/useTranslation';
 import { BottomNav, OrderTrackingDetail } from '../components';
+import ApiService from '../services/api';
 
 function Orders() {
   const navigate = useNavigate();
@@ -25,6 +26,18 @@ function Orders() {
     }
   };
 
+  const cancelOrder = async (event, orderId) => {
+    event.stopPropagation();
+    if (!window.confirm(t('orders.cancelConfirm') || 'Cancel this order?')) return;
+    try {
+      await ApiService.cancelOrder(orderId);
+      await loadUserOrders();
+    } catch (error) {
+      console.error('Error cancelling order:', error);
+      alert(error.message);
+    }
+  };
+
   const getStatusColor = (status) => {
     switch (status) {
       case 'Accepted': return 'bg-blue-100 text-blue-800';
@@ -265,7 +278,13 @@ function Orders() {
                     </div>
                   )}
 
-                  {order.estimated_completion_time && order.status !== 'Completed' && (
+                  {order.refund_amount > 0 && (
+                    <div className="text-xs text-red-700 mb-1">
+                      {t('orders.refunded') || 'Refunded'}: RM {order.refund_amount.toFixed(2)}
+                    </div>
+                  )}
+
+                  {order.estimated_completion_time && order.status !== 'Completed' && order.status !== 'Cancelled' && (
                     <div className="text-xs text-gray-500">
                       {t('orders.estimatedCompletion') || 'Est. completion'}: {new Date(order.estimated_completion_time).toLocaleTimeString('en-US', {
                         hour: '2-digit',
@@ -279,6 +298,14 @@ function Orders() {
                     <span className="text-sm text-gray-600">
                       {t('orders.payment') || 'Payment'}: {formatPaymentMethod(order.payment_method)}
                     </span>
+                    {order.status === 'Accepted' && (
+                      <button
+                        onClick={(event) => cancelOrder(event, order.id)}
+                        className="text-sm text-red-600 hover:text-red-700"
+                      >
+                        {t('orders.cancelOrder') || 'Cancel Order'}
+                      </button>
+                    )}
                     <div className="flex items-center text-primary-600 text-sm">
                       <span>{t('orders.trackOrder') || 'Track Order'}</span>
                       <svg className="w-4 h-4 ml-1" fill="none" stroke="currentColor" viewBox="0 0 24 24">
@@ -58,6 +58,11 @@ class ApiService {
         return null;
       }
 
+      // No Content (e.g. nothing changed since an updates cursor)
+      if (response.status === 204) {
+        return null;
+      }
+
       // For non-JSON responses
       if (response.headers.get('content-type')?.indexOf('application/json') === -1) {
         return { 
@@ -169,10 +174,12 @@ class ApiService {
   }
 
   // Enhanced Order endpoints
-  async createOrder(orderData) {
+  async createOrder(orderData, idempotencyKey) {
+    // The same key on a resubmitted order returns the original order instead of a duplicate
     return this.request('/orders/', {
       method: 'POST',
       body: orderData,
+      ...(idempotencyKey && { headers: { 'Idempotency-Key': idempotencyKey } }),
     });
   }
 
@@ -180,6 +187,13 @@ class ApiService {
     return this.request(`/orders/user/${userId}`);
   }
 
+  // Orders, food trackers and notifications changed since a cursor; null when nothing changed.
+  // Without a cursor only a fresh cursor is returned.
+  async getUserUpdates(userId, since = null) {
+    const query = since !== null ? `?since=${encodeURIComponent(since)}` : '';
+    return this.request(`/users/${userId}/updates${query}`);
+  }
+
   async getOrder(orderId) {
     return this.request(`/orders/${orderId}`);
   }
@@ -188,6 +202,14 @@ class ApiService {
     return this.request(`/orders/${orderId}/tracking`);
   }
 
+  // Only possible before any item is being prepared
+  async cancelOrder(orderId, reason = null) {
+    return this.request(`/orders/${orderId}/cancel`, {
+      method: 'POST',
+      body: { reason },
+    });
+  }
+
   // Food Tracker endpoints
   async updateFoodTrackerStatus(trackerId, status) {
     return this.request(`/food-trackers/${trackerId}/status?status=${status}`, {